@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MFC Laboratoire — Banc d'essai du générateur de compte-rendu PDF
+
+Rend des diagnostics synthétiques de taille croissante (molécules, boosters,
+bloquants, facteurs de charge max) avec generate-report-pdf.py et mesure
+chaque étape de build_report : styles, assemblage du récit, mise en page
+(doc.build) et écriture du fichier, plus le pic mémoire Python (tracemalloc,
+mesuré sur une passe séparée pour ne pas fausser les durées).
+
+Usage : python3 bench-report-pdf.py [--sizes 25,100,400,1600] [--repeat 3]
+        [--annexe] [--json resultats.json]
+"""
+
+import importlib.util
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import tracemalloc
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_generator():
+    """Charger generate-report-pdf.py (nom de fichier non importable tel quel)."""
+    spec = importlib.util.spec_from_file_location('generate_report_pdf', os.path.join(_HERE, 'generate-report-pdf.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_payload(n_molecules, seed=0, annexe=False):
+    """Diagnostic synthétique : les listes annexes grandissent avec n_molecules.
+
+    Boosters ~ n/8, bloquants ~ n/12, facteurs de charge max ~ n/20 : les
+    mêmes proportions qu'un diagnostic réel où la composition s'allonge.
+    """
+    r = random.Random(seed)
+    behaviors = ['Booster froid', 'Booster chaud', 'Neutre', 'Frein', 'Bloquant']
+    molecules = [{
+        'name': f'Molecule {i:04d}', 'cas': f'{1000 + i}-{i % 90 + 10:02d}-{i % 10}',
+        'mw': round(r.uniform(90, 320), 1), 'pct': round(r.uniform(0.01, 15), 2),
+        'bp': r.randint(140, 360), 'logp': round(r.uniform(0.5, 6.5), 2),
+        'Pvap_cold': r.uniform(1e-4, 5), 'Pvap_hot': r.uniform(1e-2, 80),
+        'behavior': r.choice(behaviors),
+        'cold_contribution': round(r.uniform(0, 8), 3), 'hot_contribution': round(r.uniform(0, 8), 3),
+    } for i in range(n_molecules)]
+    boosters = [{
+        'nom': f'Booster {i}', 'pct': round(r.uniform(1, 12), 1), 'mw': round(r.uniform(100, 200), 1),
+        'roles': r.sample(['tete', 'coeur', 'froid', 'chaud', 'diffusif'], 2),
+        'contrib_froid': round(r.uniform(1, 20), 1), 'contrib_chaud': round(r.uniform(1, 20), 1),
+    } for i in range(max(1, n_molecules // 8))]
+    bloquants = [{
+        'nom': f'Bloquant {i}', 'pct': round(r.uniform(0.5, 8), 1), 'mw': round(r.uniform(220, 400), 1),
+        'impact': r.choice(['bloquant', 'frein']),
+        'problemes': ['Masse molaire elevee, diffusion lente dans la cire fondue',
+                      'Pression de vapeur faible a 20 deg.C'][:r.randint(1, 2)],
+    } for i in range(max(1, n_molecules // 12))]
+    analyse = [{
+        'impact': r.choice(['positif', 'negatif', 'neutre']), 'facteur': f'Facteur {i}',
+        'valeur': f'{r.uniform(0, 10):.2f}', 'explication': 'Explication detaillee du facteur. ' * 3,
+        'loi': 'Clausius-Clapeyron' if i % 2 else '',
+    } for i in range(6)]
+    facteurs = [{
+        'impact': r.choice(['positif', 'negatif', 'neutre']), 'nom': f'Facteur charge {i}',
+        'valeur': f'{r.uniform(0.5, 1.2):.2f}', 'explication': 'Effet sur la charge maximale admissible. ' * 2,
+    } for i in range(max(1, n_molecules // 20))]
+    return {
+        'fragrance': 'PARFUM SYNTHETIQUE', 'wax_name': 'Cire banc',
+        'horodatage': '2026-01-01T00:00:00',
+        'annexe_moleculaire': annexe,
+        'molecules': molecules,
+        'rapport': {
+            'score_froid': 6.5, 'score_chaud': 7.2, 'score_global': 6.9,
+            'verdict_froid': 'Bonne diffusion', 'verdict_chaud': 'Tres bonne diffusion',
+            'conclusion': 'Conclusion du diagnostic synthetique. ' * 8,
+            'analyse_froid': analyse, 'analyse_chaud': analyse,
+            'boosters': boosters, 'bloquants': bloquants,
+        },
+        'charge_max_scientifique': {
+            'charge_display': '9.5%',
+            'formule': {'description': 'Base x facteurs', 'base': 12, 'solubility_factor': 0.9,
+                        'crystal_factor': 1.0, 'viscosity_factor': 0.95, 'safety_factor': 0.92, 'resultat': 9.5},
+            'parametres_parfum': {'delta_hildebrand_estime': 18.2, 'chi_flory_huggins': 0.41,
+                                  'logP_moyen': 3.4, 'masse_mol_moyenne': 172},
+            'parametres_cire': {'delta_hildebrand': 16.6, 'channel_factor': 1.1, 'viscosity': 32},
+            'facteurs': facteurs,
+        },
+    }
+
+
+def bench_size(gen, n, repeat=3, annexe=False, tmpdir=None):
+    """Médiane des durées par étape pour une taille, puis pic mémoire."""
+    data = synthetic_payload(n, annexe=annexe)
+    out = os.path.join(tmpdir or tempfile.gettempdir(), f'bench_{n}.pdf')
+    runs = []
+    for _ in range(repeat):
+        timings = {}
+        gen.build_report(data, out, styles=None, timings=timings)
+        runs.append(timings)
+    stages = ('styles_s', 'assemblage_s', 'mise_en_page_s', 'ecriture_s', 'total_s')
+    row = {'molecules': n,
+           'boosters': len(data['rapport']['boosters']),
+           'bloquants': len(data['rapport']['bloquants']),
+           'facteurs': len(data['charge_max_scientifique']['facteurs'])}
+    row.update({k: round(statistics.median(t[k] for t in runs), 4) for k in stages})
+    row['pages'] = runs[-1]['pages']
+    row['octets'] = runs[-1]['octets']
+
+    tracemalloc.start()
+    gen.build_report(data, out, styles=None)
+    row['pic_memoire_mo'] = round(tracemalloc.get_traced_memory()[1] / 1048576, 2)
+    tracemalloc.stop()
+    os.remove(out)
+    return row
+
+
+def _option(name, default=None):
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+def main():
+    sizes = [int(x) for x in _option('--sizes', '25,100,400,1600').split(',') if x.strip()]
+    repeat = int(_option('--repeat', 3))
+    annexe = '--annexe' in sys.argv
+    gen = load_generator()
+    gen.build_report(synthetic_payload(10), os.devnull)   # Préchauffage (imports, polices)
+
+    rows = []
+    header = f'{"molecules":>9} {"pages":>5} {"styles":>8} {"recit":>8} {"layout":>8} {"ecriture":>8} {"total":>8} {"pic Mo":>7}'
+    print(header, file=sys.stderr)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in sizes:
+            row = bench_size(gen, n, repeat, annexe, tmpdir)
+            rows.append(row)
+            print(f'{n:>9} {row["pages"]:>5} {row["styles_s"]:>8.4f} {row["assemblage_s"]:>8.4f} '
+                  f'{row["mise_en_page_s"]:>8.4f} {row["ecriture_s"]:>8.4f} {row["total_s"]:>8.4f} '
+                  f'{row["pic_memoire_mo"]:>7.2f}', file=sys.stderr)
+
+    result = {'annexe': annexe, 'repeat': repeat, 'resultats': rows}
+    try:
+        import resource   # Unix seulement : sous Windows, pic mémoire tracemalloc seul
+        result['maxrss_mo'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        pass
+    output = _option('--json')
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
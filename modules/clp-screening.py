@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MFC Laboratoire — Contrôle CLP des mélanges à partir des compositions (NumPy)
+« La classification déclarée en Section 2 est-elle cohérente avec la Section 3 ? »
+
+Tout le corpus est mis à plat en tableaux : une ligne par composant (document,
+concentration min/max, facteur M) et une matrice booléenne composant × classe
+de danger (codes H de la colonne classification). Les règles du règlement
+CLP (CE 1272/2008, annexe I) s'appliquent ensuite d'un bloc à tous les
+documents, par sommes et maximums segmentés (np.add.reduceat /
+np.maximum.reduceat) :
+
+- additivité : corrosion/irritation cutanée (H314, H315), lésions/irritation
+  oculaires (H318, H319), STOT SE 3 (H335, H336), danger par aspiration
+  (H304, viscosité ≤ 20,5 mm²/s si connue) ;
+- sommation avec facteurs M : toxicité aquatique aiguë (H400) et chronique
+  (H410 à H413) ;
+- seuils individuels (limites génériques) : sensibilisation cutanée et
+  respiratoire (H317, H334 ; sous-catégorie 1A : 0,1 %), CMR (H340, H341,
+  H350, H351, H360, H361, H362), STOT SE/RE 1 et 2 (H370 à H373) ;
+- liquides inflammables d'après le point éclair de la Section 9 (H224 à H226).
+
+Chaque règle est évaluée à la borne basse et à la borne haute des fourchettes
+de concentration : une classe calculée dès la borne basse et non déclarée
+(ni une plus sévère) est 'manquante' (certaine), seulement à la borne haute
+'a_verifier'. Une classe déclarée qu'aucune borne ne justifie est signalée
+'non_justifiee' (information : composants sous les seuils de déclaration,
+essais ou limites spécifiques peuvent l'expliquer).
+
+Hors périmètre : toxicité aiguë (ETA inconnues), limites de concentration
+spécifiques (SCL), EUH208.
+
+Sources : sorties de fds-parser.py (liste, NDJSON du mode --watch,
+{"resultats": [...]}, base SQLite --store).
+
+Usage : python3 clp-screening.py <resultats.json|.ndjson|base.db> ...
+        [--output rapport.json] [--tous]
+        python3 clp-screening.py --verifier     (cas de non-régression des règles)
+"""
+
+import json
+import re
+import sys
+import time
+
+import numpy as np
+
+# Classes de danger des composants : nom -> codes H (base à 3 chiffres)
+CLASSES = (
+    ('skin_corr_1', ('H314',)),
+    ('skin_irrit_2', ('H315',)),
+    ('eye_dam_1', ('H318',)),
+    ('eye_irrit_2', ('H319',)),
+    ('skin_sens', ('H317',)),
+    ('resp_sens', ('H334',)),
+    ('aq_acute_1', ('H400',)),
+    ('aq_chronic_1', ('H410',)),
+    ('aq_chronic_2', ('H411',)),
+    ('aq_chronic_3', ('H412',)),
+    ('aq_chronic_4', ('H413',)),
+    ('asp_tox_1', ('H304',)),
+    ('stot_se_3_irr', ('H335',)),
+    ('stot_se_3_nar', ('H336',)),
+    ('muta_1', ('H340',)),
+    ('muta_2', ('H341',)),
+    ('carc_1', ('H350',)),
+    ('carc_2', ('H351',)),
+    ('repr_1', ('H360',)),
+    ('repr_2', ('H361',)),
+    ('lact', ('H362',)),
+    ('stot_se_1', ('H370',)),
+    ('stot_se_2', ('H371',)),
+    ('stot_re_1', ('H372',)),
+    ('stot_re_2', ('H373',)),
+    # Sous-catégories 1A (limite générique 0,1 %) : repérées dans le libellé
+    ('skin_sens_1a', ()),
+    ('resp_sens_1a', ()),
+)
+CLASS_INDEX = {name: i for i, (name, _) in enumerate(CLASSES)}
+CODE_CLASSES = {code: CLASS_INDEX[name] for name, codes in CLASSES for code in codes}
+M_CLASSES = ('aq_acute_1', 'aq_chronic_1')   # classes pondérées par le facteur M
+
+# (code mélange, mode, {classe: poids}, seuil %, facteur M ?)
+# Un composant compte une fois par règle, avec le plus fort poids de ses classes
+# (Skin Corr. 1 + Eye Dam. 1 ne vaut pas double pour H318) ; 'somme' : Σ sur
+# le document des poids × concentration ; 'max' : composant le plus fort
+RULES = (
+    ('H314', 'somme', {'skin_corr_1': 1}, 5.0, False),
+    ('H315', 'somme', {'skin_corr_1': 10, 'skin_irrit_2': 1}, 10.0, False),
+    ('H318', 'somme', {'skin_corr_1': 1, 'eye_dam_1': 1}, 3.0, False),
+    ('H319', 'somme', {'skin_corr_1': 10, 'eye_dam_1': 10, 'eye_irrit_2': 1}, 10.0, False),
+    ('H317', 'max', {'skin_sens': 1, 'skin_sens_1a': 10}, 1.0, False),
+    ('H334', 'max', {'resp_sens': 1, 'resp_sens_1a': 10}, 1.0, False),
+    ('H400', 'somme', {'aq_acute_1': 1}, 25.0, True),
+    ('H410', 'somme', {'aq_chronic_1': 1}, 25.0, True),
+    ('H411', 'somme', {'aq_chronic_1': 10, 'aq_chronic_2': 1}, 25.0, True),
+    ('H412', 'somme', {'aq_chronic_1': 100, 'aq_chronic_2': 10, 'aq_chronic_3': 1}, 25.0, True),
+    ('H413', 'somme', {'aq_chronic_1': 1, 'aq_chronic_2': 1, 'aq_chronic_3': 1, 'aq_chronic_4': 1}, 25.0, False),
+    ('H304', 'somme', {'asp_tox_1': 1}, 10.0, False),
+    ('H335', 'somme', {'stot_se_3_irr': 1}, 20.0, False),
+    ('H336', 'somme', {'stot_se_3_nar': 1}, 20.0, False),
+    ('H340', 'max', {'muta_1': 1}, 0.1, False),
+    ('H341', 'max', {'muta_2': 1}, 1.0, False),
+    ('H350', 'max', {'carc_1': 1}, 0.1, False),
+    ('H351', 'max', {'carc_2': 1}, 1.0, False),
+    ('H360', 'max', {'repr_1': 1}, 0.3, False),
+    ('H361', 'max', {'repr_2': 1}, 3.0, False),
+    ('H362', 'max', {'lact': 1}, 0.3, False),
+    ('H370', 'max', {'stot_se_1': 1}, 10.0, False),
+    ('H371', 'max', {'stot_se_1': 10, 'stot_se_2': 1}, 10.0, False),
+    ('H372', 'max', {'stot_re_1': 1}, 10.0, False),
+    ('H373', 'max', {'stot_re_1': 10, 'stot_re_2': 1}, 10.0, False),
+)
+FLAMMABLE = ('H224', 'H225', 'H226')
+RULE_CODES = tuple(r[0] for r in RULES) + FLAMMABLE
+RULE_INDEX = {code: i for i, code in enumerate(RULE_CODES)}
+
+# Code -> codes plus sévères de la même classe : une classe plus sévère
+# déclarée couvre la classe calculée ; calculée, elle la remplace
+MORE_SEVERE = {
+    'H315': ('H314',), 'H318': ('H314',), 'H319': ('H318', 'H314'),
+    'H411': ('H410',), 'H412': ('H410', 'H411'), 'H413': ('H410', 'H411', 'H412'),
+    'H341': ('H340',), 'H351': ('H350',), 'H361': ('H360',),
+    'H371': ('H370',), 'H373': ('H372',),
+    'H225': ('H224',), 'H226': ('H224', 'H225'),
+}
+
+ASPIRATION_VISCOSITY = 20.5   # mm²/s à 40 °C
+_EPS = 1e-9
+
+_RE_H = re.compile(r'\bH(\d{3})')
+_RE_M = re.compile(r'\bM\s*(?:-?\s*(?:factor|facteur))?\s*[=:]\s*(\d+)', re.IGNORECASE)
+_RE_SKIN_1A = re.compile(r'Skin\s*Sens\.?\s*1A', re.IGNORECASE)
+_RE_RESP_1A = re.compile(r'Resp\.?\s*Sens\.?\s*1A', re.IGNORECASE)
+_RE_NUMBER = re.compile(r'-?\d+(?:[.,]\d+)?')
+
+
+def _num(v):
+    if isinstance(v, (int, float)):
+        return float(v)
+    m = _RE_NUMBER.search(str(v or ''))
+    return float(m.group(0).replace(',', '.')) if m else None
+
+
+def component_hazards(classification, _cache={}):
+    """(indices de classes, facteur M) d'une colonne classification ; mis en cache par libellé."""
+    hit = _cache.get(classification)
+    if hit is None:
+        text = classification or ''
+        classes = {CODE_CLASSES[c] for c in ('H' + d for d in _RE_H.findall(text)) if c in CODE_CLASSES}
+        if _RE_SKIN_1A.search(text):
+            classes.add(CLASS_INDEX['skin_sens_1a'])
+        if _RE_RESP_1A.search(text):
+            classes.add(CLASS_INDEX['resp_sens_1a'])
+        m = _RE_M.search(text)
+        hit = _cache[classification] = (tuple(sorted(classes)), float(m.group(1)) if m else 1.0)
+    return hit
+
+
+def declared_codes(result):
+    """Codes H (base) déclarés pour le mélange en Section 2."""
+    phrases = (result.get('classification_globale') or {}).get('phrases_H') or []
+    return {'H' + d for h in phrases for d in _RE_H.findall(h.get('code') or '')}
+
+
+def flash_point(result):
+    """(point éclair °C, ébullition °C) ; NaN si inconnu ou borne inexploitable."""
+    props = result.get('proprietes_physiques') or {}
+    fp = _num(props.get('flash_point_c'))
+    note = props.get('flash_point_note') or ''
+    if fp is not None and '>' in note and fp <= 60:
+        fp = None   # « > 40 °C » : catégorie indécidable
+    bp = _num(props.get('ebullition_c'))
+    return (np.nan if fp is None else fp), (np.nan if bp is None else bp)
+
+
+class Corpus:
+    """Compositions mises à plat : un segment contigu de composants par document."""
+
+    def __init__(self, results):
+        self.results = results
+        n_docs = len(results)
+        counts = np.zeros(n_docs, dtype=np.int64)
+        cmin, cmax, mfac, rows, cols = [], [], [], [], []
+        self.declared = np.zeros((n_docs, len(RULE_CODES)), dtype=bool)
+        self.flash = np.full(n_docs, np.nan)
+        self.boiling = np.full(n_docs, np.nan)
+        self.viscosity = np.full(n_docs, np.nan)
+        self.no_conc = 0
+        k = 0
+        for d, result in enumerate(results):
+            for code in declared_codes(result):
+                if code in RULE_INDEX:
+                    self.declared[d, RULE_INDEX[code]] = True
+            self.flash[d], self.boiling[d] = flash_point(result)
+            v = _num((result.get('proprietes_physiques') or {}).get('viscosite'))
+            if v is not None:
+                self.viscosity[d] = v
+            for comp in result.get('composition') or []:
+                classes, m = component_hazards(comp.get('classification'))
+                if not classes:
+                    continue
+                lo, hi = _num(comp.get('pourcentage_min')), _num(comp.get('pourcentage_max'))
+                if lo is None and hi is None:
+                    self.no_conc += 1
+                    continue
+                lo = hi if lo is None else lo
+                hi = lo if hi is None else hi
+                cmin.append(min(lo, hi))
+                cmax.append(max(lo, hi))
+                mfac.append(m)
+                rows.extend([k] * len(classes))
+                cols.extend(classes)
+                counts[d] += 1
+                k += 1
+        self.counts = counts
+        self.cmin = np.asarray(cmin, dtype=np.float64)
+        self.cmax = np.asarray(cmax, dtype=np.float64)
+        self.m = np.asarray(mfac, dtype=np.float64)
+        self.hazard = np.zeros((k, len(CLASSES)), dtype=bool)
+        self.hazard[np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)] = True
+
+    def __len__(self):
+        return len(self.results)
+
+    def _segments(self, values, op):
+        """Réduction par document (somme ou max) ; 0 pour les documents sans composant classé."""
+        out = np.zeros((len(self),) + values.shape[1:])
+        has = self.counts > 0
+        if has.any():
+            starts = np.concatenate(([0], np.cumsum(self.counts)[:-1]))[has]
+            # Réduction le long de l'axe contigu : les segments sont des lignes de values.T
+            out[has] = op.reduceat(np.ascontiguousarray(values.T), starts, axis=-1).T
+        return out
+
+    def screen(self):
+        """Matrices (documents × RULE_CODES) calculées aux bornes basse et haute, et valeurs."""
+        modes = np.array([r[1] == 'somme' for r in RULES])
+        thresholds = np.array([r[3] for r in RULES])
+
+        # Coefficient de chaque règle par composant, indépendant de la borne :
+        # valeur = concentration × max des poids de ses classes, le facteur M
+        # ne pondérant que les classes M_CLASSES des règles qui l'utilisent
+        coef = np.empty((len(self.hazard), len(RULES)))
+        for r, (_, _, classes, _, use_m) in enumerate(RULES):
+            cols = [CLASS_INDEX[name] for name in classes]
+            w = np.array(list(classes.values()), dtype=np.float64)
+            if use_m:
+                w = np.where([name in M_CLASSES for name in classes], self.m[:, None], 1.0) * w
+            coef[:, r] = (self.hazard[:, cols] * w).max(axis=1)
+
+        flammable = self._flammable()
+        calc, values = {}, {}
+        for bound, conc in (('min', self.cmin), ('max', self.cmax)):
+            per_comp = coef * conc[:, None]
+            # Une seule réduction par mode : somme ou maximum sur le segment du document
+            val = np.empty((len(self), len(RULES)))
+            val[:, modes] = self._segments(per_comp[:, modes], np.add)
+            val[:, ~modes] = self._segments(per_comp[:, ~modes], np.maximum)
+            hit = val >= thresholds - _EPS
+            hit[:, RULE_INDEX['H304']] &= ~(self.viscosity > ASPIRATION_VISCOSITY)
+            calc[bound] = np.concatenate([hit, flammable], axis=1)
+            values[bound] = val
+        return calc, values
+
+    def _flammable(self):
+        fp, bp = self.flash, self.boiling
+        low = fp < 23
+        return np.stack([low & (bp <= 35), low & ~(bp <= 35), (fp >= 23) & (fp <= 60)], axis=1)
+
+
+def _covered(matrix):
+    """Classes présentes ou couvertes par une classe plus sévère présente."""
+    covered = matrix.copy()
+    for code, severe in MORE_SEVERE.items():
+        i = RULE_INDEX[code]
+        for s in severe:
+            covered[:, i] |= matrix[:, RULE_INDEX[s]]
+    return covered
+
+
+def screen_results(results, all_docs=False):
+    """Contrôler une liste de résultats fds-parser ; retourne le rapport."""
+    t0 = time.perf_counter()
+    corpus = Corpus(results)
+    t_build = time.perf_counter() - t0
+    calc, values = corpus.screen()
+    declared = corpus.declared
+    covered = _covered(declared)
+
+    # Classes calculées sans celles qu'une classe plus sévère calculée remplace
+    reported = {}
+    for bound in ('min', 'max'):
+        shown = calc[bound].copy()
+        for code, severe in MORE_SEVERE.items():
+            for s in severe:
+                shown[:, RULE_INDEX[code]] &= ~calc[bound][:, RULE_INDEX[s]]
+        reported[bound] = shown
+    missing_sure = reported['min'] & ~covered
+    missing_maybe = reported['max'] & ~reported['min'] & ~covered
+    unjustified = declared & ~_covered(calc['max'])
+    t_screen = time.perf_counter() - t0 - t_build
+
+    docs = []
+    flagged = missing_sure.any(axis=1) | missing_maybe.any(axis=1)
+    n_rules = len(RULES)
+    for d in range(len(corpus)):
+        if not (all_docs or flagged[d] or unjustified[d].any()):
+            continue
+        result = results[d]
+        ident = result.get('identification') or {}
+
+        def detail(i, certitude):
+            code = RULE_CODES[i]
+            entry = {'code': code, 'certitude': certitude}
+            if i < n_rules:
+                entry.update({'regle': RULES[i][1], 'seuil': RULES[i][3],
+                              'valeur_min': round(float(values['min'][d, i]), 4),
+                              'valeur_max': round(float(values['max'][d, i]), 4)})
+            else:
+                entry['point_eclair_c'] = None if np.isnan(corpus.flash[d]) else float(corpus.flash[d])
+            return entry
+
+        docs.append({
+            'fichier': result.get('fichier'), 'pages': result.get('pages'),
+            'nom': ident.get('nom'), 'code': ident.get('code'), 'fournisseur': ident.get('fournisseur'),
+            'declarees': sorted(RULE_CODES[i] for i in np.flatnonzero(declared[d])),
+            'calculees': sorted(RULE_CODES[i] for i in np.flatnonzero(reported['max'][d])),
+            'manquantes': [detail(i, 'certaine') for i in np.flatnonzero(missing_sure[d])]
+                          + [detail(i, 'a_verifier') for i in np.flatnonzero(missing_maybe[d])],
+            'non_justifiees': [RULE_CODES[i] for i in np.flatnonzero(unjustified[d])],
+            'discordance': bool(flagged[d]),
+        })
+    return {
+        'documents': len(corpus),
+        'composants_classes': int(corpus.counts.sum()),
+        'composants_sans_concentration': corpus.no_conc,
+        'discordances': int(flagged.sum()),
+        'manquantes_certaines': {RULE_CODES[i]: int(n) for i, n in enumerate(missing_sure.sum(axis=0)) if n},
+        'manquantes_a_verifier': {RULE_CODES[i]: int(n) for i, n in enumerate(missing_maybe.sum(axis=0)) if n},
+        'non_justifiees': {RULE_CODES[i]: int(n) for i, n in enumerate(unjustified.sum(axis=0)) if n},
+        'resultats': docs,
+        '_meta': {'mise_a_plat_s': round(t_build, 3), 'controle_s': round(t_screen, 3)},
+    }
+
+
+# ── Vérification ────────────────────────────────────
+# Cas de non-régression : (libellé, classification, concentration %, codes
+# attendus, codes exclus) pour un document à un seul composant
+VERIFICATIONS = (
+    ('corrosif 2 % : H319 sans H318', 'Skin Corr. 1B, H314; Eye Dam. 1, H318', 2.0, ('H319',), ('H318', 'H314')),
+    ('sensibilisant 1A sous 0,1 %', 'Skin Sens. 1A, H317', 0.095, (), ('H317',)),
+    ('sensibilisant 1A à 0,1 %', 'Skin Sens. 1A, H317', 0.1, ('H317',), ()),
+    ('facteur M 10 : H400 dès 2,5 %', 'Aquatic Acute 1, H400 (M=10)', 2.5, ('H400',), ()),
+)
+
+
+def verify():
+    """Rejouer VERIFICATIONS ; liste des écarts (vide si tout passe)."""
+    results = [{'fichier': label, 'composition': [
+        {'classification': cls, 'pourcentage_min': pct, 'pourcentage_max': pct}]}
+        for label, cls, pct, _, _ in VERIFICATIONS]
+    calc, _ = Corpus(results).screen()
+    failures = []
+    for d, (label, _, _, expected, excluded) in enumerate(VERIFICATIONS):
+        got = {RULE_CODES[i] for i in np.flatnonzero(calc['min'][d])}
+        if not set(expected) <= got or got & set(excluded):
+            failures.append({'cas': label, 'attendues': list(expected), 'exclues': list(excluded),
+                             'calculees': sorted(got)})
+    return failures
+
+
+def load_results(path):
+    """Résultats fds-parser : liste, {"resultats": [...]}, NDJSON ou base SQLite --store."""
+    with open(path, 'rb') as f:
+        magic = f.read(16)
+    if magic.startswith(b'SQLite format 3'):
+        import sqlite3
+        conn = sqlite3.connect(path)
+        try:
+            return [json.loads(r) for (r,) in conn.execute('SELECT resultat FROM documents ORDER BY id')]
+        finally:
+            conn.close()
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        raw = json.loads(text)
+    except json.JSONDecodeError:
+        raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(raw, dict):
+        raw = raw.get('resultats') or [raw]
+    return [r for r in raw if isinstance(r, dict)]
+
+
+def _option(name, default=None):
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+def main():
+    if '--verifier' in sys.argv:
+        failures = verify()
+        print(json.dumps({'success': not failures, 'cas': len(VERIFICATIONS), 'echecs': failures},
+                         ensure_ascii=False), flush=True)
+        sys.exit(1 if failures else 0)
+    output = _option('--output')
+    sources = [a for a in sys.argv[1:] if not a.startswith('--') and a != output]
+    if not sources:
+        print("Usage: python3 clp-screening.py <resultats.json|.ndjson|base.db> ... [--output rapport.json] [--tous]")
+        sys.exit(1)
+    t0 = time.perf_counter()
+    try:
+        results = [r for src in sources for r in load_results(src)]
+    except (OSError, ValueError) as e:
+        print(json.dumps({'event': 'error', 'erreur': str(e)}, ensure_ascii=False), flush=True)
+        sys.exit(1)
+    t_load = time.perf_counter() - t0
+    report = screen_results(results, all_docs='--tous' in sys.argv)
+    report['_meta']['chargement_s'] = round(t_load, 3)
+    print(json.dumps({'event': 'done', 'documents': report['documents'], 'discordances': report['discordances'],
+                      'duree_s': round(time.perf_counter() - t0, 3)}, ensure_ascii=False), flush=True)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
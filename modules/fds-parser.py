@@ -5,9 +5,53 @@ Multi-format : CPL Aromas (FR), Technico-Flor (EN), IFF, Givaudan, generic
 Controle de doublons integre.
 
 Usage : python3 fds-parser.py <fichier.pdf | dossier> [--output fichier.json]
+        [--workers N] [--ocr-workers N] [--fields composition,identification,...]
+        [--shard i/n]
+        python3 fds-parser.py <inbox/> --watch [--output f.ndjson] [--done dossier]
+        python3 fds-parser.py merge <shard1.json> <shard2.json> ... [--output fichier.json]
+        python3 fds-parser.py query <base.db> [--cas X [--min-pct N]] [--fournisseur F]
+        [--code C] [--nom N] [--h H317]
+        python3 fds-parser.py import <base.db> <resultats.json|.ndjson> ...
+        python3 fds-parser.py near-dupes <resultats.json|.ndjson> ... [--index idx.json]
+        [--threshold 0.7] [--output grappes.json]
+        python3 fds-parser.py export <resultats.json|.ndjson|base.db> ... --dir dossier
+        [--format auto|csv|parquet] [--chunk 50000]
+
+--store base.db : résultats enregistrés aussi dans une base SQLite (WAL),
+tables indexées documents / composants / phrases H / propriétés, upsert par
+empreinte SHA-256 du PDF.
+
+--pattern-stats motifs.json : compteurs par motif du registre PATTERNS
+(appels, succès, durée cumulée sur le lot, workers compris), triés par coût.
+
+--near-dupes idx.json : index MinHash/LSH incrémental des compositions
+(CAS, tranche de concentration) ; chaque nouvelle fiche proche d'une fiche
+déjà indexée (Jaccard >= 0,7) émet un événement 'near_duplicate'. En --watch,
+l'index est réécrit toutes les 60 s ou 500 fiches, et à l'arrêt.
+
+Classeurs : un PDF de plusieurs FDS concaténées (nouvel en-tête de Section 1,
+Identification) est découpé par plages de pages ; un résultat par produit,
+portant 'pages' = [première, dernière], en parallèle au-delà de 3 produits.
+
+export : documents, composants et phrases H en tables typées séparées
+(documents/composants/phrases_h, clé doc_id) pour pandas ou DuckDB ; Parquet
+si pyarrow est installé, sinon CSV + <table>.schema.json. Lecture en flux
+et écriture par blocs : mémoire constante sur toute l'archive.
+
+--metrics base [--metrics-interval 60] : métriques du lot ou de la
+surveillance dans base.prom (format texte Prometheus) et base.json (résumé) :
+taux d'OCR, profondeur de cascade du repli texte, branche de detect_format(),
+erreurs par fournisseur, percentiles de latence par voie. Réécrites toutes
+les N secondes en mode --watch et en cours de lot.
+
+--ocr-cache ocr.db [--ocr-cache-mb 256] : texte OCR gardé par page (clé :
+empreinte des pixels rendus, zoom, langue et configuration tesseract) dans
+une base SQLite partagée par les workers, éviction LRU au-delà de la taille
+maximale ; les pages déjà vues (rubriques types, annexes) évitent tesseract.
 """
 
-import sys, os, json, re, glob
+import sys, os, json, re, glob, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 try:
     import fitz
@@ -15,10 +59,119 @@ except ImportError:
     print("ERREUR: PyMuPDF requis. pip install pymupdf", file=sys.stderr)
     sys.exit(1)
 
+# ── Registre des expressions régulières ──────────────
+# Toutes les expressions des chemins chauds sont compilées une fois, à
+# l'import, sous un nom stable. Compteurs optionnels par motif (appels,
+# succès, durée) : PATTERNS.enable_stats() remplace les méthodes de chaque
+# motif par des versions chronométrées ; désactivés, ce sont les méthodes
+# du re.Pattern compilé, sans surcoût.
+
+_PATTERN_METHODS = ('search', 'match', 'fullmatch', 'findall', 'finditer', 'sub', 'split')
+
+
+class _Pattern:
+    """Expression compilée et nommée ; mêmes méthodes qu'un re.Pattern."""
+    __slots__ = ('name', 'regex', 'pattern', 'flags', 'calls', 'hits', 'seconds') + _PATTERN_METHODS
+
+    def __init__(self, name, regex):
+        self.name = name
+        self.regex = regex
+        self.pattern = regex.pattern
+        self.flags = regex.flags
+        self.calls = self.hits = 0
+        self.seconds = 0.0
+        self.bind(False)
+
+    def bind(self, tracked):
+        for meth in _PATTERN_METHODS:
+            setattr(self, meth, self._tracked(meth) if tracked else getattr(self.regex, meth))
+
+    def _tracked(self, meth):
+        perf = time.perf_counter
+        raw = self.regex.subn if meth == 'sub' else getattr(self.regex, meth)
+
+        def call(*args, **kwargs):
+            t0 = perf()
+            res = raw(*args, **kwargs)
+            if meth == 'finditer':
+                res = list(res)
+            self.seconds += perf() - t0
+            self.calls += 1
+            if meth == 'sub':
+                res, n = res
+                self.hits += n > 0
+                return res
+            self.hits += (len(res) > 1) if meth == 'split' else bool(res)
+            return iter(res) if meth == 'finditer' else res
+        return call
+
+
+class PatternRegistry:
+    """Motifs nommés compilés à l'import, compteurs par motif à la demande."""
+
+    def __init__(self):
+        self.entries = {}
+        self.tracking = False
+
+    def add(self, name, pattern, flags=0):
+        if name in self.entries:
+            raise ValueError(f'Motif déjà enregistré : {name}')
+        entry = _Pattern(name, re.compile(pattern, flags))
+        if self.tracking:
+            entry.bind(True)
+        self.entries[name] = entry
+        return entry
+
+    def group(self, name, patterns, flags=0):
+        """Liste ordonnée de motifs 'nom[i]' ; éléments : motif ou (motif, flags)."""
+        return [self.add(f'{name}[{i}]', *(p if isinstance(p, tuple) else (p, flags)))
+                for i, p in enumerate(patterns)]
+
+    def enable_stats(self):
+        self.tracking = True
+        for entry in self.entries.values():
+            entry.bind(True)
+
+    def reset_stats(self):
+        for entry in self.entries.values():
+            entry.calls = entry.hits = 0
+            entry.seconds = 0.0
+
+    def snapshot(self):
+        """Compteurs non nuls {nom: (appels, succès, secondes)} — transfert worker → parent."""
+        return {n: (e.calls, e.hits, e.seconds) for n, e in self.entries.items() if e.calls}
+
+    def merge(self, snapshot):
+        for name, (calls, hits, seconds) in (snapshot or {}).items():
+            entry = self.entries.get(name)
+            if entry is not None:
+                entry.calls += calls
+                entry.hits += hits
+                entry.seconds += seconds
+
+    def stats(self):
+        """Rapport trié par coût décroissant ; les motifs jamais gagnants restent visibles."""
+        rows = [{'nom': e.name, 'motif': e.pattern, 'appels': e.calls, 'succes': e.hits,
+                 'taux_succes': round(e.hits / e.calls, 4) if e.calls else None,
+                 'duree_ms': round(e.seconds * 1000, 3),
+                 'cout_moyen_us': round(e.seconds * 1e6 / e.calls, 2) if e.calls else None}
+                for e in self.entries.values()]
+        rows.sort(key=lambda r: (-r['duree_ms'], r['nom']))
+        return rows
+
+
+PATTERNS = PatternRegistry()
+
 # ── Utils ─────────────────────────────────────────────
 
-RE_CAS = re.compile(r'(\d{2,7}-\d{2}-\d)')
-RE_EINECS = re.compile(r'(\d{3}-\d{3}-\d)')
+RE_CAS = PATTERNS.add('cas', r'(\d{2,7}-\d{2}-\d)')
+RE_EINECS = PATTERNS.add('einecs', r'(\d{3}-\d{3}-\d)')
+_RE_CAS_DATE = PATTERNS.add('cas.date', r'^(19|20)\d{2}')
+
+# Diagnostic du dernier parse_fds() de ce processus (OCR, voie de composition,
+# profondeur de cascade, format détecté) : lu par les workers pour les métriques
+# de lot, jamais écrit dans le résultat JSON.
+_TRACE = {}
 
 def validate_cas_checkdigit(cas_str):
     """Vérifier le check digit d'un numéro CAS.
@@ -52,22 +205,22 @@ def is_valid_cas(cas_str):
     if not validate_cas_checkdigit(cas_str):
         return False
     # Exclure les CAS connus comme faux (dates, codes)
-    if re.match(r'^(19|20)\d{2}', cas_str):
+    if _RE_CAS_DATE.match(cas_str):
         return False
     return True
 
 # Patterns de noms parasites (GHS, headers, réglementaire)
-_BAD_NAME_RE = [
-    re.compile(r'^CAS\s+\d', re.IGNORECASE),
-    re.compile(r'^(FICHE|SAFETY\s+DATA|RUBRIQUE|SECTION)\b', re.IGNORECASE),
-    re.compile(r'^(Skin\s|Eye\s|Flam\.|Aquatic|Acute\s|STOT\s|Asp\.\s|Repr\.)', re.IGNORECASE),
-    re.compile(r'^(Facteur\s|Information\s|Rapport\s|règlement)', re.IGNORECASE),
-    re.compile(r'^(EINECS|Page\s+\d|\[Page|Version\s|Date\s)', re.IGNORECASE),
-    re.compile(r'^\?$'),
-    re.compile(r'^-ONE\s'),
-    re.compile(r'H\d{3}'),  # H-codes = classification GHS
-    re.compile(r'^\d+\s*/\s*\d+$'),  # "3 / 7" page numbers
-]
+_BAD_NAME_RE = PATTERNS.group('nom_parasite', [
+    (r'^CAS\s+\d', re.IGNORECASE),
+    (r'^(FICHE|SAFETY\s+DATA|RUBRIQUE|SECTION)\b', re.IGNORECASE),
+    (r'^(Skin\s|Eye\s|Flam\.|Aquatic|Acute\s|STOT\s|Asp\.\s|Repr\.)', re.IGNORECASE),
+    (r'^(Facteur\s|Information\s|Rapport\s|règlement)', re.IGNORECASE),
+    (r'^(EINECS|Page\s+\d|\[Page|Version\s|Date\s)', re.IGNORECASE),
+    r'^\?$',
+    r'^-ONE\s',
+    r'H\d{3}',  # H-codes = classification GHS
+    r'^\d+\s*/\s*\d+$',  # "3 / 7" page numbers
+])
 
 def is_valid_component_name(name):
     """Vérifie qu'un nom de composant n'est pas un artefact de parsing."""
@@ -79,12 +232,172 @@ def is_valid_component_name(name):
     return True
 
 
-def extract_text(pdf_path):
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc:
-        text += page.get_text() + "\n"
-    doc.close()
+# Texte brut par page du dernier PDF lu (clé : chemin, taille, mtime) : le
+# découpage en produits, la recherche de la Section 3 (XY) et extract_text()
+# ne relisent pas les mêmes pages
+_PAGE_CACHE = [None, None, {}]   # clé, nombre de pages, {numéro: texte}
+
+
+def page_texts(pdf_path, first=0, last=None, doc=None):
+    """Textes des pages [first, last) ; ``doc`` : document déjà ouvert (facultatif)."""
+    st = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), st.st_size, st.st_mtime_ns)
+    if _PAGE_CACHE[0] != key:
+        _PAGE_CACHE[:] = [key, None, {}]
+    count, cached = _PAGE_CACHE[1], _PAGE_CACHE[2]
+    stop = last if count is None else min(count if last is None else last, count)
+    if count is None or any(p not in cached for p in range(first, stop)):
+        opened = doc is None
+        if opened:
+            doc = fitz.open(pdf_path)
+        count = _PAGE_CACHE[1] = len(doc)
+        stop = min(count if last is None else last, count)
+        for p in range(first, stop):
+            if p not in cached:
+                cached[p] = doc[p].get_text()
+        if opened:
+            doc.close()
+    return [cached[p] for p in range(first, stop)]
+
+
+# ── Cache OCR par page (--ocr-cache) ────────────────
+# Les pages communes à beaucoup de FDS (rubriques 4 à 16 types, pages de
+# garde, annexes réglementaires) ne repassent pas par tesseract : le texte
+# OCR est gardé sur disque, clé = SHA-256 des pixels rendus + zoom + langue
+# et configuration tesseract. Base SQLite en WAL partagée par tous les
+# workers (verrous SQLite, une connexion par processus), éviction LRU au-delà
+# de la taille maximale. Chemin et taille passent aux workers par
+# l'environnement (FDS_OCR_CACHE, FDS_OCR_CACHE_MB), quel que soit le mode de
+# démarrage des processus.
+
+OCR_ZOOM = 2.5            # rendu 2,5x pour la précision de l'OCR
+OCR_LANG = 'fra+eng'
+OCR_CONFIG = '--psm 6'    # segmentation : bloc de texte
+OCR_CACHE_MB = 256
+OCR_CACHE_TOUCH = 300.0   # s : date d'accès rafraîchie au plus une fois par intervalle
+OCR_CACHE_KEEP = 0.9      # après éviction, taille ramenée à 90 % du maximum
+
+OCR_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_pages (
+    cle TEXT PRIMARY KEY,
+    texte TEXT NOT NULL,
+    octets INTEGER NOT NULL,
+    acces REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_pages_acces ON ocr_pages(acces);
+"""
+
+
+class OcrCache:
+    """Texte OCR par page, sur disque. Une erreur SQLite (base verrouillée
+    au-delà du délai, disque plein) n'interrompt jamais l'OCR : la page est
+    simplement traitée comme absente du cache."""
+
+    def __init__(self, path, max_mb=OCR_CACHE_MB):
+        import sqlite3
+        self.path = path
+        self.max_bytes = int(max_mb * 1048576)
+        self.errors = sqlite3.Error
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(OCR_CACHE_SCHEMA)
+
+    @staticmethod
+    def key(pix, zoom=OCR_ZOOM, lang=OCR_LANG, config=OCR_CONFIG):
+        import hashlib
+        h = hashlib.sha256(f'{pix.width}x{pix.height}x{pix.n}|{zoom}|{lang}|{config}|'.encode())
+        h.update(pix.samples_mv if hasattr(pix, 'samples_mv') else pix.samples)
+        return h.hexdigest()
+
+    def get(self, key):
+        try:
+            row = self.conn.execute('SELECT texte, acces FROM ocr_pages WHERE cle = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > OCR_CACHE_TOUCH:
+                self.conn.execute('UPDATE ocr_pages SET acces = ? WHERE cle = ?', (now, key))
+            return row[0]
+        except self.errors:
+            return None
+
+    def put(self, key, text):
+        """Enregistrer une page, puis évincer les moins récemment lues si la
+        taille maximale est dépassée (même transaction : les autres workers
+        voient un cache cohérent)."""
+        try:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute('INSERT OR REPLACE INTO ocr_pages (cle, texte, octets, acces) VALUES (?, ?, ?, ?)',
+                                  (key, text, len(text.encode('utf-8')), time.time()))
+                total = self.conn.execute('SELECT COALESCE(SUM(octets), 0) FROM ocr_pages').fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - int(self.max_bytes * OCR_CACHE_KEEP)
+                    evict = []
+                    for cle, octets in self.conn.execute('SELECT cle, octets FROM ocr_pages ORDER BY acces'):
+                        if excess <= 0:
+                            break
+                        evict.append((cle,))
+                        excess -= octets
+                    self.conn.executemany('DELETE FROM ocr_pages WHERE cle = ?', evict)
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+        except self.errors:
+            pass
+
+    def stats(self):
+        pages, octets = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(octets), 0) FROM ocr_pages').fetchone()
+        return {'pages': pages, 'octets': octets, 'max_octets': self.max_bytes}
+
+
+_OCR_CACHE = [None, None]   # pid, OcrCache : jamais partagé entre processus
+
+
+def ocr_cache():
+    """Cache OCR de ce processus (FDS_OCR_CACHE), ou None s'il est désactivé."""
+    path = os.environ.get('FDS_OCR_CACHE')
+    if not path:
+        return None
+    pid, cache = _OCR_CACHE
+    if cache is None or pid != os.getpid() or cache.path != path:
+        try:
+            cache = OcrCache(path, float(os.environ.get('FDS_OCR_CACHE_MB') or OCR_CACHE_MB))
+        except Exception:
+            return None
+        _OCR_CACHE[:] = [os.getpid(), cache]
+    return cache
+
+
+def ocr_page(page, cache=None):
+    """Texte OCR d'une page ; avec ``cache``, une page déjà vue (mêmes
+    pixels, même rendu, même configuration) coûte un rendu et une empreinte
+    au lieu d'un passage tesseract. Retourne (texte, trouvée en cache)."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(OCR_ZOOM, OCR_ZOOM))
+    key = OcrCache.key(pix) if cache is not None else None
+    if key is not None:
+        text = cache.get(key)
+        if text is not None:
+            return text, True
+    from PIL import Image
+    import pytesseract
+    img = Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
+    text = pytesseract.image_to_string(img, lang=OCR_LANG, config=OCR_CONFIG)
+    if key is not None:
+        cache.put(key, text)
+    return text, False
+
+
+def extract_text(pdf_path, max_pages=None, pages=None):
+    """Texte du PDF (OCR en secours). ``max_pages`` limite l'extraction aux
+    premières pages — utilisé par les parsings sélectifs (--fields) ;
+    ``pages`` = (début, fin exclue) restreint à un produit d'un classeur."""
+    first, last = pages or (0, None)
+    if max_pages is not None:
+        last = first + max_pages if last is None else min(last, first + max_pages)
+    text = ''.join(t + "\n" for t in page_texts(pdf_path, first, last))
     
     # Detect garbled text (CID fonts, control chars) — fallback to OCR
     printable_ratio = sum(1 for c in text[:500] if c.isprintable() or c in '\n\r\t') / max(len(text[:500]), 1)
@@ -94,163 +407,332 @@ def extract_text(pdf_path):
     need_ocr = False
     if printable_ratio < 0.5 or (len(text) > 200 and not has_cas and text.count('\x00') > 10):
         need_ocr = True
-    elif len(text) > 500 and cas_count < 2:
+    elif len(text) > 500 and cas_count < 2 and max_pages is None:
         # Le texte semble OK mais très peu de CAS trouvés — tableaux mal extraits ?
-        # Tenter OCR en complément
+        # Tenter OCR en complément (inutile sur un extrait partiel sans Section 3)
         need_ocr = True
     
     if need_ocr:
         try:
-            from PIL import Image
-            import pytesseract
+            cache = ocr_cache()
             doc = fitz.open(pdf_path)
             ocr_text = ""
-            for page in doc:
-                mat = fitz.Matrix(2.5, 2.5)  # 2.5x zoom for better OCR accuracy
-                pix = page.get_pixmap(matrix=mat)
-                img = Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
-                # Use tesseract with French + English, page segmentation mode 6 (block of text)
-                page_text = pytesseract.image_to_string(img, lang='fra+eng', config='--psm 6')
+            for pnum in range(first, len(doc) if last is None else min(last, len(doc))):
+                page_text, hit = ocr_page(doc[pnum], cache)
+                if cache is not None:
+                    k = 'ocr_cache_hits' if hit else 'ocr_cache_misses'
+                    _TRACE[k] = _TRACE.get(k, 0) + 1
                 ocr_text += page_text + "\n"
             doc.close()
             ocr_cas_count = len(RE_CAS.findall(ocr_text))
+            _TRACE['ocr_tente'] = True
+            if max_pages is not None and ocr_text.strip():
+                _TRACE['ocr'] = True
+                return ocr_text  # Extrait partiel illisible — pas de CAS à comparer
             if ocr_cas_count > cas_count:
+                _TRACE['ocr'] = True
                 return ocr_text  # OCR found more CAS — use it
             elif ocr_cas_count > 0 and cas_count == 0:
+                _TRACE['ocr'] = True
                 return ocr_text
         except Exception as e:
             pass  # OCR not available
     
     return text
 
+# Titres de rubriques 1 à 16, compilés une fois pour toutes
+_RE_SECTION_NUMERO = {n: PATTERNS.add(f'section.numero[{n}]', rf'^{n}\.\s+[A-Z]{{3,}}', re.MULTILINE)
+                      for n in range(1, 17)}
+_RE_SECTION_TITRE = {n: PATTERNS.add(f'section.titre[{n}]', rf'(?:SECTION|RUBRIQUE)\s*0?{n}\s*[:\.\s]', re.IGNORECASE)
+                     for n in range(1, 17)}
+# En-tête de rubrique en début de ligne (pas un renvoi « voir section 3 »)
+_RE_SECTION_ENTETE = {n: PATTERNS.add(f'section.entete[{n}]', rf'^\s*(?:SECTION|RUBRIQUE)\s*0?{n}\s*[:.\-\s]',
+                                      re.IGNORECASE | re.MULTILINE)
+                      for n in (2, 3)}
+_RE_SECTION_MODIFIEE = PATTERNS.add('section.modifiee', r'modifi|mise\s*à\s*jour|updated|changed', re.IGNORECASE)
+# Repli : marqueurs de contenu, ex. "Composants dangereux" (3), "Propriétés physi" (9)
+_RE_SECTION_DEBUT = {
+    3: PATTERNS.add('section.debut[3]', r'omposants\s+dangereux\s*:', re.IGNORECASE),
+    9: PATTERNS.add('section.debut[9]', r'ropri.t.s\s+physi', re.IGNORECASE),
+}
+_RE_SECTION_FIN = {
+    3: PATTERNS.add('section.fin[3]', r'(?:RUBRIQUE|SECTION)\s*0?4|remiers\s+secours', re.IGNORECASE),
+    9: PATTERNS.add('section.fin[9]', r'(?:RUBRIQUE|SECTION)\s*0?10|tabilit', re.IGNORECASE),
+}
+
+
+# Dernier texte découpé et ses sections : routage, identification et
+# propriétés relisent la Section 1 sans refaire la recherche des en-têtes
+_SECTION_CACHE = [None, {}]
+
+
 def get_section(text, start, end):
+    """Section ``start`` à ``end`` ; mémoïsée tant que ``text`` est le même objet."""
+    if _SECTION_CACHE[0] is not text:
+        _SECTION_CACHE[0], _SECTION_CACHE[1] = text, {}
+    sections = _SECTION_CACHE[1]
+    key = (start, end)
+    if key not in sections:
+        sections[key] = _find_section(text, start, end)
+    return sections[key]
+
+
+def _find_section(text, start, end):
     """Extract section handling SECTION (EN), RUBRIQUE (FR), and bare number headers (Jean Niel: '3. COMPOSITION')."""
     # Strategy: try bare number headers FIRST (most reliable), then SECTION/RUBRIQUE
     
     # 1. Bare number headers like "3.  COMPOSITION" or "9.  PROPRIETES" (most reliable)
-    p1b = rf'^{start}\.\s+[A-Z]{{3,}}'
-    p2b = rf'^{end}\.\s+[A-Z]{{3,}}'
-    m1b = re.search(p1b, text, re.MULTILINE)
-    m2b = re.search(p2b, text, re.MULTILINE)
+    m1b = _RE_SECTION_NUMERO[start].search(text)
+    m2b = _RE_SECTION_NUMERO[end].search(text)
     if m1b and m2b: return text[m1b.start():m2b.start()]
     if m1b: return text[m1b.start():]
     
     # 2. SECTION/RUBRIQUE headers (exclude "modifiée/modified/mise à jour" mentions)
-    p1 = rf'(?:SECTION|RUBRIQUE)\s*0?{start}\s*[:\.\s]'
-    p2 = rf'(?:SECTION|RUBRIQUE)\s*0?{end}\s*[:\.\s]'
-    matches1 = list(re.finditer(p1, text, re.IGNORECASE))
-    matches2 = list(re.finditer(p2, text, re.IGNORECASE))
+    matches1 = _RE_SECTION_TITRE[start].finditer(text)
+    matches2 = _RE_SECTION_TITRE[end].finditer(text)
     # Filter out "Section X modifiée/modified" mentions
-    skip_re = re.compile(r'modifi|mise\s*à\s*jour|updated|changed', re.IGNORECASE)
     m1 = None
     for m in matches1:
         context = text[m.start():m.start()+60]
-        if not skip_re.search(context):
+        if not _RE_SECTION_MODIFIEE.search(context):
             m1 = m; break
     m2 = None
     for m in matches2:
         context = text[m.start():m.start()+60]
-        if not skip_re.search(context):
+        if not _RE_SECTION_MODIFIEE.search(context):
             m2 = m; break
     if m1 and m2: return text[m1.start():m2.start()]
     if m1: return text[m1.start():]
     
     # Last fallback: look for section content markers
-    # e.g. "Composants dangereux" for section 3, "Propriétés physi" for section 9
-    markers_start = {
-        3: r'omposants\s+dangereux\s*:',
-        9: r'ropri.t.s\s+physi'
-    }
-    markers_end = {
-        3: r'(?:RUBRIQUE|SECTION)\s*0?4|remiers\s+secours',
-        9: r'(?:RUBRIQUE|SECTION)\s*0?10|tabilit'
-    }
-    if start in markers_start:
-        m1c = re.search(markers_start[start], text, re.IGNORECASE)
+    if start in _RE_SECTION_DEBUT:
+        m1c = _RE_SECTION_DEBUT[start].search(text)
         if m1c:
             line_start = text.rfind('\n', 0, m1c.start()) + 1
-            if start in markers_end:
-                m2c = re.search(markers_end[start], text[m1c.end():], re.IGNORECASE)
+            if start in _RE_SECTION_FIN:
+                m2c = _RE_SECTION_FIN[start].search(text[m1c.end():])
                 if m2c: return text[line_start:m1c.end() + m2c.start()]
             return text[line_start:]
     
     return ""
 
 
+# ── Routage langue / famille fournisseur ─────────────
+# Les groupes de motifs d'identification et de propriétés mélangent variantes
+# FR, EN et propres à un fournisseur ; une fiche FR peut porter un libellé
+# EN (« Company : ») que la liste d'origine trouve en premier. L'ordre des
+# groupes n'est donc jamais changé : chaque motif est gardé par un ou
+# plusieurs mots-clés littéraux qu'il exige, et n'est pas essayé si aucun
+# n'apparaît dans la zone (test de sous-chaîne sur la zone en minuscules).
+# Le premier motif qui correspond reste celui de la liste complète. La
+# langue et la famille détectées (detect_route) alimentent la trace et les
+# métriques.
+
+# Indices de langue, cherchés en minuscules (passe unique sensible à la
+# casse, bien moins coûteuse que IGNORECASE) : groupe 1 = FR, groupe 2 = EN
+_RE_LANGUE = PATTERNS.add(
+    'route.langue',
+    r'\b(?:(fiche|donn[ée]es|s[ée]curit[ée]|produit|fournisseur|soci[ée]t[ée]|utilisations?|'
+    r'd[ée]nomination|identificat(?:eur|ion)\s+d[eu]|m[ée]lange|substance\s+ou)|'
+    r'(safety|data\s+sheet|product|supplier|company|mixture|identified|details|recommended|emergency))\b')
+
+# Mots-clés (minuscules) préalables aux motifs _SUPPLIER_HINTS : test de
+# sous-chaîne quasi gratuit, le motif du triage ne tourne que s'il passe.
+# Fournisseur absent de la table : motif toujours essayé.
+_FAMILLE_MOTS = {
+    'Givaudan': ('givaudan',),
+    'IFF': ('flavors', 'iff'),
+    'Robertet': ('robertet',),
+    'Charabot': ('charabot',),
+    'Jean Niel': ('niel',),
+    'CPL Aromas': ('aromas',),
+    'Technico-Flor': ('technico', 'infodyne'),
+    'PCW': ('pcw', 'expressions'),
+    'APA': ('apa', 'creasens'),
+}
+
+ROUTE_LANGUE_ZONE = 600   # titre et premières lignes de Section 1
+ROUTE_ZONE = 3000         # Section 1 examinée pour la famille
+
+
+def detect_route(s1):
+    """(langue, famille) d'une fiche d'après sa Section 1 ; None si indécis.
+
+    Langue 'fr' ou 'en' quand une langue domine nettement (au moins 2 indices
+    et deux fois plus que l'autre) ; famille = premier fournisseur des
+    indices du triage (_SUPPLIER_HINTS) reconnu dans la zone.
+    """
+    zone = s1[:ROUTE_ZONE]
+    low = zone.lower()
+    fr = en = 0
+    for m in _RE_LANGUE.finditer(low, 0, ROUTE_LANGUE_ZONE):
+        if m.lastindex == 1:
+            fr += 1
+        else:
+            en += 1
+    langue = None
+    if fr >= 2 and fr >= 2 * en:
+        langue = 'fr'
+    elif en >= 2 and en >= 2 * fr:
+        langue = 'en'
+    famille = None
+    for nom, pat, _ in _SUPPLIER_HINTS:
+        mots = _FAMILLE_MOTS.get(nom)
+        if (mots is None or any(k in low for k in mots)) and pat.search(zone):
+            famille = nom
+            break
+    return langue, famille
+
+
+class PatternGuard:
+    """Groupe ordonné de motifs, chacun gardé par ses mots-clés (minuscules,
+    au moins un présent dans toute correspondance ; vide = toujours essayé).
+    ``iter(low)`` donne, dans l'ordre d'origine, les motifs dont un mot-clé
+    figure dans ``low`` (zone en minuscules) : les motifs écartés ne peuvent
+    pas correspondre, le résultat est celui du groupe complet."""
+    __slots__ = ('patterns', 'keys')
+
+    def __init__(self, patterns, keys):
+        if len(patterns) != len(keys):
+            raise ValueError('Des mots-clés par motif attendus')
+        self.patterns = tuple(patterns)
+        self.keys = tuple((k,) if isinstance(k, str) else tuple(k) for k in keys)
+
+    def iter(self, low):
+        for pat, keys in zip(self.patterns, self.keys):
+            if not keys or any(k in low for k in keys):
+                yield pat
+
+
 # ── Section 1 : Identification (FR + EN) ─────────────
 
+# Labels exacts connus
+_FDS_LABELS = frozenset([
+    'NOM COMMERCIAL', 'NOM DE LA SUBSTANCE', 'NOM DE LA SUBSTANCE/MÉLANGE',
+    'NOM DE LA SUBSTANCE/MELANGE', 'NOM DU PRODUIT', 'NOM DU MÉLANGE',
+    'NOM DU MELANGE', 'PRODUCT NAME', 'TRADE NAME', 'SUBSTANCE NAME',
+    'IDENTIFICATION DU PRODUIT', 'IDENTIFICATION DE LA SUBSTANCE',
+    'IDENTIFICATION DE LA SOCIÉTÉ', 'IDENTIFICATION DE LA SOCIETE',
+    'IDENTIFICATION DE LA SOCIÉTÉ/ENTREPRISE', 'IDENTIFICATION DE LA SOCIETE/ENTREPRISE',
+    'IDENTIFICATEUR DE PRODUIT', 'DÉNOMINATION COMMERCIALE',
+    'DENOMINATION COMMERCIALE', 'RÉFÉRENCE COMMERCIALE', 'REFERENCE COMMERCIALE',
+    'COMPANY', 'FOURNISSEUR', 'PRODUCTEUR', 'FABRICANT', 'MANUFACTURER',
+    'SUPPLIER', 'RAISON SOCIALE', 'SOCIÉTÉ', 'SOCIETE',
+    'SECTION 1', 'SECTION 2', 'SECTION 3',
+    'FICHE DE DONNÉES DE SÉCURITÉ', 'FICHE DE DONNEES DE SECURITE',
+    'SAFETY DATA SHEET', 'MATERIAL SAFETY DATA SHEET',
+    'DÉTAILS DU FOURNISSEUR', 'DETAILS DU FOURNISSEUR',
+    'RENSEIGNEMENTS CONCERNANT', 'COORDONNÉES DU FOURNISSEUR',
+    'COORDONNEES DU FOURNISSEUR',
+    'COULEUR LIQUIDE POUR BOUGIES',
+])
+# Patterns de labels (contiennent des mots-clés de structure FDS)
+_RE_FDS_LABEL = PATTERNS.group('label_fds', [
+    r'^SECTION\s+\d',
+    r'^IDENTIFICATION\s+DE\s+(LA|LE|L)',
+    r'^RUBRIQUE\s+\d',
+    r'^NOM\s+(DE\s+LA|DU|COMMERCIAL)',
+    r'^DÉNOMINATION',
+    r'^DENOMINATION',
+    r'^FICHE\s+DE\s+DONN',
+    r'^SAFETY\s+DATA',
+    r'^DETAILS?\s+(OF|DU|DE)',
+    r'^[ÉE]DIT[ÉE]E?\s+LE',
+    r'^DATE\s+D',
+    r'^R[ÉE]VISION',
+    r'^VERSION\s+\d',
+    r'^PAGE\s+\d',
+    r'^\d{2}/\d{2}/\d{4}',
+    r'^COULEUR\s+LIQUIDE',
+])
+
+
 def is_fds_label(text):
     """Détecte si le texte est un label/titre de section FDS et non une vraie valeur."""
     t = text.strip().upper()
-    # Labels exacts connus
-    labels = [
-        'NOM COMMERCIAL', 'NOM DE LA SUBSTANCE', 'NOM DE LA SUBSTANCE/MÉLANGE',
-        'NOM DE LA SUBSTANCE/MELANGE', 'NOM DU PRODUIT', 'NOM DU MÉLANGE',
-        'NOM DU MELANGE', 'PRODUCT NAME', 'TRADE NAME', 'SUBSTANCE NAME',
-        'IDENTIFICATION DU PRODUIT', 'IDENTIFICATION DE LA SUBSTANCE',
-        'IDENTIFICATION DE LA SOCIÉTÉ', 'IDENTIFICATION DE LA SOCIETE',
-        'IDENTIFICATION DE LA SOCIÉTÉ/ENTREPRISE', 'IDENTIFICATION DE LA SOCIETE/ENTREPRISE',
-        'IDENTIFICATEUR DE PRODUIT', 'DÉNOMINATION COMMERCIALE',
-        'DENOMINATION COMMERCIALE', 'RÉFÉRENCE COMMERCIALE', 'REFERENCE COMMERCIALE',
-        'COMPANY', 'FOURNISSEUR', 'PRODUCTEUR', 'FABRICANT', 'MANUFACTURER',
-        'SUPPLIER', 'RAISON SOCIALE', 'SOCIÉTÉ', 'SOCIETE',
-        'SECTION 1', 'SECTION 2', 'SECTION 3',
-        'FICHE DE DONNÉES DE SÉCURITÉ', 'FICHE DE DONNEES DE SECURITE',
-        'SAFETY DATA SHEET', 'MATERIAL SAFETY DATA SHEET',
-        'DÉTAILS DU FOURNISSEUR', 'DETAILS DU FOURNISSEUR',
-        'RENSEIGNEMENTS CONCERNANT', 'COORDONNÉES DU FOURNISSEUR',
-        'COORDONNEES DU FOURNISSEUR',
-        'COULEUR LIQUIDE POUR BOUGIES',
-    ]
-    if t in labels:
+    if t in _FDS_LABELS:
         return True
-    # Patterns de labels (contiennent des mots-clés de structure FDS)
-    label_patterns = [
-        r'^SECTION\s+\d',
-        r'^IDENTIFICATION\s+DE\s+(LA|LE|L)',
-        r'^RUBRIQUE\s+\d',
-        r'^NOM\s+(DE\s+LA|DU|COMMERCIAL)',
-        r'^DÉNOMINATION',
-        r'^DENOMINATION',
-        r'^FICHE\s+DE\s+DONN',
-        r'^SAFETY\s+DATA',
-        r'^DETAILS?\s+(OF|DU|DE)',
-        r'^[ÉE]DIT[ÉE]E?\s+LE',
-        r'^DATE\s+D',
-        r'^R[ÉE]VISION',
-        r'^VERSION\s+\d',
-        r'^PAGE\s+\d',
-        r'^\d{2}/\d{2}/\d{4}',
-        r'^COULEUR\s+LIQUIDE',
-    ]
-    for pat in label_patterns:
-        if re.match(pat, t):
+    for pat in _RE_FDS_LABEL:
+        if pat.match(t):
             return True
     return False
 
 
+_RE_IDENT_NOM_ENTETE = PATTERNS.add('identification.nom_entete', r'[ÉE]dit[ée]e?\s+le\s*:.*?\n\s*(.+?)\s*\n')
+_RE_IDENT_NOM_FICHE = PATTERNS.add(
+    'identification.nom_fiche', r'[Ff]iche\s+de\s+donn[ée]es\s+de\s+s[ée]curit[ée]\s*\n\s*(.+)')
+_RE_IDENT_CODE_ROBERTET = PATTERNS.add('identification.code_robertet', r'(G\s*\d{3}\s+\d{4,6})')
+_RE_IDENT_UFI = PATTERNS.add('identification.ufi', r'UFI\s*:?\s*([A-Z0-9\-]{19,})', re.IGNORECASE)
+_RE_DATE_DEBUT = PATTERNS.add('date_debut', r'^\d{2}/\d{2}/\d{4}')
+_RE_CHIFFRE_DEBUT = PATTERNS.add('chiffre_debut', r'^\d')
+_RE_PAGINATION = PATTERNS.add('identification.pagination', r'^\d+/\d+$')
+_RE_TELEPHONE = PATTERNS.add('identification.telephone', r'^\+?\d[\d\s()-]+$')
+# Nom de société seul : coupe à la virgule, au numéro, BP, Tel
+_RE_FOURNISSEUR_FIN = PATTERNS.add(
+    'identification.fournisseur_fin', r',\s*\d|,\s*BP|,\s*Tel|\s+\d{1,3}\s+(avenue|rue|boulevard)', re.IGNORECASE)
+# Date de révision, par ordre de priorité
+_RE_IDENT_DATE = PATTERNS.group('identification.date_revision', [
+    r'[Vv]ersion\s+[\d.]+\s*\((\d{2}/\d{2}/\d{4})\)',
+    r'[Dd]ate\s+de\s+r[ée]vision\s*[:\s]*(\d{2}/\d{2}/\d{4})',
+    r'[Rr]evision\s+[Dd]ate\s+(\d{1,2}\s+[A-Z]{3}\s+\d{4})',  # Givaudan: "25 JUN 2024"
+    r'[Rr][ée]vision\s*:\s*(\d{2}/\d{2}/\d{4})',  # Robertet: "Révision : 16/01/2019"
+    r'[Rr][ée]vision\s*:.*?du\s+(\d{2}/\d{2}/\d{4})',  # Jean Niel: "Revision : 001NEW-3-CLP du 11/04/2024"
+    r'[ÉE]dit[ée]\s+le\s*:\s*(\d{2}/\d{2}/\d{4})',  # Jean Niel: "Édité le : 11/04/2024"
+])
+_RE_IDENT_NOM = PATTERNS.group('identification.nom', [
+    r'Product\s+name\s*:\s*(.+)',
+    r'Trade\s+name\s*:\s*(.+)',
+    r'Nom\s+du\s+produit\s*:?\s*\n\s*•?\s*(.+)',      # Robertet: nom sur ligne suivante
+    r'Nom\s+du\s+produit\s*:\s*(.+)',                    # Standard: nom sur même ligne
+    r'[Dd][ée]nomination\s+commerciale\s*[:\s]*\n?\s*(.+)',
+    r'R[ée]f[ée]rence\s+commerciale\s*\n\s*:\s*\S+\s*\n\s*(.+)',  # Givaudan Standard: name on 2nd line after ref
+    r'commerciale\s*[:\s]*\n?\s*([A-Z][A-Z\s\-\'&]+)',
+    r'Sales\s+No\.\s*:\s*\S+\s*\n\s*(.+)',              # Givaudan
+    r'DESIGNATION\s*:\s*\n?\s*(.+)',                      # Robertet page continuation
+    r'[Ii]dentification\s+de\s+produit\s*\n\s*(.+)',     # Jean Niel: name after "Identification de produit"
+    r'[Ii]dentificateur\s+de\s+produit\s*\n\s*(.+)',    # APA: "Identificateur de produit\nCONCENTRE VIOLETTE..."
+    r'[Nn]om\s+[Cc]ommercial\s*:\s*\n?\s*(.+)',           # PCW: "Nom Commercial :\nPOUDRE DE RIZ RW"
+])
+_RE_IDENT_CODE = PATTERNS.group('identification.code', [
+    r'Product\s+code\s*:\s*(\S+)',
+    r'Trade\s+code\s*:\s*(\S+)',
+    r'Code\s+du\s+produit\s*:\s*(\S+)',
+    r'Code\s+commercial\s*[:\s]*([A-Z0-9\-]+)',
+    r'R[ée]f[ée]rence\s+commerciale\s*\n\s*:\s*(\S+)',  # Givaudan Standard: code on line after "Référence commerciale"
+    r'Sales\s+No\.\s*:\s*(\S+)',  # Givaudan
+], re.IGNORECASE)
+_RE_IDENT_FOURNISSEUR = PATTERNS.group('identification.fournisseur', [
+    r'Registered\s+company\s+name\s*:\s*(.+)',
+    r'supplier\s+of\s+the\s+safety\s+data\s+sheet\s*\n\s*(.+)',  # CPL EN: "Details of the supplier...\nCompany Name"
+    r'Raison\s+[Ss]ociale\s*:\s*(.+)',
+    r'Company\s*:\s*\n?\s*(.+)',
+    r'[Pp]roducteur/fournisseur\s*:\s*\n?\s*(.+)',      # Robertet
+    r'Soci[ée]t[ée]\s*\n\s*:\s*\n?\s*(.+)',              # Givaudan Standard: Société\n:\nCompany Name
+    r'[Ff]ournisseur\s*:\s+(\S.+)',                       # Same-line: "Fournisseur : SAS PCW"
+    r'(\S.+?)\s*\n\s*[Ff]ournisseur\s*:',                # PCW: name BEFORE "Fournisseur :"
+    r'fournisseur.*?\n\s*(.+)',
+], re.IGNORECASE)
+
+_GUARD_IDENT_DATE = PatternGuard(_RE_IDENT_DATE, ('ersion', 'vision', 'vision', 'vision', 'vision', 'dit'))
+_GUARD_IDENT_NOM = PatternGuard(_RE_IDENT_NOM, (
+    'product', 'trade', 'produit', 'produit', 'nomination', 'commerciale', 'commerciale', 'sales',
+    'designation', 'produit', 'produit', 'ommercial'))
+_GUARD_IDENT_CODE = PatternGuard(_RE_IDENT_CODE, ('product', 'trade', 'produit', 'commercial', 'commerciale', 'sales'))
+_GUARD_IDENT_FOURNISSEUR = PatternGuard(_RE_IDENT_FOURNISSEUR, (
+    'registered', 'supplier', 'sociale', 'company', 'fournisseur', 'soci', 'fournisseur', 'fournisseur',
+    'fournisseur'))
+
+
 def parse_identification(text):
     s1 = get_section(text, 1, 2)
+    s1_low = s1.lower()
     info = {}
 
     # Product name (EN: "Product name :", "Trade name :", FR: "Dénomination commerciale" or "Nom du produit")
     # Givaudan: name appears after "Sales No. : DR-xxxx\nPRODUCT NAME"
     # Robertet: "Nom du produit:\n• PRODUCT NAME" or "Nom du produit:\nPRODUCT NAME"
-    for pat in [
-        r'Product\s+name\s*:\s*(.+)',
-        r'Trade\s+name\s*:\s*(.+)',
-        r'Nom\s+du\s+produit\s*:?\s*\n\s*•?\s*(.+)',      # Robertet: nom sur ligne suivante
-        r'Nom\s+du\s+produit\s*:\s*(.+)',                    # Standard: nom sur même ligne
-        r'[Dd][ée]nomination\s+commerciale\s*[:\s]*\n?\s*(.+)',
-        r'R[ée]f[ée]rence\s+commerciale\s*\n\s*:\s*\S+\s*\n\s*(.+)',  # Givaudan Standard: name on 2nd line after ref
-        r'commerciale\s*[:\s]*\n?\s*([A-Z][A-Z\s\-\'&]+)',
-        r'Sales\s+No\.\s*:\s*\S+\s*\n\s*(.+)',              # Givaudan
-        r'DESIGNATION\s*:\s*\n?\s*(.+)',                      # Robertet page continuation
-        r'[Ii]dentification\s+de\s+produit\s*\n\s*(.+)',     # Jean Niel: name after "Identification de produit"
-        r'[Ii]dentificateur\s+de\s+produit\s*\n\s*(.+)',    # APA: "Identificateur de produit\nCONCENTRE VIOLETTE..."
-        r'[Nn]om\s+[Cc]ommercial\s*:\s*\n?\s*(.+)',           # PCW: "Nom Commercial :\nPOUDRE DE RIZ RW"
-    ]:
-        m = re.search(pat, s1)
+    for pat in _GUARD_IDENT_NOM.iter(s1_low):
+        m = pat.search(s1)
         if m:
             nom = m.group(1).strip().split('\n')[0].strip()
             if nom and len(nom) > 1 and not is_fds_label(nom): info['nom'] = nom; break
@@ -259,98 +741,81 @@ def parse_identification(text):
     # Many FDS put the product name prominently in the header
     if 'nom' not in info:
         # Look in full text for header pattern: "Éditée le : DATE    PRODUCT NAME    Révision :"
-        m = re.search(r'[ÉE]dit[ée]e?\s+le\s*:.*?\n\s*(.+?)\s*\n', text[:500])
+        m = _RE_IDENT_NOM_ENTETE.search(text[:500])
         if m:
             candidate = m.group(1).strip()
-            if candidate and len(candidate) > 2 and not candidate.startswith(('Fiche', 'Revision', '*')) and not re.match(r'^\d{2}/\d{2}/\d{4}', candidate) and not is_fds_label(candidate):
+            if candidate and len(candidate) > 2 and not candidate.startswith(('Fiche', 'Revision', '*')) and not _RE_DATE_DEBUT.match(candidate) and not is_fds_label(candidate):
                 info['nom'] = candidate
         # Also try: line after "Fiche de données de securité" 
         if 'nom' not in info:
-            m = re.search(r'[Ff]iche\s+de\s+donn[ée]es\s+de\s+s[ée]curit[ée]\s*\n\s*(.+)', text[:500])
+            m = _RE_IDENT_NOM_FICHE.search(text[:500])
             if m:
                 candidate = m.group(1).strip()
-                if candidate and len(candidate) > 2 and not re.match(r'^\d', candidate) and not is_fds_label(candidate):
+                if candidate and len(candidate) > 2 and not _RE_CHIFFRE_DEBUT.match(candidate) and not is_fds_label(candidate):
                     info['nom'] = candidate
 
     # Product code (EN: "Product code :", "Trade code :", FR: "Code du produit" or "Code commercial")
-    for pat in [
-        r'Product\s+code\s*:\s*(\S+)',
-        r'Trade\s+code\s*:\s*(\S+)',
-        r'Code\s+du\s+produit\s*:\s*(\S+)',
-        r'Code\s+commercial\s*[:\s]*([A-Z0-9\-]+)',
-        r'R[ée]f[ée]rence\s+commerciale\s*\n\s*:\s*(\S+)',  # Givaudan Standard: code on line after "Référence commerciale"
-        r'Sales\s+No\.\s*:\s*(\S+)',  # Givaudan
-    ]:
-        m = re.search(pat, s1, re.IGNORECASE)
+    for pat in _GUARD_IDENT_CODE.iter(s1_low):
+        m = pat.search(s1)
         if m: info['code'] = m.group(1).strip().rstrip('.'); break
     
     # Robertet: extract code from product name if pattern matches "NAME G NNN NNNNN"
     if 'code' not in info and 'nom' in info:
-        m = re.search(r'(G\s*\d{3}\s+\d{4,6})', info['nom'])
+        m = _RE_IDENT_CODE_ROBERTET.search(info['nom'])
         if m: info['code'] = m.group(1).replace('  ', ' ')
 
     # UFI
-    m = re.search(r'UFI\s*:?\s*([A-Z0-9\-]{19,})', s1, re.IGNORECASE)
+    m = _RE_IDENT_UFI.search(s1)
     if m: info['ufi'] = m.group(1).strip()
 
     # Supplier (EN: "Registered company name", FR: "fournisseur" or "Raison Sociale", Givaudan: "Company :", Robertet: "Producteur/fournisseur:\nNOM SA")
-    for pat in [
-        r'Registered\s+company\s+name\s*:\s*(.+)',
-        r'supplier\s+of\s+the\s+safety\s+data\s+sheet\s*\n\s*(.+)',  # CPL EN: "Details of the supplier...\nCompany Name"
-        r'Raison\s+[Ss]ociale\s*:\s*(.+)',
-        r'Company\s*:\s*\n?\s*(.+)',
-        r'[Pp]roducteur/fournisseur\s*:\s*\n?\s*(.+)',      # Robertet
-        r'Soci[ée]t[ée]\s*\n\s*:\s*\n?\s*(.+)',              # Givaudan Standard: Société\n:\nCompany Name
-        r'[Ff]ournisseur\s*:\s+(\S.+)',                       # Same-line: "Fournisseur : SAS PCW"
-        r'(\S.+?)\s*\n\s*[Ff]ournisseur\s*:',                # PCW: name BEFORE "Fournisseur :"
-        r'fournisseur.*?\n\s*(.+)',
-    ]:
-        m = re.search(pat, s1, re.IGNORECASE)
+    for pat in _GUARD_IDENT_FOURNISSEUR.iter(s1_low):
+        m = pat.search(s1)
         if m: 
             supplier = m.group(1).strip().rstrip('.')
             # Skip false positives: pagination (1/10), phone numbers, blank, FDS labels
-            if re.match(r'^\d+/\d+$', supplier) or re.match(r'^\+?\d[\d\s()-]+$', supplier) or len(supplier) < 3:
+            if _RE_PAGINATION.match(supplier) or _RE_TELEPHONE.match(supplier) or len(supplier) < 3:
                 continue
             if is_fds_label(supplier):
                 continue
             # Clean: keep only company name (cut at comma, number, BP, Tel)
-            supplier = re.split(r',\s*\d|,\s*BP|,\s*Tel|\s+\d{1,3}\s+(avenue|rue|boulevard)', supplier, flags=re.IGNORECASE)[0].strip()
+            supplier = _RE_FOURNISSEUR_FIN.split(supplier)[0].strip()
             supplier = supplier.rstrip(',').strip()
             info['fournisseur'] = supplier
             break
 
     # Revision date
-    m = re.search(r'[Vv]ersion\s+[\d.]+\s*\((\d{2}/\d{2}/\d{4})\)', text)
-    if not m:
-        m = re.search(r'[Dd]ate\s+de\s+r[ée]vision\s*[:\s]*(\d{2}/\d{2}/\d{4})', text)
-    if not m:
-        m = re.search(r'[Rr]evision\s+[Dd]ate\s+(\d{1,2}\s+[A-Z]{3}\s+\d{4})', text)  # Givaudan: "25 JUN 2024"
-    if not m:
-        m = re.search(r'[Rr][ée]vision\s*:\s*(\d{2}/\d{2}/\d{4})', text)  # Robertet: "Révision : 16/01/2019"
-    if not m:
-        m = re.search(r'[Rr][ée]vision\s*:.*?du\s+(\d{2}/\d{2}/\d{4})', text)  # Jean Niel: "Revision : 001NEW-3-CLP du 11/04/2024"
-    if not m:
-        m = re.search(r'[ÉE]dit[ée]\s+le\s*:\s*(\d{2}/\d{2}/\d{4})', text)  # Jean Niel: "Édité le : 11/04/2024"
-    if m: info['date_revision'] = m.group(1)
+    for pat in _GUARD_IDENT_DATE.iter(text.lower()):
+        m = pat.search(text)
+        if m:
+            info['date_revision'] = m.group(1)
+            break
 
     return info
 
 
 # ── Section 2 : Classification (FR + EN) ─────────────
 
+_RE_PHRASE_H = PATTERNS.add('classification.phrase_h', r'(H\d{3})\s+(.{5,80}?)(?:\.|$)', re.MULTILINE)
+_RE_MOT_SIGNAL = PATTERNS.add(
+    'classification.mot_signal',
+    r'(?:Signal\s+[Ww]ord|[Mm]ot\s+de\s+signal|[Mm]ention\s+d.avertissement)\s*:?\s*\n?\s*(WARNING|DANGER|Attention|Danger)',
+    re.IGNORECASE)
+
+
 def parse_classification(text):
     s2 = get_section(text, 2, 3)
     dangers, seen = [], set()
     
     # H-phrases with descriptions (both languages)
-    for m in re.finditer(r'(H\d{3})\s+(.{5,80}?)(?:\.|$)', s2, re.MULTILINE):
+    for m in _RE_PHRASE_H.finditer(s2):
         code = m.group(1)
         if code not in seen:
             seen.add(code)
             dangers.append({'code': code, 'description': m.group(2).strip()})
 
     signal = ''
-    m = re.search(r'(?:Signal\s+[Ww]ord|[Mm]ot\s+de\s+signal|[Mm]ention\s+d.avertissement)\s*:?\s*\n?\s*(WARNING|DANGER|Attention|Danger)', s2, re.IGNORECASE)
+    m = _RE_MOT_SIGNAL.search(s2)
     if m: signal = m.group(1).strip()
 
     return {'mot_signal': signal, 'phrases_H': dangers}
@@ -358,30 +823,64 @@ def parse_classification(text):
 
 # ── Section 3 : Composition — Multi-format ───────────
 
+_RE_FORMAT = {
+    'labeled': PATTERNS.add('format.labeled', r'CAS:\s*\d'),
+    'givaudan': PATTERNS.add('format.givaudan', r'>=\s*\d+[\.,]?\d*\s*-\s*<\s*\d+'),
+    'jeanniel': PATTERNS.add('format.jeanniel', r'CAS#\s*\d'),
+    'pcw_entete': PATTERNS.add('format.pcw_entete', r'Pourcentage\s*%'),
+    'pcw_plage': PATTERNS.add('format.pcw_plage', r'\[\s*\d+\s*;\s*\d+\s*\]'),
+    'charabot': PATTERNS.add('format.charabot', r'No\s+CAS\s+D[ée]signation'),
+    'apa_entete': PATTERNS.add('format.apa_entete', r'Nom IUPAC'),
+    'apa_plage': PATTERNS.add('format.apa_plage', r'\[\s*[\d.]+\s*-\s*[\d.]+\s*\]'),
+    'robertet_cas': PATTERNS.add('format.robertet_cas', r'No CAS\n%'),
+    'robertet_ce': PATTERNS.add('format.robertet_ce', r'Numéro CE:'),
+    'universal': PATTERNS.add('format.universal', r'N°\s*CAS\s*[:#]|CAS\s*N°|No\s*CAS\s*:', re.IGNORECASE),
+    'tabular': PATTERNS.add('format.tabular', r'^\d+\.?\d*\s*-\s*\d+', re.MULTILINE),
+}
+
+
 def detect_format(s3_text):
     """Detect FDS format based on Section 3 content."""
-    if re.search(r'CAS:\s*\d', s3_text):
+    f = _RE_FORMAT
+    if f['labeled'].search(s3_text):
         return 'labeled'  # Technico-Flor / InfoDyne style (CAS: xxxxx)
-    elif re.search(r'>=\s*\d+[\.,]?\d*\s*-\s*<\s*\d+', s3_text):
+    elif f['givaudan'].search(s3_text):
         return 'givaudan'  # Givaudan style (>= 5 - < 10)
-    elif re.search(r'CAS#\s*\d', s3_text):
+    elif f['jeanniel'].search(s3_text):
         return 'jeanniel'  # Jean Niel style (CAS# xxxxx ... [ MIN-MAX ])
-    elif re.search(r'Pourcentage\s*%', s3_text) and re.search(r'\[\s*\d+\s*;\s*\d+\s*\]', s3_text):
+    elif f['pcw_entete'].search(s3_text) and f['pcw_plage'].search(s3_text):
         return 'pcw'  # PCW / Expressions Parfumées columnar format [ min;max ]
-    elif re.search(r'No\s+CAS\s+D[ée]signation', s3_text):
+    elif f['charabot'].search(s3_text):
         return 'charabot'  # Charabot tabular: No CAS | Designation | %
-    elif re.search(r'Nom IUPAC', s3_text) and re.search(r'\[\s*[\d.]+\s*-\s*[\d.]+\s*\]', s3_text):
+    elif f['apa_entete'].search(s3_text) and f['apa_plage'].search(s3_text):
         return 'pcw'  # APA / CreaSens columnar format with [min-max]
-    elif re.search(r'No CAS\n%', s3_text) or re.search(r'Numéro CE:', s3_text):
+    elif f['robertet_cas'].search(s3_text) or f['robertet_ce'].search(s3_text):
         return 'robertet'  # Robertet style (CAS\nNOM\nMIN- MAX\nNuméro CE:)
-    elif re.search(r'N°\s*CAS\s*[:#]|CAS\s*N°|No\s*CAS\s*:', s3_text, re.IGNORECASE):
+    elif f['universal'].search(s3_text):
         return 'universal'  # Standard French FDS (N° CAS: xxxxx)
-    elif re.search(r'^\d+\.?\d*\s*-\s*\d+', s3_text, re.MULTILINE):
+    elif f['tabular'].search(s3_text):
         return 'tabular'  # CPL Aromas style (concentration first)
     else:
         return 'generic'
 
 
+# Motifs du format PCW / APA (colonnes, [min;max])
+_PCW_RE_ENTETE_POURCENTAGE = PATTERNS.add('pcw.entete_pourcentage', r'^Pourcentage\s*%?$')
+_PCW_RE_CAS_EXACT = PATTERNS.add('pcw.cas_exact', r'^\d{2,7}-\d{2}-\d$')
+_PCW_RE_ENTETE_CAS = PATTERNS.add('pcw.entete_cas', r'^N[°o]\s*CAS\s*$')
+_PCW_RE_ENTETE_CAS_DEBUT = PATTERNS.add('pcw.entete_cas_debut', r'^N[°o]\s*CAS')
+_PCW_RE_CHIFFRE_DEBUT = PATTERNS.add('pcw.chiffre_debut', r'^\d')
+_PCW_RE_MOT_CAPITALE = PATTERNS.add('pcw.mot_capitale', r'^[A-Z][a-z]{3,}')
+_PCW_RE_MOT_CAPITALE_LONG = PATTERNS.add('pcw.mot_capitale_long', r'^[A-Z][a-z]{4,}')
+_PCW_RE_PLAGE_POINT_VIRGULE = PATTERNS.add('pcw.plage_point_virgule', r'\[\s*([\d.,]+)\s*;\s*([\d.,]+)\s*\]')
+_PCW_RE_PLAGE_TIRET = PATTERNS.add('pcw.plage_tiret', r'\[\s*([\d.,]+)\s*-\s*([\d.,]+)\s*\]')
+_PCW_RE_CAS_LIGNE = PATTERNS.add('pcw.cas_ligne', r'^(\d{2,7}-\d{2}-\d)$')
+_PCW_RE_EINECS = PATTERNS.add('pcw.einecs', r'^\d{3}-\d{3}-\d')
+_PCW_RE_CODE_DANGER = PATTERNS.add(
+    'pcw.code_danger', r'^(ATO|EHC|CAR|SCI|EHA|AH|EDI|FL|SS|REP|STO|ATD|ATI|EUH)')
+_PCW_RE_CODE_H = PATTERNS.add('pcw.code_h', r'H\d{3}')
+
+
 def parse_composition_pcw(s3):
     """Parse format PCW / Expressions Parfumées / colonnes empilées.
     
@@ -406,9 +905,9 @@ def parse_composition_pcw(s3):
         stripped = L.strip()
         if stripped in ('Symbole danger', 'Symbole\ndanger') and name_start is None:
             name_start = i + 1
-        if re.match(r'^Pourcentage\s*%?$', stripped) or (stripped == '%' and pct_start is None):
+        if _PCW_RE_ENTETE_POURCENTAGE.match(stripped) or (stripped == '%' and pct_start is None):
             pct_start = i + 1
-        if re.match(r'^\d{2,7}-\d{2}-\d$', stripped) and cas_start is None:
+        if _PCW_RE_CAS_EXACT.match(stripped) and cas_start is None:
             cas_start = i
     
     # APA variant: names → N° CAS → N° EINECS → REACH → Classification → %
@@ -417,7 +916,7 @@ def parse_composition_pcw(s3):
     cas_header = None
     for i, L in enumerate(lines):
         stripped = L.strip()
-        if re.match(r'^N[°o]\s*CAS\s*$', stripped):
+        if _PCW_RE_ENTETE_CAS.match(stripped):
             cas_header = i + 1  # CAS block starts right after header
     
     # Fallback: si pas de 'Symbole danger', chercher après les lignes R/classification
@@ -465,16 +964,16 @@ def parse_composition_pcw(s3):
         if not L or L.startswith(skip_prefixes):
             continue
         # Skip "N° CAS" header line
-        if re.match(r'^N[°o]\s*CAS', L):
+        if _PCW_RE_ENTETE_CAS_DEBUT.match(L):
             continue
         # Nom coupé sur 2 lignes
-        if raw_names and len(L) <= 8 and not re.match(r'^\d', L) and not re.match(r'^[A-Z][a-z]{3,}', L):
+        if raw_names and len(L) <= 8 and not _PCW_RE_CHIFFRE_DEBUT.match(L) and not _PCW_RE_MOT_CAPITALE.match(L):
             prev = raw_names[-1]
             if prev.endswith('-') or prev.endswith('(') or len(L) <= 4:
                 raw_names[-1] = prev + L
             else:
                 raw_names.append(L)
-        elif raw_names and lines[i-1].strip().endswith('-') and not re.match(r'^[A-Z][a-z]{4,}', L):
+        elif raw_names and lines[i-1].strip().endswith('-') and not _PCW_RE_MOT_CAPITALE_LONG.match(L):
             raw_names[-1] += L
         else:
             raw_names.append(L)
@@ -486,18 +985,17 @@ def parse_composition_pcw(s3):
     for i in range(pct_start, pct_scan_end):
         L = lines[i].strip()
         # Format PCW: [ 22;24 ]
-        m = re.match(r'\[\s*([\d.,]+)\s*;\s*([\d.,]+)\s*\]', L)
+        m = _PCW_RE_PLAGE_POINT_VIRGULE.match(L)
         if m:
             pcts.append((float(m.group(1).replace(',', '.')), float(m.group(2).replace(',', '.'))))
             continue
         # Format APA: [5-10] or [0.1-5]
-        m = re.match(r'\[\s*([\d.,]+)\s*-\s*([\d.,]+)\s*\]', L)
+        m = _PCW_RE_PLAGE_TIRET.match(L)
         if m:
             pcts.append((float(m.group(1).replace(',', '.')), float(m.group(2).replace(',', '.'))))
             continue
     
     # ── Extraire les CAS ──
-    RE_CAS_LINE = re.compile(r'^(\d{2,7}-\d{2}-\d)$')
     cas_list = []
     # For APA: CAS between cas_start and the EINECS/classification blocks
     # For PCW: CAS after pct block to end
@@ -505,13 +1003,13 @@ def parse_composition_pcw(s3):
     cas_scan_end = pct_start if apa_mode else len(lines)
     for i in range(cas_scan_start, cas_scan_end):
         L = lines[i].strip()
-        if RE_CAS_LINE.match(L):
+        if _PCW_RE_CAS_LIGNE.match(L):
             cas_list.append(L)
-        elif re.match(r'^\d{3}-\d{3}-\d', L):
+        elif _PCW_RE_EINECS.match(L):
             continue  # EINECS — skip
-        elif re.match(r'^(ATO|EHC|CAR|SCI|EHA|AH|EDI|FL|SS|REP|STO|ATD|ATI|EUH)', L):
+        elif _PCW_RE_CODE_DANGER.match(L):
             continue  # Classification — skip
-        elif re.search(r'H\d{3}', L):
+        elif _PCW_RE_CODE_H.search(L):
             continue  # H-codes — skip
         elif L.startswith(';') or L == '':
             continue
@@ -539,6 +1037,16 @@ def parse_composition_pcw(s3):
     return molecules
 
 
+# Motifs du format Charabot (No CAS | Désignation | %)
+_CHARABOT_RE_COMPOSANT = PATTERNS.add(
+    'charabot.composant', r'^\*?\s*(\d{2,7}-\d{2}-\d)\s+(.+?)\s+([\d]+[,.\d]+)\s*$')
+_CHARABOT_RE_CLASSE_DANGER = PATTERNS.add(
+    'charabot.classe_danger', r'^(Acute|Skin|Eye|Aquatic|Repr|Flam|Asp|ATO|EHC|SCI|SS|CAR|EDI|AH|FL|STO|REP)')
+_CHARABOT_RE_CODE_H_DEBUT = PATTERNS.add('charabot.code_h_debut', r'^H\d{3}')
+_CHARABOT_RE_CAS_DEBUT = PATTERNS.add('charabot.cas_debut', r'^\*?\s*\d{2,7}-\d{2}-\d')
+_CHARABOT_RE_POURCENTAGE_FIN = PATTERNS.add('charabot.pourcentage_fin', r'\d+[,.]\d{4}$')
+
+
 def parse_composition_charabot(s3):
     """Parse Charabot FDS format.
     
@@ -551,15 +1059,13 @@ def parse_composition_charabot(s3):
     molecules = []
     lines = s3.split('\n')
     
-    RE_COMP = re.compile(r'^\*?\s*(\d{2,7}-\d{2}-\d)\s+(.+?)\s+([\d]+[,.\d]+)\s*$')
-    
     i = 0
     while i < len(lines):
         L = lines[i].strip()
         if L.startswith('*'):
             L = L[1:].strip()
         
-        m = RE_COMP.match(L)
+        m = _CHARABOT_RE_COMPOSANT.match(L)
         if m:
             cas = m.group(1)
             nom = m.group(2).strip()
@@ -573,9 +1079,9 @@ def parse_composition_charabot(s3):
                     nextL = nextL[1:].strip()
                 # Name continuation: doesn't start with known non-name patterns
                 if nextL and not nextL.startswith('Numéro') and not nextL.startswith('Num') and \
-                   not re.match(r'^(Acute|Skin|Eye|Aquatic|Repr|Flam|Asp|ATO|EHC|SCI|SS|CAR|EDI|AH|FL|STO|REP)', nextL) and \
-                   not re.match(r'^H\d{3}', nextL) and not re.match(r'^\*?\s*\d{2,7}-\d{2}-\d', nextL) and \
-                   not re.search(r'\d+[,.]\d{4}$', nextL) and \
+                   not _CHARABOT_RE_CLASSE_DANGER.match(nextL) and \
+                   not _CHARABOT_RE_CODE_H_DEBUT.match(nextL) and not _CHARABOT_RE_CAS_DEBUT.match(nextL) and \
+                   not _CHARABOT_RE_POURCENTAGE_FIN.search(nextL) and \
                    not nextL.startswith('(Suite') and not nextL.startswith('Chronic') and \
                    nom.rstrip().endswith('-'):
                     nom = nom.rstrip() + nextL
@@ -600,6 +1106,19 @@ def parse_composition_charabot(s3):
     return molecules
 
 
+# Motifs du format Jean Niel (CAS# … [ MIN-MAX ])
+_JEANNIEL_RE_CAS = PATTERNS.add('jeanniel.cas', r'^CAS#\s*(\d{2,7}-\d{2}-\d)')
+_JEANNIEL_RE_EINECS = PATTERNS.add('jeanniel.einecs', r'^EINECS#\s*([\d\-]+)')
+_JEANNIEL_RE_LIGNE_IGNOREE = PATTERNS.add('jeanniel.ligne_ignoree', r'^(INDEX#|REACH#|01-|xx|\(<?\d)')
+_JEANNIEL_RE_PLAGE = PATTERNS.add('jeanniel.plage', r'\[\s*([\d.]+)\s*-\s*([\d.]+)\s*\]')
+_JEANNIEL_RE_CODE_H_DEBUT = PATTERNS.add('jeanniel.code_h_debut', r'^H\d{3}')
+_JEANNIEL_RE_CODE_H = PATTERNS.add('jeanniel.code_h', r'H\d{3}')
+_JEANNIEL_RE_CAS_DEBUT = PATTERNS.add('jeanniel.cas_debut', r'^CAS#')
+_JEANNIEL_RE_SECTION_SUIVANTE = PATTERNS.add('jeanniel.section_suivante', r'^[34]\.\s+[A-Z]')
+_JEANNIEL_RE_CODE_DANGER = PATTERNS.add(
+    'jeanniel.code_danger', r'\s+(?:AH|ATI|ATO|EDI|EHA|EHC|FL|REP|SCI|SS)\d')
+
+
 def parse_composition_jeanniel(s3):
     """Parse Jean Niel format: CAS# on line, EINECS#, substance name with GHS codes, [ MIN-MAX ]."""
     molecules = []
@@ -609,7 +1128,7 @@ def parse_composition_jeanniel(s3):
     while i < len(lines):
         line = lines[i].strip()
         
-        cas_m = re.match(r'^CAS#\s*(\d{2,7}-\d{2}-\d)', line)
+        cas_m = _JEANNIEL_RE_CAS.match(line)
         if cas_m:
             cas = cas_m.group(1)
             einecs = ''
@@ -622,13 +1141,13 @@ def parse_composition_jeanniel(s3):
                 nline = lines[j].strip()
                 
                 # EINECS
-                ec_m = re.match(r'^EINECS#\s*([\d\-]+)', nline)
+                ec_m = _JEANNIEL_RE_EINECS.match(nline)
                 if ec_m:
                     einecs = ec_m.group(1)
                     j += 1; continue
                 
                 # Skip INDEX#, REACH#, registration lines
-                if re.match(r'^(INDEX#|REACH#|01-|xx|\(<?\d)', nline):
+                if _JEANNIEL_RE_LIGNE_IGNOREE.match(nline):
                     j += 1; continue
                 
                 # Skip Exempt lines
@@ -636,14 +1155,14 @@ def parse_composition_jeanniel(s3):
                     j += 1; continue
                 
                 # Concentration bracket [ MIN-MAX ]
-                conc_m = re.search(r'\[\s*([\d.]+)\s*-\s*([\d.]+)\s*\]', nline)
+                conc_m = _JEANNIEL_RE_PLAGE.search(nline)
                 if conc_m:
                     conc = round((float(conc_m.group(1)) + float(conc_m.group(2))) / 2, 2)
                     j += 1; break
                 
                 # H-phrases line
-                if re.match(r'^H\d{3}', nline):
-                    classif = (classif + ' ' + ' '.join(re.findall(r'H\d{3}', nline))).strip()
+                if _JEANNIEL_RE_CODE_H_DEBUT.match(nline):
+                    classif = (classif + ' ' + ' '.join(_JEANNIEL_RE_CODE_H.findall(nline))).strip()
                     j += 1; continue
                 
                 # ATE line
@@ -655,14 +1174,14 @@ def parse_composition_jeanniel(s3):
                     j += 1; continue
                 
                 # Next CAS# or next section = done
-                if re.match(r'^CAS#', nline) or re.match(r'^[34]\.\s+[A-Z]', nline):
+                if _JEANNIEL_RE_CAS_DEBUT.match(nline) or _JEANNIEL_RE_SECTION_SUIVANTE.match(nline):
                     break
                 
                 # Substance name (possibly with GHS codes after)
                 if not nom and len(nline) > 2:
-                    name_parts = re.split(r'\s+(?:AH|ATI|ATO|EDI|EHA|EHC|FL|REP|SCI|SS)\d', nline)
+                    name_parts = _JEANNIEL_RE_CODE_DANGER.split(nline)
                     nom = name_parts[0].strip()
-                    h_in_line = re.findall(r'H\d{3}', nline)
+                    h_in_line = _JEANNIEL_RE_CODE_H.findall(nline)
                     if h_in_line:
                         classif = (classif + ' ' + ' '.join(h_in_line)).strip()
                 
@@ -682,6 +1201,15 @@ def parse_composition_jeanniel(s3):
     return [m for m in molecules if m['cas'] not in seen and not seen.add(m['cas'])]
 
 
+# Motifs du format Robertet (CAS, NOM, MIN- MAX, Numéro CE:)
+_ROBERTET_RE_PLAGE_LIGNE = PATTERNS.add('robertet.plage_ligne', r'^([\d,\.]+)\s*-\s*([\d,\.]+)$')
+_ROBERTET_RE_PLAGE_FIN = PATTERNS.add('robertet.plage_fin', r'([\d,]+[\s,]*-\s*[\d,]+)\s*$')
+_ROBERTET_RE_ESPACES = PATTERNS.add('robertet.espaces', r'\s+')
+_ROBERTET_RE_PLAGE = PATTERNS.add('robertet.plage', r'([\d.]+)\s*-\s*([\d.]+)')
+_ROBERTET_RE_NUMERO_CE = PATTERNS.add('robertet.numero_ce', r'Numéro CE:\s*([\d\-]+)')
+_ROBERTET_RE_CODE_H = PATTERNS.add('robertet.code_h', r'H\d{3}')
+
+
 def parse_composition_robertet(s3):
     """Parse Robertet format: CAS on one line, name on next, concentration on next.
     Pattern:
@@ -712,14 +1240,14 @@ def parse_composition_robertet(s3):
                 nline = lines[j].strip()
                 
                 # Check if this line is a concentration range (e.g. "10,00- 20,00" or "0,10-  1,00")
-                conc_m = re.match(r'^([\d,\.]+)\s*-\s*([\d,\.]+)$', nline)
+                conc_m = _ROBERTET_RE_PLAGE_LIGNE.match(nline)
                 if conc_m:
                     conc_str = nline
                     j += 1
                     break
                 
                 # Check if concentration is embedded in the name line (multiline name wrapping)
-                conc_m2 = re.search(r'([\d,]+[\s,]*-\s*[\d,]+)\s*$', nline)
+                conc_m2 = _ROBERTET_RE_PLAGE_FIN.search(nline)
                 if conc_m2 and not nline.startswith('Numéro') and not nline.startswith('N°'):
                     # Concentration at end of line — rest is name
                     conc_str = conc_m2.group(1)
@@ -742,13 +1270,13 @@ def parse_composition_robertet(s3):
             
             nom = ' '.join(nom_parts).strip()
             # Clean up name: remove trailing parentheses artifacts
-            nom = re.sub(r'\s+', ' ', nom).strip()
+            nom = _ROBERTET_RE_ESPACES.sub(' ', nom).strip()
             
             # Parse concentration range
             conc = 0
             if conc_str:
                 conc_str = conc_str.replace(',', '.')
-                cm = re.search(r'([\d.]+)\s*-\s*([\d.]+)', conc_str)
+                cm = _ROBERTET_RE_PLAGE.search(conc_str)
                 if cm:
                     conc = round((float(cm.group(1)) + float(cm.group(2))) / 2, 2)
             
@@ -760,10 +1288,10 @@ def parse_composition_robertet(s3):
                 kline = lines[k].strip()
                 if RE_CAS.match(kline) and len(kline) < 20:
                     break  # Next component
-                ec_m = re.search(r'Numéro CE:\s*([\d\-]+)', kline)
+                ec_m = _ROBERTET_RE_NUMERO_CE.search(kline)
                 if ec_m:
                     einecs = ec_m.group(1)
-                h_m = re.findall(r'H\d{3}', kline)
+                h_m = _ROBERTET_RE_CODE_H.findall(kline)
                 if h_m:
                     classif = (classif + ' ' + ' '.join(h_m)).strip()
                 k += 1
@@ -786,6 +1314,33 @@ def parse_composition_robertet(s3):
     return [m for m in molecules if m['cas'] not in seen and not seen.add(m['cas'])]
 
 
+# Motifs du format Technico-Flor / InfoDyne (CAS: …, EC: …)
+_LABELED_RE_CAS = PATTERNS.add('labeled.cas', r'^CAS:\s*(\d{2,7}-\d{2}-\d)')
+_LABELED_RE_CAS_DEBUT = PATTERNS.add('labeled.cas_debut', r'^CAS:\s*\d')
+_LABELED_RE_LIMITES_SPECIFIQUES = PATTERNS.add(
+    'labeled.limites_specifiques', r'^(Specific\s+concentration|Limites\s+de\s+concentration)', re.IGNORECASE)
+_LABELED_RE_FIN_COMPOSANTS = PATTERNS.add(
+    'labeled.fin_composants', r'^(Information\s+on\s+ingredients|Informations\s+sur\s+les\s+composants)', re.IGNORECASE)
+_LABELED_RE_EC = PATTERNS.add('labeled.ec', r'^EC:\s*(\d{3}-\d{3}-\d)')
+_LABELED_RE_REACH_INDEX = PATTERNS.add('labeled.reach_index', r'^(REACH|INDEX):')
+_LABELED_RE_RENVOI = PATTERNS.add('labeled.renvoi', r'^\[\d+\]\s*')
+_LABELED_RE_PLAGE = PATTERNS.add('labeled.plage', r'^([\d]+[,.]?\d*)\s*<=\s*x\s*%?\s*<\s*([\d]+[,.]?\d*)')
+_LABELED_RE_PICTOGRAMME = PATTERNS.add('labeled.pictogramme', r'^GHS\d')
+_LABELED_RE_FACTEUR_M = PATTERNS.add('labeled.facteur_m', r'^M\s+(Acute|Chronic)\s*=')
+_LABELED_RE_CODE_H = PATTERNS.add('labeled.code_h', r'H\d{3}')
+_LABELED_RE_CLASSE_DANGER = PATTERNS.add('labeled.classe_danger', r'(Skin|Aquatic|Acute|Flam|Asp|Eye)')
+_LABELED_RE_ENTETE_PAGE = PATTERNS.add(
+    'labeled.entete_page', r'^(SAFETY DATA|FICHE DE DONN|GROUPE|Made under|Version|\d+/\d+|Page\s)', re.IGNORECASE)
+_LABELED_RE_NOM_PRODUIT = PATTERNS.add(
+    'labeled.nom_produit', r'^(KOBENHAVN|EGLANTINE|BLUE\s+AWAY|SLEEPLESS|KABINETT|KINA|MUSEET|AR\d{6})')
+_LABELED_RE_NOMBRE_5_CHIFFRES = PATTERNS.add('labeled.nombre_5_chiffres', r'\b\d{5}\b')
+_LABELED_RE_REFERENCE_PRODUIT = PATTERNS.add('labeled.reference_produit', r'(RT\d{5}|MKT\d{3})')
+_LABELED_RE_CHIFFRE_DEBUT = PATTERNS.add('labeled.chiffre_debut', r'^\d')
+_LABELED_RE_ENTETE_NOM = PATTERNS.add(
+    'labeled.entete_nom', r'^(SAFETY|GROUPE|Made under|Version|KOBENHAVN|EGLANTINE|AR\d)')
+_LABELED_RE_ESPACES = PATTERNS.add('labeled.espaces', r'\s+')
+
+
 def parse_composition_labeled(s3):
     """Parse format 'labeled' : CAS: xxx / EC: xxx / name / GHS / concentration."""
     molecules = []
@@ -796,7 +1351,7 @@ def parse_composition_labeled(s3):
         line = lines[i]
         
         # Look for CAS: line
-        cas_m = re.match(r'^CAS:\s*(\d{2,7}-\d{2}-\d)', line)
+        cas_m = _LABELED_RE_CAS.match(line)
         if not cas_m:
             # Check for component WITHOUT CAS (e.g. "HYDROCARBONS")
             # These have a name followed by GHS/concentration but no CAS: line
@@ -815,28 +1370,28 @@ def parse_composition_labeled(s3):
             L = lines[j]
             
             # New CAS = new block
-            if re.match(r'^CAS:\s*\d', L):
+            if _LABELED_RE_CAS_DEBUT.match(L):
                 break
             
             # Stop markers
-            if re.match(r'^(Specific\s+concentration|Limites\s+de\s+concentration)', L, re.IGNORECASE):
+            if _LABELED_RE_LIMITES_SPECIFIQUES.match(L):
                 break
-            if re.match(r'^(Information\s+on\s+ingredients|Informations\s+sur\s+les\s+composants)', L, re.IGNORECASE):
+            if _LABELED_RE_FIN_COMPOSANTS.match(L):
                 break
             
             # EC/EINECS
-            ec_m = re.match(r'^EC:\s*(\d{3}-\d{3}-\d)', L)
+            ec_m = _LABELED_RE_EC.match(L)
             if ec_m:
                 einecs = ec_m.group(1)
                 j += 1; continue
             
             # REACH / INDEX — skip
-            if re.match(r'^(REACH|INDEX):', L):
+            if _LABELED_RE_REACH_INDEX.match(L):
                 j += 1; continue
             
             # Concentration: "10 <= x % < 25" or "0 <= x % < 2.5" or "[1] 2.5 <= x % < 10"
-            conc_line = re.sub(r'^\[\d+\]\s*', '', L)  # Strip [1], [2] annotations
-            conc_m = re.match(r'^([\d]+[,.]?\d*)\s*<=\s*x\s*%?\s*<\s*([\d]+[,.]?\d*)', conc_line)
+            conc_line = _LABELED_RE_RENVOI.sub('', L)  # Strip [1], [2] annotations
+            conc_m = _LABELED_RE_PLAGE.match(conc_line)
             if conc_m:
                 concentration = f"{conc_m.group(1)}-{conc_m.group(2)}"
                 # This is the END of the block — everything after is next component
@@ -844,7 +1399,7 @@ def parse_composition_labeled(s3):
                 break
             
             # GHS pictograms — skip
-            if re.match(r'^GHS\d', L):
+            if _LABELED_RE_PICTOGRAMME.match(L):
                 j += 1; continue
             
             # Signal words — skip
@@ -852,31 +1407,31 @@ def parse_composition_labeled(s3):
                 j += 1; continue
             
             # M factor — skip
-            if re.match(r'^M\s+(Acute|Chronic)\s*=', L):
+            if _LABELED_RE_FACTEUR_M.match(L):
                 j += 1; continue
             
             # H-code lines (e.g. "Skin Irrit. 2, H315")
-            h_m = re.findall(r'H\d{3}', L)
-            if h_m and re.search(r'(Skin|Aquatic|Acute|Flam|Asp|Eye)', L):
+            h_m = _LABELED_RE_CODE_H.findall(L)
+            if h_m and _LABELED_RE_CLASSE_DANGER.search(L):
                 h_codes.extend(h_m)
                 j += 1; continue
             
             # Page headers / footers — skip
-            if re.match(r'^(SAFETY DATA|FICHE DE DONN|GROUPE|Made under|Version|\d+/\d+|Page\s)', L, re.IGNORECASE):
+            if _LABELED_RE_ENTETE_PAGE.match(L):
                 j += 1; continue
             if 'InfoDyne' in L or 'infodyne' in L:
                 j += 1; continue
             # Skip product name in page headers
-            if re.match(r'^(KOBENHAVN|EGLANTINE|BLUE\s+AWAY|SLEEPLESS|KABINETT|KINA|MUSEET|AR\d{6})', L):
+            if _LABELED_RE_NOM_PRODUIT.match(L):
                 j += 1; continue
             # Skip generic header patterns: "PRODUCT_NAME - CODE"
-            if re.search(r'\b\d{5}\b', L) and re.search(r'(RT\d{5}|MKT\d{3})', L):
+            if _LABELED_RE_NOMBRE_5_CHIFFRES.search(L) and _LABELED_RE_REFERENCE_PRODUIT.search(L):
                 j += 1; continue
             
             # Chemical name (what remains)
-            if len(L) > 1 and not re.match(r'^\d', L):
+            if len(L) > 1 and not _LABELED_RE_CHIFFRE_DEBUT.match(L):
                 # Skip known header lines from all FDS formats
-                if not re.match(r'^(SAFETY|GROUPE|Made under|Version|KOBENHAVN|EGLANTINE|AR\d)', L):
+                if not _LABELED_RE_ENTETE_NOM.match(L):
                     # Check if line is a continuation (ends with hyphen or starts lowercase)
                     if nom_parts and (nom_parts[-1].endswith('-') or L[0].islower()):
                         # Join with previous without space if hyphen
@@ -891,7 +1446,7 @@ def parse_composition_labeled(s3):
         
         if cas:
             nom = ' '.join(nom_parts).strip()
-            nom = re.sub(r'\s+', ' ', nom)
+            nom = _LABELED_RE_ESPACES.sub(' ', nom)
             molecules.append({
                 'cas': cas,
                 'concentration': concentration,
@@ -912,19 +1467,52 @@ def parse_composition_labeled(s3):
     return unique
 
 
+# Motifs du format Givaudan (>= 5 - < 10)
+# Concentration : ">= 5 - < 10", ">= 0,1 - < 1", ">= 0,025 - < 0,1", ">= 0 - < 0,01"
+_GIVAUDAN_RE_PLAGE = PATTERNS.add('givaudan.plage', r'^>=\s*([\d,\.]+)\s*-\s*<\s*([\d,\.]+)\s*$')
+_GIVAUDAN_RE_ENTETE_TABLEAU = PATTERNS.add(
+    'givaudan.entete_tableau', r'^(Hazardous components|Chemical name|CAS-No|EC-No|Registration|Classification|Concentration|\(REGULATION|3\.2|\d+\.\d+)', re.IGNORECASE)
+_GIVAUDAN_RE_ENTETE_PAGE = PATTERNS.add(
+    'givaudan.entete_page', r'^(SAFETY DATA SHEET|according to|Administrative|Report Information|Sales &|Shipping Order|\d+/\d+$)', re.IGNORECASE)
+_GIVAUDAN_RE_VERSION = PATTERNS.add('givaudan.version', r'^Version\s+\d')
+_GIVAUDAN_RE_DATE = PATTERNS.add('givaudan.date', r'^(Print Date|Revision Date)')
+_GIVAUDAN_RE_TITRE_MAJUSCULES = PATTERNS.add('givaudan.titre_majuscules', r'^[A-Z][A-Z\s]+\d*$')
+_GIVAUDAN_RE_MAJUSCULES = PATTERNS.add('givaudan.majuscules', r'^[A-Z\s\d]+$')
+_GIVAUDAN_RE_FIN_SECTION = PATTERNS.add(
+    'givaudan.fin_section', r'^(SECTION\s*4|For the full text)', re.IGNORECASE)
+_GIVAUDAN_RE_TOXICITE = PATTERNS.add(
+    'givaudan.toxicite', r'^(Acute\s+toxicity|Acute\s+oral|Acute\s+dermal|Acute\s+inhalation|M-Factor|specific\s+conc|mg/kg|>)', re.IGNORECASE)
+_GIVAUDAN_RE_DOSE = PATTERNS.add('givaudan.dose', r'^[\d\s,\.]+mg/kg')
+_GIVAUDAN_RE_REACH = PATTERNS.add('givaudan.reach', r'^01-\d')
+_GIVAUDAN_RE_CODE_H = PATTERNS.add('givaudan.code_h', r'H\d{3}')
+_GIVAUDAN_RE_CLASSE_DANGER = PATTERNS.add(
+    'givaudan.classe_danger', r'(Skin|Aquatic|Acute|Flam|Asp|Eye|Repr|STOT|Dam|Sens|Irrit|Tox|Chronic)')
+_GIVAUDAN_RE_CODE_H_SEUL = PATTERNS.add('givaudan.code_h_seul', r'^H\d{3}$')
+_GIVAUDAN_RE_CLASSE_DEBUT = PATTERNS.add(
+    'givaudan.classe_debut', r'^(Skin|Eye|Aquatic|Acute|Flam|Asp|Repr|STOT|Dam)')
+_GIVAUDAN_RE_CAS = PATTERNS.add('givaudan.cas', r'^\d{2,7}-\d{2}-\d$')
+_GIVAUDAN_RE_EINECS = PATTERNS.add('givaudan.einecs', r'^\d{3}-\d{3}-\d$')
+_GIVAUDAN_RE_CAS_SOUPLE = PATTERNS.add('givaudan.cas_souple', r'^\d+-\d+-\d$')
+_GIVAUDAN_RE_NUMERO_TIRETS = PATTERNS.add('givaudan.numero_tirets', r'^\d{3,}-\d+-\d+$')
+_GIVAUDAN_RE_FACTEUR_M = PATTERNS.add('givaudan.facteur_m', r'^(M-Factor|\d+$|>=|>|<)')
+_GIVAUDAN_RE_NOMBRE = PATTERNS.add('givaudan.nombre', r'^\d+[\s,\.]+\d+$')
+_GIVAUDAN_RE_CLASSE_NOM = PATTERNS.add(
+    'givaudan.classe_nom', r'\s*(?:Skin|Eye|Aquatic|Acute|Flam|Asp|Repr|STOT|Dam)\s+\w+[\.\s]*\d*\w*;?\s*H?\d*\s*')
+_GIVAUDAN_RE_PREFIXE_EGAL = PATTERNS.add('givaudan.prefixe_egal', r'^\s*\(=\s*')
+_GIVAUDAN_RE_PONCTUATION_DEBUT = PATTERNS.add('givaudan.ponctuation_debut', r'^[=\(\)\s]+')
+_GIVAUDAN_RE_SECTION = PATTERNS.add('givaudan.section', r'SECTION\s+\d+\..*', re.IGNORECASE)
+
+
 def parse_composition_givaudan(s3):
     """Parse format 'givaudan' : Chemical name / CAS-No. / EC-No. / Reg / Classification / Concentration."""
     molecules = []
     lines = [l.strip() for l in s3.split('\n') if l.strip()]
     
-    # Regex for Givaudan concentration: ">= 5 - < 10" or ">= 0,1 - < 1" or ">= 0,025 - < 0,1" or ">= 0 - < 0,01"
-    RE_CONC_GIV = re.compile(r'^>=\s*([\d,\.]+)\s*-\s*<\s*([\d,\.]+)\s*$')
-    
     # Build blocks: split on concentration lines (which end each component)
     i = 0
     # Skip header lines
     while i < len(lines):
-        if re.match(r'^(Hazardous components|Chemical name|CAS-No|EC-No|Registration|Classification|Concentration|\(REGULATION|3\.2|\d+\.\d+)', lines[i], re.IGNORECASE):
+        if _GIVAUDAN_RE_ENTETE_TABLEAU.match(lines[i]):
             i += 1; continue
         if 'Percent by' in lines[i] or 'weight]' in lines[i]:
             i += 1; continue
@@ -936,24 +1524,24 @@ def parse_composition_givaudan(s3):
         L = lines[i]
         
         # Page headers/footers — skip
-        if re.match(r'^(SAFETY DATA SHEET|according to|Administrative|Report Information|Sales &|Shipping Order|\d+/\d+$)', L, re.IGNORECASE):
+        if _GIVAUDAN_RE_ENTETE_PAGE.match(L):
             i += 1; continue
-        if re.match(r'^Version\s+\d', L):
+        if _GIVAUDAN_RE_VERSION.match(L):
             i += 1; continue
-        if re.match(r'^(Print Date|Revision Date)', L):
+        if _GIVAUDAN_RE_DATE.match(L):
             i += 1; continue
         # Product name repeated in headers
-        if re.match(r'^[A-Z][A-Z\s]+\d*$', L) and len(L) < 30 and not RE_CAS.search(L):
+        if _GIVAUDAN_RE_TITRE_MAJUSCULES.match(L) and len(L) < 30 and not RE_CAS.search(L):
             # Could be product name header — check if it's NOT a chemical name
             # Chemical names usually have lowercase or special chars
-            if L.isupper() or re.match(r'^[A-Z\s\d]+$', L):
+            if L.isupper() or _GIVAUDAN_RE_MAJUSCULES.match(L):
                 i += 1; continue
         
         # Stop at Section 4 / "For the full text"
-        if re.match(r'^(SECTION\s*4|For the full text)', L, re.IGNORECASE):
+        if _GIVAUDAN_RE_FIN_SECTION.match(L):
             break
         
-        conc_m = RE_CONC_GIV.match(L)
+        conc_m = _GIVAUDAN_RE_PLAGE.match(L)
         if conc_m:
             # End of block — parse accumulated lines
             lo = conc_m.group(1).replace(',', '.')
@@ -972,74 +1560,74 @@ def parse_composition_givaudan(s3):
                 einecs_m = RE_EINECS.search(cl)
                 
                 # Skip acute toxicity lines
-                if re.match(r'^(Acute\s+toxicity|Acute\s+oral|Acute\s+dermal|Acute\s+inhalation|M-Factor|specific\s+conc|mg/kg|>)', cl, re.IGNORECASE):
+                if _GIVAUDAN_RE_TOXICITE.match(cl):
                     continue
                 if 'toxicity' in cl.lower() or 'estimate' in cl.lower():
                     continue
-                if re.match(r'^[\d\s,\.]+mg/kg', cl):
+                if _GIVAUDAN_RE_DOSE.match(cl):
                     continue
                 
                 # Registration number — skip
-                if re.match(r'^01-\d', cl):
+                if _GIVAUDAN_RE_REACH.match(cl):
                     continue
                 
                 # H-codes in classification lines
-                h_found = re.findall(r'H\d{3}', cl)
-                if h_found and re.search(r'(Skin|Aquatic|Acute|Flam|Asp|Eye|Repr|STOT|Dam|Sens|Irrit|Tox|Chronic)', cl):
+                h_found = _GIVAUDAN_RE_CODE_H.findall(cl)
+                if h_found and _GIVAUDAN_RE_CLASSE_DANGER.search(cl):
                     h_codes.extend(h_found)
                     continue
                 
                 # Standalone H-code line (e.g. "H317" alone)
-                if re.match(r'^H\d{3}$', cl):
+                if _GIVAUDAN_RE_CODE_H_SEUL.match(cl):
                     h_codes.append(cl)
                     continue
                 
                 # Classification fragment without H-code (e.g. "Skin Sens. 1B;")
-                if re.match(r'^(Skin|Eye|Aquatic|Acute|Flam|Asp|Repr|STOT|Dam)', cl) and ';' in cl:
-                    h_found2 = re.findall(r'H\d{3}', cl)
+                if _GIVAUDAN_RE_CLASSE_DEBUT.match(cl) and ';' in cl:
+                    h_found2 = _GIVAUDAN_RE_CODE_H.findall(cl)
                     h_codes.extend(h_found2)
                     continue
                 
                 # CAS number line (standalone number like 8000-66-6)
-                if cas_m and not einecs_m and re.match(r'^\d{2,7}-\d{2}-\d$', cl.strip()):
+                if cas_m and not einecs_m and _GIVAUDAN_RE_CAS.match(cl.strip()):
                     if not cas:
                         cas = cas_m.group(1)
                     continue
                 
                 # EC/EINECS number line (xxx-xxx-x)
-                if einecs_m and re.match(r'^\d{3}-\d{3}-\d$', cl.strip()):
+                if einecs_m and _GIVAUDAN_RE_EINECS.match(cl.strip()):
                     if not einecs:
                         einecs = einecs_m.group(1)
                     continue
                 
                 # Secondary CAS (some have 2 CAS like 85940-32-5)
-                if cas_m and cas and re.match(r'^\d+-\d+-\d$', cl.strip()):
+                if cas_m and cas and _GIVAUDAN_RE_CAS_SOUPLE.match(cl.strip()):
                     continue
                 
                 # Number-only lines (EC or secondary CAS) — skip
-                if re.match(r'^\d{3,}-\d+-\d+$', cl):
+                if _GIVAUDAN_RE_NUMERO_TIRETS.match(cl):
                     continue
                 
                 # Otherwise it's probably a name part
                 # Skip: pure numbers, very short fragments, M-Factor lines
-                if re.match(r'^(M-Factor|\d+$|>=|>|<)', cl):
+                if _GIVAUDAN_RE_FACTEUR_M.match(cl):
                     continue
-                if cl and len(cl) > 1 and not re.match(r'^\d+[\s,\.]+\d+$', cl):
+                if cl and len(cl) > 1 and not _GIVAUDAN_RE_NOMBRE.match(cl):
                     nom_parts.append(cl)
             
             if cas or nom_parts:
                 nom = ' '.join(nom_parts).strip()
                 # Clean up: remove classification fragments leaked into name
                 # Remove "Skin Sens. 1B;" type fragments
-                nom = re.sub(r'\s*(?:Skin|Eye|Aquatic|Acute|Flam|Asp|Repr|STOT|Dam)\s+\w+[\.\s]*\d*\w*;?\s*H?\d*\s*', ' ', nom)
+                nom = _GIVAUDAN_RE_CLASSE_NOM.sub(' ', nom)
                 # Remove "(= synonym)" only from start — keep actual parenthetical names
-                nom = re.sub(r'^\s*\(=\s*', '', nom)
+                nom = _GIVAUDAN_RE_PREFIXE_EGAL.sub('', nom)
                 # Remove leading "= " or "(" artifacts
-                nom = re.sub(r'^[=\(\)\s]+', '', nom)
+                nom = _GIVAUDAN_RE_PONCTUATION_DEBUT.sub('', nom)
                 # Remove trailing ")' artifacts
                 nom = nom.strip().rstrip(')')
                 # Remove SECTION header that leaked in
-                nom = re.sub(r'SECTION\s+\d+\..*', '', nom, flags=re.IGNORECASE).strip()
+                nom = _GIVAUDAN_RE_SECTION.sub('', nom).strip()
                 
                 molecules.append({
                     'cas': cas,
@@ -1067,23 +1655,31 @@ def parse_composition_givaudan(s3):
     return unique
 
 
+# Motifs du format CPL Aromas (concentration, CAS, EINECS, H, nom)
+_TABULAR_RE_CONCENTRATION = PATTERNS.add(
+    'tabular.concentration', r'^([<>≤≥]\s*\d+\.?\d*|\d+\.?\d*\s*-\s*\d+\.?\d*)$')
+_TABULAR_RE_CAS = PATTERNS.add('tabular.cas', r'^(\d{2,7}-\d{2}-\d)$')
+_TABULAR_RE_EINECS = PATTERNS.add('tabular.einecs', r'^(\d{3}-\d{3}-\d)$')
+_TABULAR_RE_CODE_H_DEBUT = PATTERNS.add('tabular.code_h_debut', r'^H\d{3}')
+_TABULAR_RE_CODE_H = PATTERNS.add('tabular.code_h', r'H\d{3}[a-z]?')
+_TABULAR_RE_REACH = PATTERNS.add('tabular.reach', r'^0[0-9]-\d{9}')
+_TABULAR_RE_DEC = PATTERNS.add('tabular.dec', r'^\d-\d{2}-XXXX')
+_TABULAR_RE_ESPACES = PATTERNS.add('tabular.espaces', r'\s+')
+# En-têtes et mentions de tableau écartés avant l'analyse
+_TABULAR_RE_BRUIT = PATTERNS.group('tabular.bruit', [
+    r'^Conc\s*%', r'^CAS$', r'^EINECS$', r'^Facteur', r'^Classification',
+    r'^Description$', r'^DEC$', r'^REACH', r'^Page\s+\d+',
+    r'^EU\s+20', r'^Non applicable', r'^Un mélange', r'^3\.\d',
+    r'^SECTION', r'Fiche de donn', r'^M$', r'^CPL\s+Aromas',
+], re.IGNORECASE)
+
+
 def parse_composition_tabular(s3):
     """Parse format 'tabular' : CPL Aromas style (concentration -> CAS -> EINECS -> H -> name)."""
-    RE_CONC_TAB = re.compile(r'^([<>≤≥]\s*\d+\.?\d*|\d+\.?\d*\s*-\s*\d+\.?\d*)$')
-    RE_CAS_STRICT = re.compile(r'^(\d{2,7}-\d{2}-\d)$')
-    RE_EINECS_STRICT = re.compile(r'^(\d{3}-\d{3}-\d)$')
-    RE_HLINE = re.compile(r'^H\d{3}')
-    
-    NOISE = [
-        r'^Conc\s*%', r'^CAS$', r'^EINECS$', r'^Facteur', r'^Classification',
-        r'^Description$', r'^DEC$', r'^REACH', r'^Page\s+\d+',
-        r'^EU\s+20', r'^Non applicable', r'^Un mélange', r'^3\.\d',
-        r'^SECTION', r'Fiche de donn', r'^M$', r'^CPL\s+Aromas',
-    ]
     
     def is_noise(line):
-        for p in NOISE:
-            if re.match(p, line, re.IGNORECASE): return True
+        for p in _TABULAR_RE_BRUIT:
+            if p.match(line): return True
         return False
     
     lines = [l.strip() for l in s3.split('\n') if l.strip() and not is_noise(l)]
@@ -1092,7 +1688,7 @@ def parse_composition_tabular(s3):
     
     while i < len(lines):
         line = lines[i]
-        if not RE_CONC_TAB.match(line):
+        if not _TABULAR_RE_CONCENTRATION.match(line):
             i += 1; continue
         
         conc = line
@@ -1107,27 +1703,27 @@ def parse_composition_tabular(s3):
             if is_noise(L): j += 1; continue
             
             if state == 'SEEK_CAS':
-                if RE_CAS_STRICT.match(L): cas = L; state = 'SEEK_EINECS'
+                if _TABULAR_RE_CAS.match(L): cas = L; state = 'SEEK_EINECS'
                 else: state = 'DONE'; continue
             elif state == 'SEEK_EINECS':
-                if RE_EINECS_STRICT.match(L): einecs = L; state = 'COLLECT_H'
+                if _TABULAR_RE_EINECS.match(L): einecs = L; state = 'COLLECT_H'
                 else: state = 'COLLECT_H'; continue
             elif state == 'COLLECT_H':
-                if RE_HLINE.match(L):
-                    codes = re.findall(r'H\d{3}[a-z]?', L)
+                if _TABULAR_RE_CODE_H_DEBUT.match(L):
+                    codes = _TABULAR_RE_CODE_H.findall(L)
                     classif = ','.join(set(classif.split(',') + codes) - {''}) if classif else ','.join(codes)
                 elif L.isdigit() and len(L) <= 2: state = 'SEEK_NAME'
                 else: state = 'SEEK_NAME'; continue
             elif state == 'SEEK_NAME':
                 if L.isdigit() and len(L) <= 2: pass
-                elif re.match(r'^0[0-9]-\d{9}', L): pass  # REACH
-                elif re.match(r'^\d-\d{2}-XXXX', L): pass  # DEC
-                elif RE_CONC_TAB.match(L) or RE_CAS_STRICT.match(L): state = 'DONE'; continue
+                elif _TABULAR_RE_REACH.match(L): pass  # REACH
+                elif _TABULAR_RE_DEC.match(L): pass  # DEC
+                elif _TABULAR_RE_CONCENTRATION.match(L) or _TABULAR_RE_CAS.match(L): state = 'DONE'; continue
                 else: nom_parts.append(L); state = 'COLLECT_NAME'
             elif state == 'COLLECT_NAME':
-                if RE_CONC_TAB.match(L) or RE_CAS_STRICT.match(L) or is_noise(L):
+                if _TABULAR_RE_CONCENTRATION.match(L) or _TABULAR_RE_CAS.match(L) or is_noise(L):
                     state = 'DONE'; continue
-                elif re.match(r'^0[0-9]-\d{9}', L) or re.match(r'^\d-\d{2}-XXXX', L): pass
+                elif _TABULAR_RE_REACH.match(L) or _TABULAR_RE_DEC.match(L): pass
                 elif L.isdigit() and len(L) <= 2: pass
                 else:
                     nom_parts.append(L)
@@ -1135,7 +1731,7 @@ def parse_composition_tabular(s3):
             j += 1
         
         if cas:
-            nom = re.sub(r'\s+', ' ', ' '.join(nom_parts).strip())
+            nom = _TABULAR_RE_ESPACES.sub(' ', ' '.join(nom_parts).strip())
             molecules.append({
                 'cas': cas, 'concentration': conc,
                 'nom_chimique': nom, 'einecs': einecs,
@@ -1147,6 +1743,17 @@ def parse_composition_tabular(s3):
     return [m for m in molecules if m['cas'] not in seen and not seen.add(m['cas'])]
 
 
+# Motifs du format générique (ligne CAS + concentration)
+_GENERIC_RE_EINECS = PATTERNS.add('generic.einecs', r'^\d{3}-\d{3}-\d$')
+_GENERIC_RE_NOMBRE_FIN = PATTERNS.add('generic.nombre_fin', r'(\d+[.,]\d+|\d+)\s*$')
+_GENERIC_RE_DECIMAL_FIN = PATTERNS.add('generic.decimal_fin', r'(\d+[.,]\d+)\s*$')
+_GENERIC_RE_PONCTUATION_DEBUT = PATTERNS.add('generic.ponctuation_debut', r'^[\.\*\s]+')
+_GENERIC_RE_CLASSE_DANGER = PATTERNS.add(
+    'generic.classe_danger', r'\s+(?:Skin|Eye|Flam|Asp|Acute|Aquatic|H\d{3})')
+_GENERIC_RE_EINECS_LIBELLE = PATTERNS.add(
+    'generic.einecs_libelle', r'(?:Numéro\s*CE|EINECS)[:\s]*(\d{3}-\d{3}-\d)')
+
+
 def parse_composition_generic(s3):
     """Generic parser: scan for CAS numbers and extract name + concentration from same/nearby lines.
     Works well with OCR output where CAS, name, and % appear on the same line."""
@@ -1159,13 +1766,13 @@ def parse_composition_generic(s3):
         cas = cas_m.group(1)
         
         # Skip EINECS-like patterns (3 digits - 3 digits - 1 digit)
-        if re.match(r'^\d{3}-\d{3}-\d$', cas): continue
+        if _GENERIC_RE_EINECS.match(cas): continue
         
         # Extract name: text after CAS, before concentration
         after_cas = line[cas_m.end():].strip()
         
         # Look for concentration (number with comma or dot, possibly at end of line)
-        conc_m = re.search(r'(\d+[.,]\d+|\d+)\s*$', after_cas)
+        conc_m = _GENERIC_RE_NOMBRE_FIN.search(after_cas)
         conc = 0
         name = after_cas
         if conc_m:
@@ -1177,27 +1784,27 @@ def parse_composition_generic(s3):
         # If no concentration on same line, check if it's on a separate column
         if conc == 0:
             # Try to find concentration at end of line (full line)
-            conc_m2 = re.search(r'(\d+[.,]\d+)\s*$', line)
+            conc_m2 = _GENERIC_RE_DECIMAL_FIN.search(line)
             if conc_m2:
                 try: conc = float(conc_m2.group(1).replace(',', '.'))
                 except: pass
         
         # Clean name: remove leading dots, asterisks, whitespace
-        name = re.sub(r'^[\.\*\s]+', '', name).strip()
+        name = _GENERIC_RE_PONCTUATION_DEBUT.sub('', name).strip()
         # Remove trailing classification codes
-        name = re.split(r'\s+(?:Skin|Eye|Flam|Asp|Acute|Aquatic|H\d{3})', name)[0].strip()
+        name = _GENERIC_RE_CLASSE_DANGER.split(name)[0].strip()
         
         if not name:
             # Try next line for name
             if i + 1 < len(lines):
-                next_line = re.sub(r'^[\.\*\s]+', '', lines[i+1]).strip()
+                next_line = _GENERIC_RE_PONCTUATION_DEBUT.sub('', lines[i+1]).strip()
                 if next_line and not next_line.startswith('Numéro') and not RE_CAS.search(next_line):
                     name = next_line
         
         # Look for EINECS in nearby lines
         einecs = ''
         for j in range(i+1, min(i+5, len(lines))):
-            einecs_m = re.search(r'(?:Numéro\s*CE|EINECS)[:\s]*(\d{3}-\d{3}-\d)', lines[j])
+            einecs_m = _GENERIC_RE_EINECS_LIBELLE.search(lines[j])
             if einecs_m:
                 einecs = einecs_m.group(1)
                 break
@@ -1217,6 +1824,36 @@ def parse_composition_generic(s3):
     return [m for m in molecules if m['cas'] not in seen and not seen.add(m['cas'])]
 
 
+# Motifs du format universel (N° CAS: …, FDS françaises)
+_UNIVERSAL_RE_EINECS = PATTERNS.add('universal.einecs', r'^[23]\d{2}-\d{3}-\d$')
+_UNIVERSAL_RE_ANNEE = PATTERNS.add('universal.annee', r'^(19|20)\d{2}')
+_UNIVERSAL_RE_NOM = PATTERNS.add(
+    'universal.nom', r'^(?:Nom\s*chimique|Identification\s*chimique|Substance|Nom\s*du\s*composant|Chemical\s*name|Nom\s*IUPAC)\s*[:]\s*(.+)', re.IGNORECASE)
+_UNIVERSAL_RE_EC = PATTERNS.add(
+    'universal.ec', r'(?:EC|EINECS|Numéro\s*CE|CE)\s*[:#]?\s*(\d{3}-\d{3}-\d)', re.IGNORECASE)
+_UNIVERSAL_RE_PLAGE = PATTERNS.add(
+    'universal.plage', r'(?:Concentration|Teneur|%\s*en\s*poids)?\s*[:]?\s*(?:>=?\s*)?(\d+[.,]?\d*)\s*[-–]\s*(?:<\s*)?(\d+[.,]?\d*)\s*%?', re.IGNORECASE)
+_UNIVERSAL_RE_PLAGE_X = PATTERNS.add('universal.plage_x', r'(\d+\.?\d*)\s*<=\s*x\s*%?\s*<\s*(\d+\.?\d*)')
+_UNIVERSAL_RE_BORNE = PATTERNS.add(
+    'universal.borne', r'(?:Concentration\s*[:])?\s*[<>]=?\s*(\d+[.,]?\d*)\s*%', re.IGNORECASE)
+_UNIVERSAL_RE_POURCENTAGE_SEUL = PATTERNS.add('universal.pourcentage_seul', r'^(\d+[.,]\d+)\s*%\s*$')
+_UNIVERSAL_RE_CODE_H = PATTERNS.add('universal.code_h', r'H\d{3}')
+_UNIVERSAL_RE_ENTETE_PAGE = PATTERNS.add(
+    'universal.entete_page', r'^(RUBRIQUE|SECTION|SAFETY|Version|Page|\d)', re.IGNORECASE)
+_UNIVERSAL_RE_LIBELLE = PATTERNS.add(
+    'universal.libelle', r'^(N°|No|CAS|EC|EINECS|REACH|INDEX|GHS|Skin|Eye|Flam|Wng|Dgr)', re.IGNORECASE)
+_UNIVERSAL_RE_MOT = PATTERNS.add('universal.mot', r'[a-zA-ZÀ-ÿ]{3,}')
+_UNIVERSAL_RE_CONCENTRATION_DEBUT = PATTERNS.add('universal.concentration_debut', r'^\d+[.,]?\d*\s*[-–<>]')
+_UNIVERSAL_RE_LIBELLE_CAS = PATTERNS.add(
+    'universal.libelle_cas', r'^(N°\s*CAS|CAS\s*N°|CAS|No\s*CAS)\s*[:#]?\s*', re.IGNORECASE)
+_UNIVERSAL_RE_SEPARATEUR = PATTERNS.add('universal.separateur', r'^\s*[:#]?\s*')
+_UNIVERSAL_RE_PLAGE_POURCENTAGE = PATTERNS.add(
+    'universal.plage_pourcentage', r'(\d+[.,]?\d*)\s*[-–]\s*(\d+[.,]?\d*)\s*%')
+_UNIVERSAL_RE_CONCENTRATION_FIN = PATTERNS.add(
+    'universal.concentration_fin', r'\s*\d+[.,]?\d*\s*[-–]?\s*\d*[.,]?\d*\s*%?\s*$')
+_UNIVERSAL_RE_LETTRE = PATTERNS.add('universal.lettre', r'[a-zA-ZÀ-ÿ]')
+
+
 def parse_composition_universal(s3):
     """Parseur universel FDS — couvre les formats européens standard.
     
@@ -1241,10 +1878,10 @@ def parse_composition_universal(s3):
         for m in RE_CAS.finditer(line):
             cas = m.group(1)
             # Filtrer EINECS (format 2xx-xxx-x ou 3xx-xxx-x)
-            if re.match(r'^[23]\d{2}-\d{3}-\d$', cas):
+            if _UNIVERSAL_RE_EINECS.match(cas):
                 continue
             # Filtrer les faux positifs (dates, codes produit)
-            if re.match(r'^(19|20)\d{2}', cas):
+            if _UNIVERSAL_RE_ANNEE.match(cas):
                 continue
             # Validation check digit CAS (Chemical Abstracts Service)
             if not validate_cas_checkdigit(cas):
@@ -1283,14 +1920,14 @@ def parse_composition_universal(s3):
                 continue
             
             # Nom chimique — label explicite
-            nom_m = re.match(r'^(?:Nom\s*chimique|Identification\s*chimique|Substance|Nom\s*du\s*composant|Chemical\s*name|Nom\s*IUPAC)\s*[:]\s*(.+)', L, re.IGNORECASE)
+            nom_m = _UNIVERSAL_RE_NOM.match(L)
             if nom_m and not nom:
                 nom = nom_m.group(1).strip()
                 used_lines.add(j)
                 continue
             
             # EINECS / EC
-            ec_m = re.search(r'(?:EC|EINECS|Numéro\s*CE|CE)\s*[:#]?\s*(\d{3}-\d{3}-\d)', L, re.IGNORECASE)
+            ec_m = _UNIVERSAL_RE_EC.search(L)
             if ec_m:
                 einecs = ec_m.group(1)
                 used_lines.add(j)
@@ -1298,7 +1935,7 @@ def parse_composition_universal(s3):
             
             # Concentration — fourchette explicite
             # Format: 'Concentration: 20 - 30 %' ou '20 - 30' ou '>= 20 - < 30'
-            conc_m = re.search(r'(?:Concentration|Teneur|%\s*en\s*poids)?\s*[:]?\s*(?:>=?\s*)?(\d+[.,]?\d*)\s*[-–]\s*(?:<\s*)?(\d+[.,]?\d*)\s*%?', L, re.IGNORECASE)
+            conc_m = _UNIVERSAL_RE_PLAGE.search(L)
             if conc_m:
                 # Make sure we're not matching the CAS number itself as a concentration
                 match_text = conc_m.group(0)
@@ -1315,7 +1952,7 @@ def parse_composition_universal(s3):
                     except: pass
             
             # Concentration — format 'x <= x % < y' (Argeville/Robertet)
-            conc_m2 = re.search(r'(\d+\.?\d*)\s*<=\s*x\s*%?\s*<\s*(\d+\.?\d*)', L)
+            conc_m2 = _UNIVERSAL_RE_PLAGE_X.search(L)
             if conc_m2:
                 try:
                     v1, v2 = float(conc_m2.group(1)), float(conc_m2.group(2))
@@ -1327,7 +1964,7 @@ def parse_composition_universal(s3):
                 except: pass
             
             # Concentration — valeur unique '< 2.5%' ou '> 50%'
-            conc_m3 = re.search(r'(?:Concentration\s*[:])?\s*[<>]=?\s*(\d+[.,]?\d*)\s*%', L, re.IGNORECASE)
+            conc_m3 = _UNIVERSAL_RE_BORNE.search(L)
             if conc_m3 and not pct_min:
                 try:
                     v = float(conc_m3.group(1).replace(',', '.'))
@@ -1342,7 +1979,7 @@ def parse_composition_universal(s3):
                 except: pass
             
             # Concentration — valeur seule sur la ligne '16,6089%' ou '8.5 %'
-            conc_m4 = re.search(r'^(\d+[.,]\d+)\s*%\s*$', L)
+            conc_m4 = _UNIVERSAL_RE_POURCENTAGE_SEUL.search(L)
             if conc_m4 and not pct_min:
                 try:
                     v = float(conc_m4.group(1).replace(',', '.'))
@@ -1354,7 +1991,7 @@ def parse_composition_universal(s3):
                 except: pass
             
             # Classification H-codes
-            h_codes = re.findall(r'H\d{3}', L)
+            h_codes = _UNIVERSAL_RE_CODE_H.findall(L)
             if h_codes:
                 classification = ','.join(sorted(set(h_codes)))
         
@@ -1364,11 +2001,11 @@ def parse_composition_universal(s3):
                 # Ligne avec surtout des lettres, pas de CAS, pas un header
                 if (j != line_idx and j not in used_lines and 
                     len(L) > 3 and not RE_CAS.search(L) and
-                    not re.match(r'^(RUBRIQUE|SECTION|SAFETY|Version|Page|\d)', L, re.IGNORECASE) and
-                    not re.match(r'^(N°|No|CAS|EC|EINECS|REACH|INDEX|GHS|Skin|Eye|Flam|Wng|Dgr)', L, re.IGNORECASE) and
-                    re.search(r'[a-zA-ZÀ-ÿ]{3,}', L)):
+                    not _UNIVERSAL_RE_ENTETE_PAGE.match(L) and
+                    not _UNIVERSAL_RE_LIBELLE.match(L) and
+                    _UNIVERSAL_RE_MOT.search(L)):
                     # Check it's not a concentration line
-                    if not re.match(r'^\d+[.,]?\d*\s*[-–<>]', L):
+                    if not _UNIVERSAL_RE_CONCENTRATION_DEBUT.match(L):
                         nom = L.strip()
                         used_lines.add(j)
                         break
@@ -1378,14 +2015,14 @@ def parse_composition_universal(s3):
         before_cas = cas_line[:cas_line.find(cas)].strip()
         after_cas = cas_line[cas_line.find(cas) + len(cas):].strip()
         # Remove labels
-        before_cas = re.sub(r'^(N°\s*CAS|CAS\s*N°|CAS|No\s*CAS)\s*[:#]?\s*', '', before_cas, flags=re.IGNORECASE).strip()
-        after_cas = re.sub(r'^\s*[:#]?\s*', '', after_cas).strip()
+        before_cas = _UNIVERSAL_RE_LIBELLE_CAS.sub('', before_cas).strip()
+        after_cas = _UNIVERSAL_RE_SEPARATEUR.sub('', after_cas).strip()
         
         # Extract concentration from the line (after CAS) if not already found
         if not pct_min:
-            inline_conc = re.search(r'(\d+[.,]?\d*)\s*[-–]\s*(\d+[.,]?\d*)\s*%', after_cas)
+            inline_conc = _UNIVERSAL_RE_PLAGE_POURCENTAGE.search(after_cas)
             if not inline_conc:
-                inline_conc = re.search(r'(\d+[.,]?\d*)\s*[-–]\s*(\d+[.,]?\d*)\s*%', before_cas)
+                inline_conc = _UNIVERSAL_RE_PLAGE_POURCENTAGE.search(before_cas)
             if inline_conc:
                 try:
                     v1 = float(inline_conc.group(1).replace(',', '.'))
@@ -1398,11 +2035,11 @@ def parse_composition_universal(s3):
                 except: pass
         
         # Remove trailing numbers (leftover concentration) for name extraction
-        after_cas_clean = re.sub(r'\s*\d+[.,]?\d*\s*[-–]?\s*\d*[.,]?\d*\s*%?\s*$', '', after_cas).strip()
+        after_cas_clean = _UNIVERSAL_RE_CONCENTRATION_FIN.sub('', after_cas).strip()
         
         if not nom:
             candidate = after_cas_clean if len(after_cas_clean) > len(before_cas) else before_cas
-            if candidate and len(candidate) > 2 and re.search(r'[a-zA-ZÀ-ÿ]', candidate):
+            if candidate and len(candidate) > 2 and _UNIVERSAL_RE_LETTRE.search(candidate):
                 nom = candidate
         
         if cas:
@@ -1429,25 +2066,27 @@ def parse_composition_universal(s3):
 # ── XY-based universal composition parser ─────────────
 
 # Compiled regexes for XY parser
-_XY_RE_CAS = re.compile(r'^(\d{2,7}-\d{2}-\d)$')
-_XY_RE_PCT_BRACKET = re.compile(r'^\[\s*([\d.,]+)\s*[;-]\s*([\d.,]+)\s*\]\s*%?\s*$')
-_XY_RE_PCT_GIVAUDAN = re.compile(r'^(>=?\s*)?([\d.,]+)\s*-\s*(<?\s*)?([\d.,]+)\s*%?\s*$')
-_XY_RE_PCT_LT = re.compile(r'^<\s*([\d.,]+)\s*%?\s*$')
-_XY_RE_PCT_PLAIN = re.compile(r'^(\d+[.,]\d{2,})\s*%?\s*$')
-_XY_RE_EINECS = re.compile(r'^\d{3}-\d{3}-\d')
-_XY_RE_REACH = re.compile(r'^01-\d{7}')
-
-_XY_SKIP_PATTERNS = [
-    re.compile(r'^(Xn|Xi|N|F|T\+|C|O|E)\b.*R\d'),
-    re.compile(r'^R\d'),
-    re.compile(r'^(ATO|EHC|CAR|SCI|EHA|AH|EDI|FL|SS|REP|STO|ATD|ATI|EUH)'),
-    re.compile(r'^[;,]?\s*H\d{3}'),
-    re.compile(r'^(Mélange|Révision|Éditée|Version|Page|Date|\d+/\d+|FICHE|selon|Suite|DESIGNATION)'),
-    re.compile(r'^01-\d'),
-    re.compile(r'^\d+-\d{2}-[A-Z]{4}'),
-    re.compile(r'^Numéro'),
-    re.compile(r'^\*\s*(Acute|Skin|Eye|Aquatic|Repr|Flam|Chronic)'),
-]
+_XY_RE_CAS = PATTERNS.add('xy.cas', r'^(\d{2,7}-\d{2}-\d)$')
+_XY_RE_PCT_BRACKET = PATTERNS.add('xy.pct_crochets', r'^\[\s*([\d.,]+)\s*[;-]\s*([\d.,]+)\s*\]\s*%?\s*$')
+_XY_RE_PCT_GIVAUDAN = PATTERNS.add('xy.pct_givaudan', r'^(>=?\s*)?([\d.,]+)\s*-\s*(<?\s*)?([\d.,]+)\s*%?\s*$')
+_XY_RE_PCT_LT = PATTERNS.add('xy.pct_inferieur', r'^<\s*([\d.,]+)\s*%?\s*$')
+_XY_RE_PCT_PLAIN = PATTERNS.add('xy.pct_simple', r'^(\d+[.,]\d{2,})\s*%?\s*$')
+_XY_RE_EINECS = PATTERNS.add('xy.einecs', r'^\d{3}-\d{3}-\d')
+_XY_RE_REACH = PATTERNS.add('xy.reach', r'^01-\d{7}')
+_XY_RE_SECTION3 = PATTERNS.add('xy.section3', r'(?:SECTION|RUBRIQUE)\s*0?3\b', re.IGNORECASE)
+_XY_RE_SECTION4 = PATTERNS.add('xy.section4', r'(?:SECTION|RUBRIQUE)\s*0?4\b', re.IGNORECASE)
+
+_XY_SKIP_PATTERNS = PATTERNS.group('xy.ignore', [
+    r'^(Xn|Xi|N|F|T\+|C|O|E)\b.*R\d',
+    r'^R\d',
+    r'^(ATO|EHC|CAR|SCI|EHA|AH|EDI|FL|SS|REP|STO|ATD|ATI|EUH)',
+    r'^[;,]?\s*H\d{3}',
+    r'^(Mélange|Révision|Éditée|Version|Page|Date|\d+/\d+|FICHE|selon|Suite|DESIGNATION)',
+    r'^01-\d',
+    r'^\d+-\d{2}-[A-Z]{4}',
+    r'^Numéro',
+    r'^\*\s*(Acute|Skin|Eye|Aquatic|Repr|Flam|Chronic)',
+])
 _XY_SKIP_EXACT = {
     'Matière', 'Symbole danger', 'Pourcentage %', 'C.A.S', 'EINECS',
     'Classification GHS', 'Classification', '%', 'CAS', 'N° CAS',
@@ -1492,7 +2131,7 @@ def _xy_is_skip(text):
             return True
     return False
 
-def extract_composition_xy(pdf_path):
+def extract_composition_xy(pdf_path, pages=None):
     """Universal composition extractor using XY coordinates from PyMuPDF.
     
     CAS-anchored strategy:
@@ -1503,21 +2142,24 @@ def extract_composition_xy(pdf_path):
     5. Handle multi-line names via continuation rows
     
     Works with ALL FDS formats regardless of column ordering.
+    ``pages`` = (début, fin exclue) : un seul produit d'un classeur.
     """
     import fitz
     doc = fitz.open(pdf_path)
+    first, last = pages or (0, len(doc))
+    last = min(last, len(doc))
     
     all_items = []
-    page_height = doc[0].rect.height
+    page_height = doc[first].rect.height
     
     # ── Find Section 3 pages (between SECTION 3 and SECTION 4) ──
     s3_start = None
-    s3_end = len(doc)
-    for pnum in range(len(doc)):
-        page_text = doc[pnum].get_text()
-        if s3_start is None and re.search(r'(?:SECTION|RUBRIQUE)\s*0?3\b', page_text, re.IGNORECASE):
+    s3_end = last
+    for pnum in range(first, last):
+        page_text = page_texts(pdf_path, pnum, pnum + 1, doc)[0]
+        if s3_start is None and _XY_RE_SECTION3.search(page_text):
             s3_start = pnum
-        elif s3_start is not None and re.search(r'(?:SECTION|RUBRIQUE)\s*0?4\b', page_text, re.IGNORECASE):
+        elif s3_start is not None and _XY_RE_SECTION4.search(page_text):
             s3_end = pnum
             break
     
@@ -1638,6 +2280,9 @@ def extract_composition_xy(pdf_path):
     return molecules
 
 
+_RE_CAS_OCR = PATTERNS.add('composition.cas_ocr', r'[0-9OoIlSB]{2,7}-[0-9OoIlSB]{2}-[0-9OoIlSB]')
+
+
 def parse_composition(text):
     """Auto-detect format and parse Section 3."""
     s3 = get_section(text, 3, 4)
@@ -1658,11 +2303,15 @@ def parse_composition(text):
             s = s.replace('S', '5').replace('B', '8')
             return s
         # Match CAS-like patterns that may contain OCR errors
-        return re.sub(r'[0-9OoIlSB]{2,7}-[0-9OoIlSB]{2}-[0-9OoIlSB]', fix_cas_like, text_block)
+        return _RE_CAS_OCR.sub(fix_cas_like, text_block)
     
     s3 = clean_ocr_cas(s3)
     
     fmt = detect_format(s3)
+    # Trace (métriques) : branche détectée, puis profondeur de cascade
+    # 1 = parseur détecté, 2 = universel, 3 = générique, 4 = tous
+    _TRACE['format'] = fmt
+    _TRACE['cascade'] = 1
     
     if fmt == 'labeled':
         result = parse_composition_labeled(s3)
@@ -1685,10 +2334,13 @@ def parse_composition(text):
     
     # Fallback: if detected parser returned nothing, try universal then generic then all
     if not result:
+        _TRACE['cascade'] = 2
         result = parse_composition_universal(s3)
     if not result:
+        _TRACE['cascade'] = 3
         result = parse_composition_generic(s3)
     if not result:
+        _TRACE['cascade'] = 4
         r1 = parse_composition_labeled(s3)
         r2 = parse_composition_tabular(s3)
         r3 = parse_composition_givaudan(s3)
@@ -1726,34 +2378,26 @@ def _validate_cas_numbers(components):
     - Marque les CAS non valides
     
     Source: Chemical Abstracts Service Registry Number check digit algorithm
+    
+    Les composants (dicts ou FdsComponent fraîchement extraits) sont
+    annotés sur place, sans copie.
     """
-    validated = []
     for comp in components:
         cas = comp.get('cas', '')
-        if not cas:
-            validated.append(comp)
+        if not cas or validate_cas_checkdigit(cas):
             continue
-        
-        if validate_cas_checkdigit(cas):
-            # CAS valide
-            validated.append(comp)
+        # Tenter de corriger un chiffre OCR erroné
+        corrected = _try_correct_cas_ocr(cas)
+        if corrected:
+            comp['cas'] = corrected
+            comp['cas_original'] = cas
+            comp['cas_corrige'] = True
         else:
-            # Tenter de corriger un chiffre OCR erroné
-            corrected = _try_correct_cas_ocr(cas)
-            if corrected:
-                comp_copy = dict(comp)
-                comp_copy['cas'] = corrected
-                comp_copy['cas_original'] = cas
-                comp_copy['cas_corrige'] = True
-                validated.append(comp_copy)
-            else:
-                # CAS invalide et non corrigeable — on le marque
-                comp_copy = dict(comp)
-                comp_copy['cas_invalide'] = True
-                comp_copy['nom_chimique'] = comp.get('nom_chimique', '') + ' (CAS invalide)'
-                validated.append(comp_copy)
+            # CAS invalide et non corrigeable — on le marque
+            comp['cas_invalide'] = True
+            comp['nom_chimique'] = comp.get('nom_chimique', '') + ' (CAS invalide)'
     
-    return validated
+    return components
 
 
 def _try_correct_cas_ocr(cas_str):
@@ -1819,6 +2463,13 @@ def _try_correct_cas_ocr(cas_str):
     return None
 
 
+_RE_CONC_RANGE = PATTERNS.add('concentration.plage', r'([\d]+[,.]?\d*)\s*-\s*([\d]+[,.]?\d*)')
+_RE_CONC_IFF = PATTERNS.add('concentration.iff', r'>=?\s*([\d]+[,.]?\d*)\s*-\s*<\s*([\d]+[,.]?\d*)')
+_RE_CONC_ARGEVILLE = PATTERNS.add('concentration.argeville', r'([\d]+\.?\d*)\s*<=\s*x\s*%?\s*<\s*([\d]+\.?\d*)')
+_RE_CONC_LESS_THAN = PATTERNS.add('concentration.inferieur', r'<\s*([\d]+[,.]?\d*)')
+_RE_CONC_GREATER_THAN = PATTERNS.add('concentration.superieur', r'>\s*([\d]+[,.]?\d*)')
+
+
 def _normalize_concentrations(components):
     """Convertir 'concentration' string en pourcentage_min/pourcentage_max numériques.
     Gère les formats :
@@ -1829,12 +2480,6 @@ def _normalize_concentrations(components):
       - '< 2.5' (plage haute uniquement)
       - '> 50' (plage basse uniquement)
     """
-    RE_RANGE = re.compile(r'([\d]+[,.]?\d*)\s*-\s*([\d]+[,.]?\d*)')
-    RE_IFF = re.compile(r'>=?\s*([\d]+[,.]?\d*)\s*-\s*<\s*([\d]+[,.]?\d*)')
-    RE_ARGEVILLE = re.compile(r'([\d]+\.?\d*)\s*<=\s*x\s*%?\s*<\s*([\d]+\.?\d*)')
-    RE_LESS_THAN = re.compile(r'<\s*([\d]+[,.]?\d*)')
-    RE_GREATER_THAN = re.compile(r'>\s*([\d]+[,.]?\d*)')
-    
     for comp in components:
         conc = comp.get('concentration', '')
         if not conc:
@@ -1851,35 +2496,35 @@ def _normalize_concentrations(components):
         pmin, pmax = None, None
         
         # Format IFF : ">= 30 - < 50"
-        m = RE_IFF.search(conc)
+        m = _RE_CONC_IFF.search(conc)
         if m:
             pmin = _parse_number(m.group(1))
             pmax = _parse_number(m.group(2))
         
         # Format Argeville : "10 <= x % < 25"
         if pmin is None:
-            m = RE_ARGEVILLE.search(conc)
+            m = _RE_CONC_ARGEVILLE.search(conc)
             if m:
                 pmin = _parse_number(m.group(1))
                 pmax = _parse_number(m.group(2))
         
         # Format standard : "30-50" ou "2.5-10"
         if pmin is None:
-            m = RE_RANGE.search(conc)
+            m = _RE_CONC_RANGE.search(conc)
             if m:
                 pmin = _parse_number(m.group(1))
                 pmax = _parse_number(m.group(2))
         
         # Format "< 2.5"
         if pmin is None:
-            m = RE_LESS_THAN.search(conc)
+            m = _RE_CONC_LESS_THAN.search(conc)
             if m:
                 pmin = 0
                 pmax = _parse_number(m.group(1))
         
         # Format "> 50"
         if pmin is None:
-            m = RE_GREATER_THAN.search(conc)
+            m = _RE_CONC_GREATER_THAN.search(conc)
             if m:
                 pmin = _parse_number(m.group(1))
                 pmax = 100
@@ -1897,8 +2542,66 @@ def _normalize_concentrations(components):
 
 # ── Section 9 : Properties (FR + EN) ─────────────────
 
+_RE_POINT_ECLAIR_F_C = PATTERNS.group('proprietes.point_eclair_f_c', [
+    r'[Ff]lash\s*[Pp]oint\s*[:\s·]*\n?\s*:?\s*[\d.,]+\s*°?\s*F\s*\(\s*(\d+[,.]?\d*)\s*°?\s*C\s*\)',   # IFF: "Flash point : 273 °F (134 °C)"
+    r'[Ff]lash\s*[Pp]oint\s*[:\s·]*\n?\s*:?\s*[<>]=?\s*[\d.,]+\s*°?\s*F\s*\(\s*[<>]=?\s*(\d+[,.]?\d*)\s*°?\s*C\s*\)',   # IFF: ">= 200 °F (>= 93 °C)"
+    r'[Pp]oint.*?[ée]clair\s*[:\s]*\n?\s*:?\s*[\d.,]+\s*°?\s*F\s*\(\s*(\d+[,.]?\d*)\s*°?\s*C\s*\)',   # FR+IFF: "Point éclair : 174 °F (79 °C)"
+    r'(\d+[,.]?\d*)\s*°\s*F\s*\(\s*(\d+[,.]?\d*)\s*°\s*C\s*\)',  # Generic: any "XX °F (YY °C)" near flash context
+])
+_RE_POINT_ECLAIR = PATTERNS.group('proprietes.point_eclair', [
+    r"[Ff]lash\s*[Pp]oint\s*\n\s*:\s*\n\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°?\s*C",  # IFF multi-line: "Flash point\n:\n129,00 °C"
+    r"[Pp]oint\s*[dD]'?\s*[ée]clair\s*\n\s*:\s*\n\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°",  # FR multi-line: "Point d'éclair\n:\n82 °C"
+    r"clair\s*:?\s*\n\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°",          # FR next line (Robertet)
+    r"[Ee]clair\s*[^:]*\n\s*:\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°",  # Jean Niel: "Point Eclair (...)\n: >60 °C"
+    r"clair\s*[:\s]+(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°",               # FR same line
+    r"[Pp]oint\s+[ée]clair\s*(?:\(°C\))?\s*[:\s]*(?:[<>]=?\s*)?(\d+[,.]?\d*)",
+    r"[Ff]lash\s*[Pp]oint\s*\(?°?\s*C\)?\s*[:\s]*(?:[<>]=?\s*)?(\d+[,.]?\d*)",  # CPL EN: "Flash Point (°C) >70"
+    r"[Ff]lash\s*[Pp]oint\s*[:\s·]*\n?\s*:?\s*(?:FP\s*)?(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°?\s*C",  # EN: "Flash point : 79 °C"
+    r"[Ff]lash\s*[Pp]oint\s*[:\s·]*\n?\s*:?\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°?\s*F",            # EN Fahrenheit only (convert)
+])
+_RE_DENSITE = PATTERNS.group('proprietes.densite', [
+    r'[Dd]ensit[ée]\s+relative\s*:?\s*\n?\s*([\d,\.]+)\s*(?:-\s*[\d,\.]+)?',  # Robertet range
+    r'[Dd]ensit[ée]\s*[^[]*\[\s*([\d,\.]+)\s*;\s*([\d,\.]+)\s*\]',            # Jean Niel: [0.9170;0.9370] (flexible)
+    r'[Dd]ensit[ée]\s*[:\s]*([\d,\.]+)',
+    r'[Dd]ensity\s*[:\s]*(\d+\.?\d*)',
+])
+_RE_EBULLITION = PATTERNS.group('proprietes.ebullition', [
+    r"[ée]bullition\s*[:\s]*([<>]?\s*\d+\.?\d*)",
+    r"[Bb]oiling\s+point.*?[:\s]*([<>]?\s*\d+\.?\d*)",
+], re.IGNORECASE)
+_RE_VISCOSITE = PATTERNS.group('proprietes.viscosite', [
+    r'[Vv]iscosit[ée]\s*[:\s]*(\d+\.?\d*)',
+    r'[Vv]iscosity.*?[:\s]*(?:v\s*[<>]\s*)?(\d+\.?\d*)\s*mm',
+])
+_RE_ETAT = PATTERNS.group('proprietes.etat', [
+    r'[ÉEé]tat\s+[Pp]hysique\s*:\s*(.+?)\.',
+    r'[ÉEé]tat\s*[:\s]*(\w+)',
+    r'Physical\s+state\s*:\s*\n?\s*(.+?)\.',
+])
+_RE_COULEUR = PATTERNS.group('proprietes.couleur', [
+    r'[Cc]ouleur\s*[:\s]*(.+?)(?:\n|$)',
+    r'[Cc]olou?r\s*\n\s*(.+?)(?:\n|$)',
+])
+_RE_HYDROSOLUBILITE = PATTERNS.group('proprietes.hydrosolubilite', [
+    r'[Hh]ydrosolub.*?[:\s]*(Non|Oui)',
+    r'[Ww]ater\s+solub.*?[:\s]*(Insoluble|Soluble)',
+], re.IGNORECASE)
+
+_GUARD_POINT_ECLAIR_F_C = PatternGuard(_RE_POINT_ECLAIR_F_C, ('flash', 'flash', 'clair', '°'))
+_GUARD_POINT_ECLAIR = PatternGuard(_RE_POINT_ECLAIR, (
+    'flash', 'clair', 'clair', 'clair', 'clair', 'clair', 'flash', 'flash', 'flash'))
+_GUARD_DENSITE = PatternGuard(_RE_DENSITE, ('densit', 'densit', 'densit', 'density'))
+_GUARD_EBULLITION = PatternGuard(_RE_EBULLITION, ('bullition', 'boiling'))
+_GUARD_VISCOSITE = PatternGuard(_RE_VISCOSITE, ('viscosit', 'viscosity'))
+_GUARD_ETAT = PatternGuard(_RE_ETAT, ('physique', 'tat', 'physical'))
+_GUARD_COULEUR = PatternGuard(_RE_COULEUR, ('couleur', 'colo'))
+_GUARD_HYDROSOLUBILITE = PatternGuard(_RE_HYDROSOLUBILITE, ('hydrosolub', 'water'))
+
+
 def parse_properties(text):
+    """Section 9 (repli Section 5 puis texte complet pour le point éclair)."""
     s9 = get_section(text, 9, 10)
+    s9_low = s9.lower()
     p = {}
 
     # Flash point (FR: "Point éclair" / "Point d'éclair", EN: "Flash point")
@@ -1916,15 +2619,11 @@ def parse_properties(text):
     for zone in search_zones:
         if 'flash_point_c' in p:
             break
+        low = s9_low if zone is s9 else zone.lower()
             
         # IFF-specific: extract °C from "X °F (Y °C)" format FIRST
-        for pat in [
-            r'[Ff]lash\s*[Pp]oint\s*[:\s·]*\n?\s*:?\s*[\d.,]+\s*°?\s*F\s*\(\s*(\d+[,.]?\d*)\s*°?\s*C\s*\)',   # IFF: "Flash point : 273 °F (134 °C)"
-            r'[Ff]lash\s*[Pp]oint\s*[:\s·]*\n?\s*:?\s*[<>]=?\s*[\d.,]+\s*°?\s*F\s*\(\s*[<>]=?\s*(\d+[,.]?\d*)\s*°?\s*C\s*\)',   # IFF: ">= 200 °F (>= 93 °C)"
-            r'[Pp]oint.*?[ée]clair\s*[:\s]*\n?\s*:?\s*[\d.,]+\s*°?\s*F\s*\(\s*(\d+[,.]?\d*)\s*°?\s*C\s*\)',   # FR+IFF: "Point éclair : 174 °F (79 °C)"
-            r'(\d+[,.]?\d*)\s*°\s*F\s*\(\s*(\d+[,.]?\d*)\s*°\s*C\s*\)',  # Generic: any "XX °F (YY °C)" near flash context
-        ]:
-            m = re.search(pat, zone)
+        for pat in _GUARD_POINT_ECLAIR_F_C.iter(low):
+            m = pat.search(zone)
             if m:
                 # Last pattern has 2 groups (F and C)
                 if m.lastindex and m.lastindex >= 2:
@@ -1938,22 +2637,12 @@ def parse_properties(text):
             break
         
         # Standard FR/EN patterns
-        for pat in [
-            r"[Ff]lash\s*[Pp]oint\s*\n\s*:\s*\n\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°?\s*C",  # IFF multi-line: "Flash point\n:\n129,00 °C"
-            r"[Pp]oint\s*[dD]'?\s*[ée]clair\s*\n\s*:\s*\n\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°",  # FR multi-line: "Point d'éclair\n:\n82 °C"
-            r"clair\s*:?\s*\n\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°",          # FR next line (Robertet)
-            r"[Ee]clair\s*[^:]*\n\s*:\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°",  # Jean Niel: "Point Eclair (...)\n: >60 °C"
-            r"clair\s*[:\s]+(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°",               # FR same line
-            r"[Pp]oint\s+[ée]clair\s*(?:\(°C\))?\s*[:\s]*(?:[<>]=?\s*)?(\d+[,.]?\d*)",
-            r"[Ff]lash\s*[Pp]oint\s*\(?°?\s*C\)?\s*[:\s]*(?:[<>]=?\s*)?(\d+[,.]?\d*)",  # CPL EN: "Flash Point (°C) >70"
-            r"[Ff]lash\s*[Pp]oint\s*[:\s·]*\n?\s*:?\s*(?:FP\s*)?(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°?\s*C",  # EN: "Flash point : 79 °C"
-            r"[Ff]lash\s*[Pp]oint\s*[:\s·]*\n?\s*:?\s*(?:[<>]=?\s*)?(\d+[,.]?\d*)\s*°?\s*F",            # EN Fahrenheit only (convert)
-        ]:
-            m = re.search(pat, zone)
+        for pat in _GUARD_POINT_ECLAIR.iter(low):
+            m = pat.search(zone)
             if m: 
                 val = m.group(1).strip().replace(',', '.')
                 # Check if this is Fahrenheit (last pattern)
-                if '°F' in m.group(0) or '° F' in m.group(0) or pat.endswith("F"):
+                if '°F' in m.group(0) or '° F' in m.group(0) or pat.pattern.endswith("F"):
                     try:
                         celsius = round((float(val) - 32) * 5 / 9, 1)
                         p['flash_point_c'] = str(celsius)
@@ -1973,13 +2662,8 @@ def parse_properties(text):
 
     # Density (FR: "Densité", EN: "Density")
     # Robertet: "Densité relative :\n0,9540 -     0,9740  (20°C)"
-    for pat in [
-        r'[Dd]ensit[ée]\s+relative\s*:?\s*\n?\s*([\d,\.]+)\s*(?:-\s*[\d,\.]+)?',  # Robertet range
-        r'[Dd]ensit[ée]\s*[^[]*\[\s*([\d,\.]+)\s*;\s*([\d,\.]+)\s*\]',            # Jean Niel: [0.9170;0.9370] (flexible)
-        r'[Dd]ensit[ée]\s*[:\s]*([\d,\.]+)',
-        r'[Dd]ensity\s*[:\s]*(\d+\.?\d*)',
-    ]:
-        m = re.search(pat, s9)
+    for pat in _GUARD_DENSITE.iter(s9_low):
+        m = pat.search(s9)
         if m: 
             if m.lastindex and m.lastindex >= 2:
                 # Range — average
@@ -1991,32 +2675,26 @@ def parse_properties(text):
             break
 
     # Boiling point
-    for pat in [
-        r"[ée]bullition\s*[:\s]*([<>]?\s*\d+\.?\d*)",
-        r"[Bb]oiling\s+point.*?[:\s]*([<>]?\s*\d+\.?\d*)",
-    ]:
-        m = re.search(pat, s9, re.IGNORECASE)
+    for pat in _GUARD_EBULLITION.iter(s9_low):
+        m = pat.search(s9)
         if m: p['ebullition_c'] = m.group(1).strip(); break
 
     # Viscosity
-    for pat in [
-        r'[Vv]iscosit[ée]\s*[:\s]*(\d+\.?\d*)',
-        r'[Vv]iscosity.*?[:\s]*(?:v\s*[<>]\s*)?(\d+\.?\d*)\s*mm',
-    ]:
-        m = re.search(pat, s9)
+    for pat in _GUARD_VISCOSITE.iter(s9_low):
+        m = pat.search(s9)
         if m: p['viscosite'] = m.group(1).strip(); break
 
     # Physical state
-    for pat in [r'[ÉEé]tat\s+[Pp]hysique\s*:\s*(.+?)\.', r'[ÉEé]tat\s*[:\s]*(\w+)', r'Physical\s+state\s*:\s*\n?\s*(.+?)\.']:
-        m = re.search(pat, s9)
+    for pat in _GUARD_ETAT.iter(s9_low):
+        m = pat.search(s9)
         if m:
             val = m.group(1).strip()
             if val.lower() not in ('non', 'not'):
                 p['etat'] = val; break
 
     # Colour
-    for pat in [r'[Cc]ouleur\s*[:\s]*(.+?)(?:\n|$)', r'[Cc]olou?r\s*\n\s*(.+?)(?:\n|$)']:
-        m = re.search(pat, s9)
+    for pat in _GUARD_COULEUR.iter(s9_low):
+        m = pat.search(s9)
         if m:
             val = m.group(1).strip()
             if val.lower() not in ('unspecified', 'not stated', 'not specified'):
@@ -2024,30 +2702,241 @@ def parse_properties(text):
             break
 
     # Water solubility
-    for pat in [r'[Hh]ydrosolub.*?[:\s]*(Non|Oui)', r'[Ww]ater\s+solub.*?[:\s]*(Insoluble|Soluble)']:
-        m = re.search(pat, s9, re.IGNORECASE)
+    for pat in _GUARD_HYDROSOLUBILITE.iter(s9_low):
+        m = pat.search(s9)
         if m: p['hydrosolubilite'] = m.group(1).strip(); break
 
     return p
 
 
+# ── Modèle compact (gros lots) ───────────────────────
+# Un composant = 5 à 10 clés répétées des milliers de fois dans une archive.
+# Enregistrements à __slots__ (pas de __dict__ par objet), chaînes internées
+# (CAS, EINECS, classifications, fournisseurs : une seule copie en mémoire
+# même après transfert depuis les workers) et ordre des clés partagé entre
+# enregistrements de même forme. Accès façon dict (get, [], in, items) pour
+# le code existant ; conversion au format JSON uniquement en sortie (_to_json).
+
+_KEY_ORDERS = {}
+
+
+def _key_order(keys):
+    """Tuple d'ordre des clés, partagé entre tous les enregistrements de même forme."""
+    keys = tuple(keys)
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+def _intern(v):
+    return sys.intern(v) if type(v) is str else v
+
+
+class _Record:
+    """Base à slots : clés connues dans les slots, clés rares dans ``_extra``."""
+    __slots__ = ('_order', '_extra')
+    SLOTS = frozenset()
+    INTERNED = frozenset()
+
+    def __init__(self):
+        self._order = ()
+        self._extra = None
+
+    def __getitem__(self, key):
+        if key not in self._order:
+            raise KeyError(key)
+        return getattr(self, key) if key in self.SLOTS else self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.INTERNED:
+            value = _intern(value)
+        if key in self.SLOTS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+        if key not in self._order:
+            self._order = _key_order(self._order + (key,))
+
+    def __contains__(self, key):
+        return key in self._order
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __len__(self):
+        return len(self._order)
+
+    def get(self, key, default=None):
+        return self[key] if key in self._order else default
+
+    def keys(self):
+        return self._order
+
+    def items(self):
+        return [(k, self[k]) for k in self._order]
+
+    def to_dict(self):
+        return {k: self[k] for k in self._order}
+
+    @classmethod
+    def from_dict(cls, d):
+        rec = cls()
+        for k, v in d.items():
+            rec[k] = v
+        return rec
+
+    def pack(self):
+        """Forme (clés, valeurs) en tuples : transfert worker → parent sans
+        référence de classe (compatible spawn) ; réinternée par unpack()."""
+        return self._order, tuple(self[k] for k in self._order)
+
+    @classmethod
+    def unpack(cls, packed):
+        rec = cls()
+        for k, v in zip(*packed):
+            rec[k] = v
+        return rec
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+
+class FdsComponent(_Record):
+    """Composant de la Section 3 (cas, nom_chimique, concentration, bornes %, EINECS, classification)."""
+    __slots__ = ('cas', 'nom_chimique', 'concentration', 'pourcentage_min', 'pourcentage_max',
+                 'einecs', 'classification')
+    SLOTS = frozenset(__slots__)
+    INTERNED = frozenset(('cas', 'nom_chimique', 'concentration', 'einecs', 'classification', 'cas_original'))
+
+
+class FdsDocument(_Record):
+    """Résultat de parse_fds() ; ``composition`` est une liste de FdsComponent."""
+    __slots__ = ('fichier', 'identification', 'classification_globale', 'composition',
+                 'proprietes_physiques', 'nb_composants', '_meta')
+    SLOTS = frozenset(__slots__)
+
+    def __setitem__(self, key, value):
+        if key == 'composition':
+            value = [c if isinstance(c, FdsComponent)
+                     else FdsComponent.unpack(c) if isinstance(c, tuple) else FdsComponent.from_dict(c)
+                     for c in value]
+        elif key == 'identification' and value:
+            value = {k: _intern(v) if k == 'fournisseur' else v for k, v in value.items()}
+        _Record.__setitem__(self, key, value)
+
+    def pack(self):
+        return self._order, tuple([c.pack() for c in v] if k == 'composition' else v
+                                  for k, v in self.items())
+
+
+def _to_json(obj):
+    """``default`` de json.dump(s) : enregistrements compacts → format JSON habituel."""
+    if isinstance(obj, _Record):
+        return obj.to_dict()
+    raise TypeError(f'{type(obj).__name__} non sérialisable en JSON')
+
+
 # ── Assemblage ───────────────────────────────────────
 
-def parse_fds(pdf_path):
-    text = extract_text(pdf_path)
-    
+# Champs de sortie de parse_fds() et nombre de pages de texte lues d'abord
+# pour chacun (None = document complet). La Section 1 tient d'ordinaire sur
+# les 2 premières pages, la Section 2 sur les 3 premières ; la composition
+# (repli texte) et les propriétés (repli plein texte) exigent tout le document.
+FDS_FIELDS = {
+    'identification': 2,
+    'classification_globale': 3,
+    'composition': None,
+    'proprietes_physiques': None,
+}
+# Section dont l'en-tête borne un champ lu sur les premières pages : tant
+# qu'il n'est pas atteint (page de garde, Section 2 longue), la lecture
+# s'étend (voir _leading_text)
+FIELD_END_SECTION = {
+    'identification': 2,
+    'classification_globale': 3,
+}
+_FIELD_ALIASES = {
+    'classification': 'classification_globale',
+    'composants': 'composition',
+    'proprietes': 'proprietes_physiques',
+    'properties': 'proprietes_physiques',
+}
+
+
+def normalize_fields(fields):
+    """Valider une sélection de champs ('composition,identification' ou liste).
+
+    Retourne None pour « tous les champs ». Lève ValueError sur un champ inconnu.
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    selected = set()
+    for f in fields:
+        f = f.strip().lower()
+        if not f:
+            continue
+        f = _FIELD_ALIASES.get(f, f)
+        if f not in FDS_FIELDS:
+            raise ValueError(f'Champ inconnu : {f} (attendus : {", ".join(FDS_FIELDS)})')
+        selected.add(f)
+    if not selected or selected == set(FDS_FIELDS):
+        return None
+    return selected
+
+
+def _leading_text(pdf_path, max_pages, section, pages=None):
+    """Texte des ``max_pages`` premières pages, étendu (×2) jusqu'à contenir
+    l'en-tête de la Section ``section`` ou jusqu'à la fin du document."""
+    first, last = pages or (0, None)
+    while True:
+        text = extract_text(pdf_path, max_pages=max_pages, pages=pages)
+        if _RE_SECTION_ENTETE[section].search(text) or _RE_SECTION_NUMERO[section].search(text):
+            return text
+        stop = first + max_pages if last is None else min(last, first + max_pages)
+        if stop == last or len(page_texts(pdf_path, first, stop)) < stop - first:
+            return text
+        max_pages *= 2
+        _TRACE['pages_etendues'] = max_pages
+
+
+def parse_fds(pdf_path, fields=None, pages=None):
+    """Parser une FDS. ``fields`` restreint l'extraction aux champs demandés
+    (voir FDS_FIELDS) : seules les étapes et les pages utiles sont exécutées.
+    ``pages`` = (début, fin exclue), base 0 : un produit d'un classeur
+    (split_products) ; le résultat porte alors 'pages' = [première, dernière],
+    base 1.
+
+    Retourne un FdsDocument (accès façon dict, JSON via _to_json)."""
+    fields = normalize_fields(fields)
+    wanted = set(FDS_FIELDS) if fields is None else fields
+    comp = []
+    _TRACE.clear()
+
     # ── Primary: XY-based universal parser (works with all formats) ──
-    comp = extract_composition_xy(pdf_path)
-    if comp:
-        comp = _normalize_concentrations(comp)
-        comp = _validate_cas_numbers(comp)
-    
+    if 'composition' in wanted:
+        comp = extract_composition_xy(pdf_path, pages)
+        if comp:
+            _TRACE['composition'] = 'xy'
+            _TRACE['cascade'] = 0
+            comp = _normalize_concentrations(comp)
+            comp = _validate_cas_numbers(comp)
+
+    # Texte : uniquement les pages dont les champs restants ont besoin
+    need = {f: FDS_FIELDS[f] for f in wanted if f != 'composition' or not comp}
+    text = ''
+    if None in need.values():
+        text = extract_text(pdf_path, pages=pages)
+    elif need:
+        text = _leading_text(pdf_path, max(need.values()),
+                             max(FIELD_END_SECTION[f] for f in need), pages=pages)
+
     # ── Fallback: text-based parsers (for scanned PDFs or edge cases) ──
-    if not comp:
+    if 'composition' in wanted and not comp:
+        _TRACE['composition'] = 'texte'
         comp = parse_composition(text)  # includes its own normalize + validate
     
-    ident = parse_identification(text)
-    
     # ── Nettoyage central des noms composants ──
     # Remplace les noms parasites (GHS, headers, réglementaire) par CAS {num}
     for c in comp:
@@ -2056,18 +2945,30 @@ def parse_fds(pdf_path):
             cas = c.get('cas', '')
             c['nom_chimique'] = f'CAS {cas}' if cas else '?'
 
-    return {
-        'fichier': os.path.basename(pdf_path),
-        'identification': ident,
-        'classification_globale': parse_classification(text),
-        'composition': comp,
-        'proprietes_physiques': parse_properties(text),
-        'nb_composants': len(comp),
-        '_meta': {
-            'parseur': 'MFC fds-parser v5 (XY)' if comp else 'MFC fds-parser v5 (text fallback)',
-            'statut': 'brut',
-        }
-    }
+    if 'identification' in wanted or 'proprietes_physiques' in wanted:
+        _TRACE['langue'], _TRACE['famille'] = detect_route(get_section(text, 1, 2))
+
+    result = FdsDocument()
+    result['fichier'] = os.path.basename(pdf_path)
+    if pages:
+        result['pages'] = [pages[0] + 1, pages[1]]
+    if 'identification' in wanted:
+        result['identification'] = parse_identification(text)
+    if 'classification_globale' in wanted:
+        result['classification_globale'] = parse_classification(text)
+    if 'composition' in wanted:
+        result['composition'] = comp
+    if 'proprietes_physiques' in wanted:
+        result['proprietes_physiques'] = parse_properties(text)
+    if 'composition' in wanted:
+        result['nb_composants'] = len(comp)
+        parseur = 'MFC fds-parser v5 (XY)' if comp else 'MFC fds-parser v5 (text fallback)'
+    else:
+        parseur = 'MFC fds-parser v5'
+    result['_meta'] = {'parseur': parseur, 'statut': 'brut'}
+    if fields is not None:
+        result['_meta']['champs'] = sorted(fields)
+    return result
 
 
 # ── Duplicate Control ────────────────────────────────
@@ -2078,65 +2979,1811 @@ def deduplicate_results(results):
     unique = []
     dupes = []
     for r in results:
-        ident = r.get('identification', {})
-        key = (ident.get('nom', '').upper().strip(), ident.get('code', '').strip())
+        # Parsing sélectif sans identification : dédup par nom de fichier seul
+        key = None
+        if 'identification' in r:
+            ident = r.get('identification', {})
+            key = (ident.get('nom', '').upper().strip(), ident.get('code', '').strip())
         # Also dedupe by filename (without timestamp prefix)
         fname = re.sub(r'^\d+-', '', r.get('fichier', ''))
-        if key in seen or fname in seen:
+        if r.get('pages'):
+            # Produits d'un même classeur : même fichier, plages distinctes
+            fname += '#p%d-%d' % tuple(r['pages'])
+        if (key is not None and key in seen) or fname in seen:
             dupes.append(r.get('fichier', ''))
             continue
-        seen.add(key)
+        if key is not None:
+            seen.add(key)
         seen.add(fname)
         unique.append(r)
     return unique, dupes
 
 
-# ── CLI ──────────────────────────────────────────────
+# ── Quasi-doublons : MinHash + LSH ───────────────────
+# Révisions réémises, même formule sous un nom client, même fiche chez un
+# autre fournisseur : la composition (CAS, tranche de concentration) reste
+# quasi identique alors que nom, code et fichier changent. Signature MinHash
+# de cet ensemble, indexée par bandes LSH : seuls les documents qui partagent
+# une bande sont comparés (Jaccard exact), sans comparaison de toutes les paires.
+# Hachage multiply-shift 64 bits : NumPy (si présent) et Python pur donnent
+# exactement les mêmes signatures, un index reste portable entre machines.
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 fds-parser.py <fichier.pdf | dossier> [--output f.json]")
-        sys.exit(1)
-    path = sys.argv[1]
-    output = None
-    if '--output' in sys.argv:
-        idx = sys.argv.index('--output')
-        output = sys.argv[idx + 1] if idx + 1 < len(sys.argv) else 'fds-resultats.json'
-    
-    results = []
-    if os.path.isfile(path) and (path.lower().endswith('.pdf') or not os.path.splitext(path)[1]):
-        # Accept .pdf files and files without extension (multer temp uploads)
-        results.append(parse_fds(path))
-    elif os.path.isdir(path):
-        pdfs = sorted(glob.glob(os.path.join(path, '*.pdf')) + glob.glob(os.path.join(path, '*.PDF')))
-        total = len(pdfs)
-        print(json.dumps({'event': 'start', 'total': total}), flush=True)
-        for idx, pdf in enumerate(pdfs):
-            print(json.dumps({'event': 'progress', 'current': idx+1, 'total': total, 'fichier': os.path.basename(pdf)}), flush=True)
-            try:
-                results.append(parse_fds(pdf))
-            except Exception as e:
-                print(json.dumps({'event': 'error', 'fichier': os.path.basename(pdf), 'erreur': str(e)}), flush=True)
-        # Deduplicate
-        results, dupes = deduplicate_results(results)
-        if dupes:
-            print(json.dumps({'event': 'doublons', 'fichiers': dupes, 'count': len(dupes)}), flush=True)
-        print(json.dumps({'event': 'done', 'count': len(results), 'doublons_retires': len(dupes)}), flush=True)
-    else:
-        print(json.dumps({'event': 'error', 'erreur': f'{path} non reconnu'}), flush=True)
-        sys.exit(1)
-    
-    out = json.dumps(results, ensure_ascii=False, indent=2)
-    if output:
-        with open(output, 'w', encoding='utf-8') as f: f.write(out)
-        print(json.dumps({'event': 'saved', 'path': output, 'count': len(results)}), flush=True)
-    else:
-        # Force UTF-8 on Windows — all output via buffer to avoid cp1252 mixing
-        sys.stdout.flush()  # flush any pending print() output first
-        sys.stdout.buffer.write(b'---JSON_START---\n')
-        sys.stdout.buffer.write(out.encode('utf-8'))
-        sys.stdout.buffer.write(b'\n')
-        sys.stdout.buffer.flush()
+CONC_BANDS = (0.1, 1.0, 5.0, 10.0, 25.0, 50.0)   # Bornes des tranches de concentration (%)
+MINHASH_PERM = 64                                 # Taille de la signature
+LSH_BANDS = 16                                    # 16 bandes x 4 lignes : seuil LSH ~ 0,5
+NEAR_DUP_THRESHOLD = 0.7                          # Jaccard minimal rapporté
+NEAR_DUP_SAVE_INTERVAL = 60.0                     # --watch : index réécrit toutes les N s...
+NEAR_DUP_SAVE_EVERY = 500                         # ... ou tous les N documents, et à l'arrêt
+
+_MASK_64 = (1 << 64) - 1
+
+
+def _minhash_coefficients(num_perm, seed=42):
+    import random
+    r = random.Random(seed)
+    return [(r.randrange(1, 1 << 64) | 1, r.randrange(0, 1 << 64)) for _ in range(num_perm)]
+
+
+_MINHASH_COEFS = _minhash_coefficients(MINHASH_PERM)
+
+
+def concentration_band(pct):
+    """Tranche (0..len(CONC_BANDS)) d'une concentration en %."""
+    import bisect
+    return bisect.bisect_right(CONC_BANDS, pct)
+
+
+def document_shingles(result):
+    """Ensemble {'CAS|tranche'} d'un résultat parse_fds().
+
+    Concentration = milieu de la fourchette ; composant sans CAS : nom
+    chimique normalisé.
+    """
+    shingles = set()
+    for c in result.get('composition') or []:
+        ident = (c.get('cas') or '').strip() or normalize_name(c.get('nom_chimique'))
+        if not ident:
+            continue
+        lo, hi = c.get('pourcentage_min'), c.get('pourcentage_max')
+        vals = [v for v in (lo, hi) if isinstance(v, (int, float))]
+        band = concentration_band(sum(vals) / len(vals)) if vals else 'x'
+        shingles.add(f'{ident}|{band}')
+    return shingles
+
+
+def minhash_signature(shingles, coefs=None):
+    """Signature MinHash (liste d'entiers 32 bits) : ((a·x + b) mod 2^64) >> 32."""
+    import hashlib
+    coefs = coefs or _MINHASH_COEFS
+    xs = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+          for s in shingles]
+    try:
+        import numpy as np
+    except ImportError:
+        return [min([((a * x + b) & _MASK_64) >> 32 for x in xs]) for a, b in coefs]
+    a = np.array([c[0] for c in coefs], dtype=np.uint64)[:, None]
+    b = np.array([c[1] for c in coefs], dtype=np.uint64)[:, None]
+    x = np.array(xs, dtype=np.uint64)[None, :]
+    return ((a * x + b) >> np.uint64(32)).min(axis=1).tolist()
+
+
+def new_lsh_index(num_perm=MINHASH_PERM, bands=LSH_BANDS):
+    """Index LSH vide : documents (signature, ensemble, étiquette) + buckets par bande."""
+    if num_perm % bands:
+        raise ValueError(f'{num_perm} permutations non divisibles en {bands} bandes')
+    return {'num_perm': num_perm, 'bands': bands, 'docs': {},
+            'buckets': [{} for _ in range(bands)]}
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def _doc_label(result):
+    ident = result.get('identification') or {}
+    return {'fichier': result.get('fichier'), 'nom': ident.get('nom'), 'code': ident.get('code'),
+            'fournisseur': ident.get('fournisseur'), 'date_revision': ident.get('date_revision')}
+
+
+def _lsh_insert(index, key, signature):
+    rows = index['num_perm'] // index['bands']
+    for b, bucket in enumerate(index['buckets']):
+        bucket.setdefault(tuple(signature[b * rows:(b + 1) * rows]), []).append(key)
+
+
+def lsh_add(index, key, result, threshold=NEAR_DUP_THRESHOLD):
+    """Ajouter un document et retourner ses quasi-doublons déjà indexés.
+
+    Retour : [(clé, jaccard), ...] trié par similarité décroissante
+    (Jaccard exact sur les ensembles CAS|tranche des candidats LSH).
+    Un document déjà présent sous la même clé n'est pas réinséré.
+    """
+    shingles = document_shingles(result)
+    if key in index['docs'] or not shingles:
+        return []
+    coefs = _MINHASH_COEFS if index['num_perm'] == MINHASH_PERM else _minhash_coefficients(index['num_perm'])
+    signature = minhash_signature(shingles, coefs)
+    rows = index['num_perm'] // index['bands']
+    candidates = set()
+    for b, bucket in enumerate(index['buckets']):
+        candidates.update(bucket.get(tuple(signature[b * rows:(b + 1) * rows]), ()))
+    matches = []
+    for other in candidates:
+        score = _jaccard(shingles, index['docs'][other]['shingles'])
+        if score >= threshold:
+            matches.append((other, round(score, 4)))
+    index['docs'][key] = {'signature': signature, 'shingles': shingles, 'label': _doc_label(result)}
+    _lsh_insert(index, key, signature)
+    matches.sort(key=lambda m: -m[1])
+    return matches
+
+
+def near_duplicate_clusters(index, threshold=NEAR_DUP_THRESHOLD, keys=None):
+    """Grappes de quasi-doublons (union-find sur les paires LSH au-dessus du seuil).
+
+    ``keys`` : ne garder que les grappes contenant au moins une de ces clés
+    (documents nouvellement ajoutés). Chaque grappe porte ses membres, ses
+    paires et la similarité minimale/maximale observée.
+    """
+    docs = index['docs']
+    parent = {}
+
+    def find(k):
+        while parent.get(k, k) != k:
+            k = parent[k]
+        return k
+
+    pairs = {}
+    for bucket in index['buckets']:
+        for members in bucket.values():
+            if len(members) < 2:
+                continue
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    pair = (a, b) if a < b else (b, a)
+                    if pair in pairs:
+                        continue
+                    score = _jaccard(docs[a]['shingles'], docs[b]['shingles'])
+                    pairs[pair] = score
+                    if score >= threshold:
+                        ra, rb = find(a), find(b)
+                        if ra != rb:
+                            parent[ra] = rb
+
+    groups = {}
+    for (a, b), score in pairs.items():
+        if score >= threshold:
+            groups.setdefault(find(a), []).append((a, b, score))
+    keys = set(keys) if keys is not None else None
+    clusters = []
+    for edges in groups.values():
+        members = sorted({k for a, b, _ in edges for k in (a, b)})
+        if keys is not None and not keys.intersection(members):
+            continue
+        scores = [s for _, _, s in edges]
+        clusters.append({
+            'similarite_min': round(min(scores), 4),
+            'similarite_max': round(max(scores), 4),
+            'membres': [dict(cle=k, **docs[k]['label']) for k in members],
+            'paires': [{'a': a, 'b': b, 'jaccard': round(s, 4)} for a, b, s in sorted(edges, key=lambda e: -e[2])],
+        })
+    clusters.sort(key=lambda c: (-len(c['membres']), -c['similarite_max']))
+    return clusters
+
+
+def index_near_duplicates(index, results, threshold=NEAR_DUP_THRESHOLD):
+    """Indexer des résultats (clé : result_digest) au fil de l'eau.
+
+    Retourne (clés ajoutées, alertes) ; une alerte par document qui a des
+    quasi-doublons déjà indexés.
+    """
+    keys, alerts = [], []
+    for result in results:
+        key = result_digest(result)
+        matches = lsh_add(index, key, result, threshold)
+        keys.append(key)
+        if matches:
+            alerts.append({'fichier': result.get('fichier'), 'cle': key,
+                           'proches': [dict(cle=k, jaccard=j, **index['docs'][k]['label']) for k, j in matches]})
+    return keys, alerts
+
+
+def save_lsh_index(index, path):
+    """Écriture atomique de l'index (les buckets sont reconstruits au chargement)."""
+    payload = {'num_perm': index['num_perm'], 'bands': index['bands'],
+               'docs': {k: {'signature': d['signature'], 'shingles': sorted(d['shingles']), 'label': d['label']}
+                        for k, d in index['docs'].items()}}
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_lsh_index(path):
+    """Charger un index sauvegardé ; index vide si le fichier n'existe pas."""
+    if not os.path.exists(path):
+        return new_lsh_index()
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    index = new_lsh_index(payload['num_perm'], payload['bands'])
+    for key, d in payload['docs'].items():
+        index['docs'][key] = {'signature': d['signature'], 'shingles': set(d['shingles']), 'label': d['label']}
+        _lsh_insert(index, key, d['signature'])
+    return index
+
+
+# ── Classeurs multi-produits ─────────────────────────
+# Certains fournisseurs envoient un seul PDF de dizaines de FDS mises bout à
+# bout : get_section() ne verrait que le premier produit et l'extraction XY
+# mélangerait tous les tableaux. Frontière de produit : en-tête de Section 1
+# (identification) en tête de page, après celui du produit courant ou avec
+# une pagination revenue à 1. Une pagination qui repart seule (annexe eSDS,
+# scénario d'exposition) ne découpe pas. Chaque plage de pages est ensuite
+# parsée comme une fiche à part.
+
+# En-tête de Section 1 en début de ligne, titre d'identification sur la même
+# ligne ou la suivante (pas un renvoi « voir section 1 », ni « SECTION 1 :
+# Titre » d'un scénario d'exposition)
+_RE_DEBUT_PRODUIT = PATTERNS.add(
+    'classeur.section1',
+    r'^\s*(?:SECTION|RUBRIQUE)\s*0?1\s*[:.\-\s][^\n]{0,80}(?:\n[^\n]{0,80})?identif',
+    re.IGNORECASE | re.MULTILINE)
+# « Page 3 / 12 », « Page 3 sur 12 », « Page 3 of 12 »
+_RE_PAGE_NUMERO = PATTERNS.add(
+    'classeur.pagination', r'[Pp]age\s*(\d{1,3})\s*(?:/|sur|of|de)\s*(\d{1,3})(?![\d/])')
+# Ligne « 3/12 » seule : cherchée en en-tête et pied de page uniquement
+# (ailleurs, ratio ou cellule de tableau)
+_RE_PAGE_NUMERO_SEUL = PATTERNS.add('classeur.pagination_seule', r'^\s*(\d{1,3})\s*/\s*(\d{1,3})\s*$')
+
+CLASSEUR_ZONE = 1500          # début de page où chercher l'en-tête de Section 1
+CLASSEUR_LIGNES_MARGE = 3     # lignes d'en-tête et de pied examinées pour « n/m »
+CLASSEUR_SERIE_PRODUITS = 3   # petits classeurs : parsés en série, sans pool
+CLASSEUR_SERIE_PAGES = 40
+
+
+def _page_number(text):
+    """(numéro, total) de la pagination d'une page, ou None."""
+    found = [(m.group(1), m.group(2)) for m in _RE_PAGE_NUMERO.finditer(text)]
+    lines = text.strip().splitlines()
+    for line in lines[:CLASSEUR_LIGNES_MARGE] + lines[-CLASSEUR_LIGNES_MARGE:]:
+        m = _RE_PAGE_NUMERO_SEUL.match(line)
+        if m:
+            found.append((m.group(1), m.group(2)))
+    for num, total in found:
+        num, total = int(num), int(total)
+        if 1 <= num <= total:
+            return num, total
+    return None
+
+
+def split_products(pdf_path):
+    """Plages de pages (début, fin exclue), base 0, des produits d'un PDF.
+
+    Une seule plage pour une FDS ordinaire. Un en-tête de Section 1 n'ouvre
+    un nouveau produit que si le produit courant a déjà eu le sien (page de
+    garde, sommaire) ou si la pagination repart à 1 sur cette page ; une
+    pagination revenue à 1 sans en-tête de Section 1 ne découpe jamais.
+    """
+    texts = page_texts(pdf_path)
+    starts = [0]
+    opened = False
+    prev = None
+    for pnum, text in enumerate(texts):
+        header = bool(_RE_DEBUT_PRODUIT.search(text[:CLASSEUR_ZONE]))
+        numero = _page_number(text)
+        if pnum > starts[-1]:
+            reset = numero is not None and numero[0] == 1 and prev is not None
+            if header and (opened or reset):
+                starts.append(pnum)
+                opened = False
+        opened = opened or header
+        prev = numero
+    return [(a, b) for a, b in zip(starts, starts[1:] + [len(texts)])] if texts else [(0, 0)]
+
+
+def parse_binder(pdf_path, ranges=None, workers=None, fields=None):
+    """Parser chaque produit d'un classeur ; résultats dans l'ordre des pages.
+
+    Petit classeur (au plus CLASSEUR_SERIE_PRODUITS produits et
+    CLASSEUR_SERIE_PAGES pages) : en série dans ce processus, les pages déjà
+    lues par split_products() restant en cache ; sinon en parallèle."""
+    ranges = ranges or split_products(pdf_path)
+    if len(ranges) == 1:
+        return [parse_fds(pdf_path, fields=fields)]
+    if len(ranges) <= CLASSEUR_SERIE_PRODUITS and ranges[-1][1] <= CLASSEUR_SERIE_PAGES:
+        return [parse_fds(pdf_path, fields=fields, pages=pages) for pages in ranges]
+    workers = min(workers or min(4, os.cpu_count() or 1), len(ranges))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse_worker, pdf_path, fields, False, pages) for pages in ranges]
+        return [FdsDocument.unpack(f.result()[0]) for f in futures]
+
+
+# ── Triage : voie rapide / voie lente ───────────────
+# Lecture des seules métadonnées (Producer/Creator), du nombre de pages et de
+# la densité de texte de la page 1 — aucun parsing, aucun OCR. Les FDS
+# scannées partent dans un pool OCR borné pour ne pas bloquer les PDF texte.
+
+TRIAGE_MIN_CHARS = 200   # En dessous : page 1 sans couche texte exploitable
+
+_TRIAGE_FDS_RE = PATTERNS.add(
+    'triage.fds',
+    r'FICHE\s+DE\s+DONN|SAFETY\s+DATA\s+SHEET|DATA\s+SHEET|RUBRIQUE\s*0?1\b|SECTION\s*0?1\b|'
+    r'Identifica\w*\s+d[eu]|Identification\s+of|Nom\s+du\s+produit|Product\s+name|1907/2006|1272/2008',
+    re.IGNORECASE)
+_TRIAGE_SCANNER_RE = PATTERNS.add('triage.scanner', r'scan|canon|xerox|ricoh|kyocera|konica|epson|brother|sharp|kofax|abbyy', re.IGNORECASE)
+
+# (fournisseur, motif page 1, format detect_format() attendu)
+_SUPPLIER_HINTS = [
+    ('Givaudan', PATTERNS.add('triage.fournisseur[Givaudan]', r'Givaudan', re.IGNORECASE), 'givaudan'),
+    ('IFF', PATTERNS.add('triage.fournisseur[IFF]', r'International\s+Flavors|\bIFF\b'), 'givaudan'),
+    ('Robertet', PATTERNS.add('triage.fournisseur[Robertet]', r'Robertet', re.IGNORECASE), 'robertet'),
+    ('Charabot', PATTERNS.add('triage.fournisseur[Charabot]', r'Charabot', re.IGNORECASE), 'charabot'),
+    ('Jean Niel', PATTERNS.add('triage.fournisseur[Jean Niel]', r'Jean\s+Niel', re.IGNORECASE), 'jeanniel'),
+    ('CPL Aromas', PATTERNS.add('triage.fournisseur[CPL Aromas]', r'CPL\s+Aromas', re.IGNORECASE), 'tabular'),
+    ('Technico-Flor', PATTERNS.add('triage.fournisseur[Technico-Flor]', r'Technico[\s-]*Flor|InfoDyne', re.IGNORECASE), 'labeled'),
+    ('PCW', PATTERNS.add('triage.fournisseur[PCW]', r'\bPCW\b|Expressions\s+Parfum', re.IGNORECASE), 'pcw'),
+    ('APA', PATTERNS.add('triage.fournisseur[APA]', r'\bAPA\b|CreaSens', re.IGNORECASE), 'pcw'),
+]
+
+
+def triage_pdf(pdf_path):
+    """Classer un PDF sans le parser : 'texte', 'scanne' ou 'non_fds'.
+
+    Ne lit que les métadonnées, le nombre de pages et le texte de la page 1
+    (et de la page 2 si la page 1 ne ressemble pas à une FDS).
+    Devine aussi le fournisseur et le format de Section 3 probable.
+    """
+    doc = fitz.open(pdf_path)
+    meta = doc.metadata or {}
+    pages = len(doc)
+    p1 = doc[0].get_text() if pages else ''
+    # Page de garde ou lettre d'accompagnement en page 1 : la FDS commence en page 2
+    p2 = doc[1].get_text() if pages > 1 and not (_TRIAGE_FDS_RE.search(p1) or RE_CAS.search(p1)) else ''
+    doc.close()
+
+    producer = (meta.get('producer') or '').strip()
+    creator = (meta.get('creator') or '').strip()
+    dense = len(p1.strip())
+    printable_ratio = sum(1 for c in p1[:500] if c.isprintable() or c in '\n\r\t') / max(len(p1[:500]), 1)
+
+    if dense < TRIAGE_MIN_CHARS or printable_ratio < 0.5:
+        classe = 'scanne'
+    elif _TRIAGE_SCANNER_RE.search(producer + ' ' + creator) and not RE_CAS.search(p1) and dense < 4 * TRIAGE_MIN_CHARS:
+        classe = 'scanne'
+    elif not any(_TRIAGE_FDS_RE.search(p) or RE_CAS.search(p) for p in (p1, p2)):
+        classe = 'non_fds'
+    else:
+        classe = 'texte'
+
+    fournisseur, fmt = None, None
+    for nom, pat, f in _SUPPLIER_HINTS:
+        if pat.search(p1) or pat.search(producer + ' ' + creator):
+            fournisseur, fmt = nom, f
+            break
+
+    return {
+        'fichier': os.path.basename(pdf_path),
+        'classe': classe,
+        'pages': pages,
+        'densite_p1': dense,
+        'producteur': producer,
+        'createur': creator,
+        'fournisseur_probable': fournisseur,
+        'format_probable': fmt,
+    }
+
+
+def _parse_worker(pdf_path, fields=None, pattern_stats=False, pages=None):
+    """Point d'entrée des workers (voie rapide et voie lente).
+
+    Le résultat voyage sous forme FdsDocument.pack() ; FdsDocument.unpack()
+    côté parent. ``info`` porte la trace du parsing (métriques) et, avec
+    ``pattern_stats``, les compteurs PATTERNS de ce seul fichier, cumulés
+    par le parent (PATTERNS.merge). Sans ``pages``, un classeur de plusieurs
+    produits n'est pas parsé : résultat None et info['parties'] = plages à
+    soumettre une par une (``pages``) par le parent."""
+    if pattern_stats:
+        PATTERNS.enable_stats()
+        PATTERNS.reset_stats()
+    if pages is None:
+        ranges = split_products(pdf_path)
+        if len(ranges) > 1:
+            return None, 0.0, {'parties': ranges, 'trace': {}, 'motifs': PATTERNS.snapshot() if pattern_stats else None}
+    t0 = time.perf_counter()
+    result = parse_fds(pdf_path, fields=fields, pages=pages)
+    duree = round(time.perf_counter() - t0, 3)
+    info = {'trace': dict(_TRACE), 'motifs': PATTERNS.snapshot() if pattern_stats else None}
+    return result.pack(), duree, info
+
+
+def parse_batch(pdfs, workers=None, ocr_workers=1, emit=None, fields=None, pattern_stats=False,
+                metrics=None, start=None):
+    """Trier puis parser une liste de PDF sur deux pools de workers.
+
+    Voie rapide : PDF avec couche texte (``workers`` processus).
+    Voie lente  : PDF scannés à OCRiser (``ocr_workers`` processus, borné).
+    Les fichiers 'non_fds' sont écartés (événement 'skipped'). Un classeur
+    multi-produits est découpé par son worker puis chaque produit est resoumis
+    à la même voie.
+    Événements : 'start' (``start`` complété, 'total' = fichiers à parser,
+    émis après le triage), 'progress' juste avant le parsing de chaque
+    fichier (soumission à un worker libre), 'parsed' ou 'error' après.
+    Les résultats sont rendus dans l'ordre de ``pdfs`` (puis des pages) pour
+    que la déduplication reste déterministe.
+    ``fields`` est transmis à parse_fds() (parsing sélectif). Avec
+    ``pattern_stats``, les compteurs des workers sont cumulés dans PATTERNS ;
+    ``metrics`` (BatchMetrics) reçoit triage, traces, durées et erreurs.
+    """
+    from collections import deque
+    emit = emit or (lambda ev: None)
+    workers = workers or min(4, os.cpu_count() or 1)
+
+    lanes = {'rapide': deque(), 'lente': deque()}
+    ignores = []
+    hints = {}   # idx -> fournisseur probable (étiquette des métriques)
+    for idx, pdf in enumerate(pdfs):
+        try:
+            t = triage_pdf(pdf)
+        except Exception as e:
+            emit({'event': 'error', 'fichier': os.path.basename(pdf), 'erreur': str(e)})
+            emit({'event': 'skipped', 'fichier': os.path.basename(pdf), 'raison': 'triage_erreur'})
+            ignores.append(os.path.basename(pdf))
+            if metrics:
+                metrics.record_error('triage')
+            continue
+        hints[idx] = t['fournisseur_probable']
+        if metrics:
+            metrics.record_triage(t)
+        if t['classe'] == 'non_fds':
+            t['voie'] = None
+            ignores.append(t['fichier'])
+        else:
+            t['voie'] = 'lente' if t['classe'] == 'scanne' else 'rapide'
+            lanes[t['voie']].append((idx, pdf, None))
+        emit(dict(event='triage', **t))
+        if t['classe'] == 'non_fds':
+            emit({'event': 'skipped', 'fichier': t['fichier'], 'raison': 'non_fds'})
+    total = len(lanes['rapide']) + len(lanes['lente'])
+    emit({'event': 'triage_termine', 'rapide': len(lanes['rapide']), 'lente': len(lanes['lente']),
+          'non_fds': len(ignores), 'fichiers_ignores': ignores})
+    emit(dict(start or {'event': 'start'}, total=total, ignores=len(ignores)))
+
+    done = {}        # (idx, plage de pages) -> résultat
+    current = 0
+    capacity = {'rapide': workers, 'lente': max(1, ocr_workers)}
+    pools = {voie: ProcessPoolExecutor(max_workers=capacity[voie]) if lanes[voie] else None for voie in lanes}
+    futures = {}
+
+    def submit(voie):
+        # Pas plus de tâches que de workers : 'progress' précède le parsing
+        nonlocal current
+        while lanes[voie] and sum(1 for v in futures.values() if v[2] == voie) < capacity[voie]:
+            idx, pdf, pages = lanes[voie].popleft()
+            current += 1
+            ev = {'event': 'progress', 'current': current, 'total': total,
+                  'fichier': os.path.basename(pdf), 'voie': voie}
+            if pages:
+                ev['pages'] = [pages[0] + 1, pages[1]]
+            emit(ev)
+            futures[pools[voie].submit(_parse_worker, pdf, fields, pattern_stats, pages)] = (idx, pdf, voie, pages)
+
+    try:
+        for voie in lanes:
+            submit(voie)
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                idx, pdf, voie, pages = futures.pop(fut)
+                try:
+                    result, duree, info = fut.result()
+                    PATTERNS.merge(info['motifs'])
+                    if 'parties' in info:
+                        # Le fichier compte pour un ; chaque produit s'ajoute au total
+                        total += len(info['parties'])
+                        emit({'event': 'classeur', 'fichier': os.path.basename(pdf), 'voie': voie,
+                              'produits': len(info['parties']),
+                              'pages': [[a + 1, b] for a, b in info['parties']]})
+                        lanes[voie].extendleft((idx, pdf, part) for part in reversed(info['parties']))
+                        continue
+                    done[(idx, pages or (0, 0))] = result = FdsDocument.unpack(result)
+                    if metrics:
+                        metrics.record_document(voie, duree, info['trace'], hints.get(idx),
+                                                result.get('nb_composants'))
+                    ev = {'event': 'parsed', 'fichier': os.path.basename(pdf), 'voie': voie, 'duree_s': duree}
+                    if pages:
+                        ev['pages'] = result['pages']
+                    emit(ev)
+                except Exception as e:
+                    ev = {'event': 'error', 'fichier': os.path.basename(pdf), 'voie': voie, 'erreur': str(e)}
+                    if pages:
+                        ev['pages'] = [pages[0] + 1, pages[1]]
+                    emit(ev)
+                    if metrics:
+                        metrics.record_error(voie, hints.get(idx))
+                if metrics:
+                    metrics.maybe_flush()
+            for voie in lanes:
+                submit(voie)
+    finally:
+        for pool in pools.values():
+            if pool:
+                pool.shutdown()
+
+    return [done[i] for i in sorted(done)]
+
+
+# ── Métriques de lot (--metrics) ────────────────────
+# Compteurs agrégés et histogrammes de latence pour les rescans d'archive et
+# la surveillance : taux d'OCR, profondeur de la cascade de parseurs texte,
+# format détecté, erreurs par fournisseur, percentiles de latence. Export au
+# format texte Prometheus (.prom, pour le node_exporter textfile collector)
+# et résumé JSON (.json), en fin de lot et toutes les ``interval`` secondes.
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_INTERVAL = 60.0
+METRICS_PREFIX = 'mfc_fds_'
+
+# nom -> (type, aide) ; noms sans préfixe
+_METRIC_HELP = {
+    'triage_total': ('counter', 'PDF triés, par classe (texte, scanne, non_fds)'),
+    'documents_total': ('counter', 'Documents parsés, par voie et statut (ok, erreur)'),
+    'documents_fournisseur_total': ('counter', 'Documents par fournisseur probable (triage) et statut'),
+    'ocr_total': ('counter', 'Documents dont le texte vient de l\'OCR, par voie'),
+    'composition_total': ('counter', 'Voie de la composition retenue (xy, texte)'),
+    'cascade_total': ('counter', 'Profondeur de cascade du repli texte (0 = XY, 1 = format détecté, 2-4 = replis)'),
+    'format_total': ('counter', 'Branche de detect_format() retenue par le repli texte'),
+    'route_total': ('counter', 'Langue et famille fournisseur détectées en Section 1'),
+    'ocr_cache_total': ('counter', 'Pages OCR servies par le cache (hit) ou passées à tesseract (miss)'),
+    'composition_vide_total': ('counter', 'Documents sans aucun composant, par fournisseur'),
+    'parse_duree_secondes': ('histogram', 'Durée de parse_fds() par document, par voie'),
+    'derniere_ecriture_timestamp_secondes': ('gauge', 'Horodatage Unix de la dernière écriture des métriques'),
+    'execution_duree_secondes': ('gauge', 'Durée écoulée depuis le début du lot ou de la surveillance'),
+}
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ''
+    esc = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{esc(v)}"' for k, v in labels) + '}'
+
+
+class BatchMetrics:
+    """Compteurs étiquetés et histogrammes de latence (mémoire bornée).
+
+    ``path`` : base des fichiers écrits (``path``.prom et ``path``.json ;
+    une extension .prom/.json donnée est retirée). Sans ``path``, rien
+    n'est écrit (agrégation seule).
+    """
+
+    def __init__(self, path=None, interval=METRICS_INTERVAL):
+        self.base = re.sub(r'\.(prom|json)$', '', path) if path else None
+        self.interval = interval
+        self.debut = time.time()
+        self._last_flush = time.monotonic()
+        self.counters = {}     # (nom, ((étiquette, valeur), ...)) -> valeur
+        self.histograms = {}   # voie -> [comptes par borne + +Inf, somme, total]
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, voie, seconds):
+        h = self.histograms.setdefault(voie, [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0])
+        import bisect
+        h[0][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        h[1] += seconds
+        h[2] += 1
+
+    def record_triage(self, triage):
+        self.inc('triage_total', classe=triage['classe'])
+
+    def record_document(self, voie, duree, trace, fournisseur=None, nb_composants=None):
+        fournisseur = fournisseur or 'inconnu'
+        self.inc('documents_total', voie=voie, statut='ok')
+        self.inc('documents_fournisseur_total', fournisseur=fournisseur, statut='ok')
+        self.observe(voie, duree)
+        trace = trace or {}
+        if trace.get('ocr'):
+            self.inc('ocr_total', voie=voie)
+        if trace.get('ocr_cache_hits'):
+            self.inc('ocr_cache_total', trace['ocr_cache_hits'], resultat='hit')
+        if trace.get('ocr_cache_misses'):
+            self.inc('ocr_cache_total', trace['ocr_cache_misses'], resultat='miss')
+        if 'composition' in trace:
+            self.inc('composition_total', voie=trace['composition'])
+        if 'cascade' in trace:
+            self.inc('cascade_total', profondeur=str(trace['cascade']))
+        if 'format' in trace:
+            self.inc('format_total', format=trace['format'])
+        if 'langue' in trace:
+            self.inc('route_total', langue=trace['langue'] or 'indecise', famille=trace['famille'] or 'inconnue')
+        if nb_composants == 0:
+            self.inc('composition_vide_total', fournisseur=fournisseur)
+
+    def record_error(self, voie, fournisseur=None):
+        self.inc('documents_total', voie=voie, statut='erreur')
+        self.inc('documents_fournisseur_total', fournisseur=fournisseur or 'inconnu', statut='erreur')
+
+    def _by(self, name, label):
+        out = {}
+        for (n, labels), v in self.counters.items():
+            if n == name:
+                key = dict(labels)[label]
+                out[key] = out.get(key, 0) + v
+        return out
+
+    def quantile(self, voie, q):
+        """Estimation façon histogram_quantile (interpolation linéaire dans la classe)."""
+        counts, _, total = self.histograms[voie]
+        rank, cumul, lower = q * total, 0, 0.0
+        for upper, n in zip(LATENCY_BUCKETS + (float('inf'),), counts):
+            if n and cumul + n >= rank:
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - cumul) / n
+            cumul += n
+            lower = upper if upper != float('inf') else lower
+        return lower
+
+    def summary(self):
+        """Résumé JSON : totaux, taux, percentiles par voie, répartitions."""
+        statuts = self._by('documents_total', 'statut')
+        docs = sum(statuts.values())
+        fournisseurs = {}
+        for (n, labels), v in self.counters.items():
+            if n == 'documents_fournisseur_total':
+                d = dict(labels)
+                fournisseurs.setdefault(d['fournisseur'], {'ok': 0, 'erreur': 0})[d['statut']] += v
+        for f in fournisseurs.values():
+            f['taux_erreur'] = round(f['erreur'] / max(f['ok'] + f['erreur'], 1), 4)
+        ocr = sum(self._by('ocr_total', 'voie').values())
+        cache = self._by('ocr_cache_total', 'resultat')
+        return {
+            'debut': self.debut,
+            'duree_s': round(time.time() - self.debut, 3),
+            'documents': docs,
+            'erreurs': statuts.get('erreur', 0),
+            'taux_erreur': round(statuts.get('erreur', 0) / max(docs, 1), 4),
+            'taux_ocr': round(ocr / max(statuts.get('ok', 0), 1), 4),
+            'cache_ocr': {'hit': cache.get('hit', 0), 'miss': cache.get('miss', 0),
+                          'taux_hit': round(cache.get('hit', 0) / max(sum(cache.values()), 1), 4)},
+            'triage': self._by('triage_total', 'classe'),
+            'latence_s': {
+                voie: {'n': h[2], 'moyenne': round(h[1] / max(h[2], 1), 4),
+                       **{f'p{int(q * 100)}': round(self.quantile(voie, q), 4) for q in (0.5, 0.9, 0.99)}}
+                for voie, h in sorted(self.histograms.items())
+            },
+            'composition': self._by('composition_total', 'voie'),
+            'cascade': self._by('cascade_total', 'profondeur'),
+            'formats': self._by('format_total', 'format'),
+            'langues': self._by('route_total', 'langue'),
+            'compositions_vides': self._by('composition_vide_total', 'fournisseur'),
+            'fournisseurs': dict(sorted(fournisseurs.items())),
+        }
+
+    def prometheus(self):
+        """Exposition au format texte Prometheus 0.0.4."""
+        lines = []
+        names = sorted({n for n, _ in self.counters})
+        for name in names:
+            kind, help_ = _METRIC_HELP[name]
+            full = METRICS_PREFIX + name
+            lines += [f'# HELP {full} {help_}', f'# TYPE {full} {kind}']
+            for (n, labels), v in sorted(self.counters.items()):
+                if n == name:
+                    lines.append(f'{full}{_prom_labels(labels)} {v}')
+        if self.histograms:
+            full = METRICS_PREFIX + 'parse_duree_secondes'
+            lines += [f'# HELP {full} {_METRIC_HELP["parse_duree_secondes"][1]}', f'# TYPE {full} histogram']
+            for voie, (counts, total_s, n) in sorted(self.histograms.items()):
+                cumul = 0
+                for upper, c in zip(LATENCY_BUCKETS + (float('inf'),), counts):
+                    cumul += c
+                    le = '+Inf' if upper == float('inf') else repr(upper)
+                    lines.append(f'{full}_bucket{_prom_labels((("voie", voie), ("le", le)))} {cumul}')
+                lines.append(f'{full}_sum{_prom_labels((("voie", voie),))} {round(total_s, 6)}')
+                lines.append(f'{full}_count{_prom_labels((("voie", voie),))} {n}')
+        for name, value in (('derniere_ecriture_timestamp_secondes', round(time.time(), 3)),
+                            ('execution_duree_secondes', round(time.time() - self.debut, 3))):
+            full = METRICS_PREFIX + name
+            lines += [f'# HELP {full} {_METRIC_HELP[name][1]}', f'# TYPE {full} gauge', f'{full} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """Écriture atomique de base.prom et base.json ; retourne les chemins."""
+        self._last_flush = time.monotonic()
+        if not self.base:
+            return None
+        paths = (self.base + '.prom', self.base + '.json')
+        for path, content in zip(paths, (self.prometheus(),
+                                         json.dumps(self.summary(), ensure_ascii=False, indent=2))):
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp, path)
+        return paths
+
+    def maybe_flush(self):
+        if self.base and time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+
+# ── Sharding multi-machines ─────────────────────────
+# Partition déterministe par empreinte de contenu : un même PDF tombe
+# toujours dans le même shard, quel que soit son nom ou la machine.
+
+def file_sha256(path):
+    """Empreinte SHA-256 (hex) du contenu d'un fichier."""
+    import hashlib
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def parse_shard_spec(spec):
+    """'2/4' → (2, 4). Index 1-based ; lève ValueError si invalide."""
+    m = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', spec or '')
+    if not m:
+        raise ValueError(f'Shard invalide : {spec!r} (attendu i/n, ex. 2/4)')
+    i, n = int(m.group(1)), int(m.group(2))
+    if n < 1 or not 1 <= i <= n:
+        raise ValueError(f'Shard invalide : {spec!r} (1 <= i <= n)')
+    return i, n
+
+
+def shard_of(digest, n):
+    """Shard (1-based) d'un PDF d'après son empreinte."""
+    return int(digest[:16], 16) % n + 1
+
+
+def _archive_digest(digests):
+    """Empreinte d'une archive : indépendante des noms et de l'ordre des fichiers."""
+    import hashlib
+    return hashlib.sha256('\n'.join(sorted(digests)).encode('ascii')).hexdigest()
+
+
+def select_shard(pdfs, i, n):
+    """Sélectionner les PDF du shard i/n et construire la provenance.
+
+    La provenance porte l'empreinte de l'archive complète (hash des hash de
+    tous les PDF) : merge_shards() s'en sert pour vérifier que les shards
+    viennent de la même archive et qu'aucun n'est absent ou en double.
+    """
+    digests = [file_sha256(p) for p in pdfs]
+    empreinte = _archive_digest(digests)
+    selected, fichiers = [], []
+    for ordre, (pdf, d) in enumerate(zip(pdfs, digests)):
+        if shard_of(d, n) == i:
+            selected.append(pdf)
+            fichiers.append({'fichier': os.path.basename(pdf), 'sha256': d, 'ordre': ordre})
+    provenance = {
+        'index': i,
+        'total': n,
+        'empreinte_archive': empreinte,
+        'nb_fichiers_archive': len(pdfs),
+        'fichiers': fichiers,
+    }
+    return selected, provenance
+
+
+def merge_shards(shards):
+    """Fusionner des sorties de shards et dédupliquer sur l'ensemble.
+
+    ``shards`` : liste de dicts {'_shard': provenance, 'resultats': [...]}.
+    Retourne (resultats, doublons, anomalies) ; ``anomalies`` liste les shards
+    manquants, en double ou issus d'une autre archive.
+    """
+    anomalies = []
+    if not shards:
+        return [], [], ['Aucun shard fourni']
+    ref = shards[0]['_shard']
+    n = ref['total']
+    vus = {}
+    for sh in shards:
+        prov = sh['_shard']
+        if prov['total'] != n:
+            anomalies.append(f"Shard {prov['index']}/{prov['total']} : découpage différent de {n}")
+        if prov['empreinte_archive'] != ref['empreinte_archive']:
+            anomalies.append(f"Shard {prov['index']}/{prov['total']} : archive différente")
+        if prov.get('champs') != ref.get('champs'):
+            anomalies.append(f"Shard {prov['index']}/{prov['total']} : champs différents")
+        if prov['index'] in vus:
+            anomalies.append(f"Shard {prov['index']}/{n} en double")
+        vus[prov['index']] = prov
+    manquants = [i for i in range(1, n + 1) if i not in vus]
+    if manquants:
+        anomalies.append('Shards manquants : ' + ', '.join(f'{i}/{n}' for i in manquants))
+    nb_fichiers = sum(len(p['fichiers']) for p in vus.values())
+    if not manquants and nb_fichiers != ref['nb_fichiers_archive']:
+        anomalies.append(f"{nb_fichiers} fichiers couverts sur {ref['nb_fichiers_archive']} dans l'archive")
+
+    # Ordre global de l'archive (celui d'un run non shardé) avant déduplication
+    ordered = []
+    for idx in sorted(vus):
+        sh = next(s for s in shards if s['_shard'] is vus[idx])
+        ordre = {f['fichier']: f['ordre'] for f in vus[idx]['fichiers']}
+        ordered.extend((ordre.get(r.get('fichier'), len(ordre)), r) for r in sh['resultats'])
+    ordered.sort(key=lambda t: t[0])
+    results, dupes = deduplicate_results([r for _, r in ordered])
+    return results, dupes, anomalies
+
+
+# ── Stockage SQLite indexé (--store) ───────────────
+# Une base locale en WAL au lieu de réécrire tout le JSON à chaque
+# extraction : documents, composants, phrases H et propriétés en tables
+# normalisées, indexées pour les recherches par CAS, fournisseur, code ou
+# nom produit. Clé d'upsert : empreinte SHA-256 du PDF (à défaut, du
+# résultat lui-même) — re-parser un PDF remplace sa fiche au lieu de la
+# dupliquer.
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    fichier TEXT,
+    nom TEXT,
+    nom_norm TEXT,
+    code TEXT,
+    code_norm TEXT,
+    fournisseur TEXT,
+    fournisseur_norm TEXT,
+    date_revision TEXT,
+    mot_signal TEXT,
+    nb_composants INTEGER,
+    parseur TEXT,
+    statut TEXT,
+    extrait_le REAL,
+    resultat TEXT
+);
+CREATE TABLE IF NOT EXISTS composants (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    rang INTEGER,
+    cas TEXT,
+    nom_chimique TEXT,
+    pct_min REAL,
+    pct_max REAL,
+    einecs TEXT,
+    classification TEXT
+);
+CREATE TABLE IF NOT EXISTS phrases_h (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    code TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS proprietes (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    cle TEXT,
+    valeur TEXT,
+    valeur_num REAL
+);
+CREATE INDEX IF NOT EXISTS idx_composants_cas ON composants(cas, pct_max);
+CREATE INDEX IF NOT EXISTS idx_composants_doc ON composants(document_id);
+CREATE INDEX IF NOT EXISTS idx_documents_fournisseur ON documents(fournisseur_norm);
+CREATE INDEX IF NOT EXISTS idx_documents_code ON documents(code_norm);
+CREATE INDEX IF NOT EXISTS idx_documents_nom ON documents(nom_norm);
+CREATE INDEX IF NOT EXISTS idx_phrases_h_code ON phrases_h(code);
+CREATE INDEX IF NOT EXISTS idx_phrases_h_doc ON phrases_h(document_id);
+CREATE INDEX IF NOT EXISTS idx_proprietes_cle ON proprietes(cle, valeur_num);
+CREATE INDEX IF NOT EXISTS idx_proprietes_doc ON proprietes(document_id);
+"""
+
+
+def normalize_name(s):
+    """Forme de recherche : majuscules sans accents, séparateurs réduits à un espace."""
+    import unicodedata
+    s = unicodedata.normalize('NFKD', s or '')
+    s = ''.join(c for c in s if not unicodedata.combining(c)).upper()
+    return re.sub(r'[^A-Z0-9]+', ' ', s).strip()
+
+
+def normalize_code(s):
+    return re.sub(r'\s+', '', (s or '').upper())
+
+
+def open_store(path):
+    """Ouvrir (ou créer) la base de résultats en mode WAL."""
+    import sqlite3
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.executescript(STORE_SCHEMA)
+    return conn
+
+
+def result_digest(result):
+    """Empreinte d'un résultat sans PDF source (import de JSON existant)."""
+    import hashlib
+    body = {k: v for k, v in result.items() if k != '_meta'}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, ensure_ascii=False, default=_to_json).encode('utf-8')).hexdigest()
+
+
+def part_digest(digest, pages):
+    """Empreinte d'un produit de classeur : empreinte du PDF + 'pages' du résultat."""
+    import hashlib
+    return hashlib.sha256(f'{digest}:{pages[0]}-{pages[1]}'.encode('ascii')).hexdigest()
+
+
+def store_results(conn, results, digests=None):
+    """Upsert de résultats parse_fds() par empreinte ; une transaction par appel.
+
+    ``digests`` : empreintes SHA-256 des PDF, alignées sur ``results``
+    (sinon : empreinte du résultat). Les lignes filles d'un document
+    remplacé sont réécrites. Retourne le nombre de documents écrits.
+    """
+    digests = digests or [None] * len(results)
+    now = time.time()
+    with conn:
+        for result, digest in zip(results, digests):
+            ident = result.get('identification') or {}
+            classif = result.get('classification_globale') or {}
+            meta = result.get('_meta') or {}
+            doc = (
+                digest or result_digest(result), result.get('fichier'),
+                ident.get('nom'), normalize_name(ident.get('nom')),
+                ident.get('code'), normalize_code(ident.get('code')),
+                ident.get('fournisseur'), normalize_name(ident.get('fournisseur')),
+                ident.get('date_revision'), classif.get('mot_signal'),
+                result.get('nb_composants'), meta.get('parseur'), meta.get('statut'),
+                now, json.dumps(result, ensure_ascii=False, default=_to_json),
+            )
+            conn.execute(
+                'INSERT INTO documents (sha256, fichier, nom, nom_norm, code, code_norm, fournisseur, '
+                'fournisseur_norm, date_revision, mot_signal, nb_composants, parseur, statut, extrait_le, resultat) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(sha256) DO UPDATE SET fichier=excluded.fichier, nom=excluded.nom, '
+                'nom_norm=excluded.nom_norm, code=excluded.code, code_norm=excluded.code_norm, '
+                'fournisseur=excluded.fournisseur, fournisseur_norm=excluded.fournisseur_norm, '
+                'date_revision=excluded.date_revision, mot_signal=excluded.mot_signal, '
+                'nb_composants=excluded.nb_composants, parseur=excluded.parseur, statut=excluded.statut, '
+                'extrait_le=excluded.extrait_le, resultat=excluded.resultat', doc
+            )
+            doc_id = conn.execute('SELECT id FROM documents WHERE sha256 = ?', (doc[0],)).fetchone()[0]
+            for table in ('composants', 'phrases_h', 'proprietes'):
+                conn.execute(f'DELETE FROM {table} WHERE document_id = ?', (doc_id,))
+            conn.executemany(
+                'INSERT INTO composants (document_id, rang, cas, nom_chimique, pct_min, pct_max, einecs, classification) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(doc_id, i, c.get('cas'), c.get('nom_chimique'), c.get('pourcentage_min'),
+                  c.get('pourcentage_max'), c.get('einecs'), c.get('classification'))
+                 for i, c in enumerate(result.get('composition') or [])]
+            )
+            conn.executemany(
+                'INSERT INTO phrases_h (document_id, code, description) VALUES (?, ?, ?)',
+                [(doc_id, h.get('code'), h.get('description')) for h in classif.get('phrases_H') or []]
+            )
+            conn.executemany(
+                'INSERT INTO proprietes (document_id, cle, valeur, valeur_num) VALUES (?, ?, ?, ?)',
+                [(doc_id, k, str(v), _parse_number(str(v)))
+                 for k, v in (result.get('proprietes_physiques') or {}).items() if v is not None]
+            )
+    return len(results)
+
+
+def query_store(conn, cas=None, min_pct=None, fournisseur=None, code=None, nom=None,
+                phrase_h=None, limit=None):
+    """Rechercher des fiches ; tous les critères fournis doivent être vrais.
+
+    ``cas`` + ``min_pct`` : fiches contenant ce CAS qui peut dépasser
+    ``min_pct`` % (pourcentage_max > seuil) ou l'atteint sûrement
+    (pourcentage_min ≥ seuil) : « ≥ 5 - < 10 » ne sort pas pour 10 ; une
+    ligne par fiche. ``fournisseur`` et
+    ``nom`` : préfixe de la forme normalisée ; ``code`` : exact (espaces
+    ignorés). Chaque critère passe par un index.
+    """
+    select = ('SELECT d.id, d.sha256, d.fichier, d.nom, d.code, d.fournisseur, d.date_revision, '
+              'd.nb_composants, d.extrait_le')
+    joins, where, params = [], [], []
+    if cas:
+        # Un même CAS sur plusieurs lignes (fourchette découpée) : une ligne
+        # par fiche, fourchette englobante des lignes retenues
+        select += ', MIN(c.pct_min) AS pct_min, MAX(c.pct_max) AS pct_max'
+        joins.append('JOIN composants c ON c.document_id = d.id')
+        where.append('c.cas = ?')
+        params.append(cas)
+        if min_pct is not None:
+            where.append('(c.pct_max > ? OR c.pct_min >= ?)')
+            params += [float(min_pct)] * 2
+    if phrase_h:
+        where.append('d.id IN (SELECT document_id FROM phrases_h WHERE code = ?)')
+        params.append(phrase_h.upper())
+    for column, value in (('fournisseur_norm', fournisseur), ('nom_norm', nom)):
+        if value:
+            prefix = normalize_name(value)
+            where.append(f'd.{column} >= ? AND d.{column} < ?')
+            params += [prefix, prefix + '\uffff']
+    if code:
+        where.append('d.code_norm = ?')
+        params.append(normalize_code(code))
+    sql = f"{select} FROM documents d {' '.join(joins)}"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    if cas:
+        sql += ' GROUP BY d.id'
+    sql += ' ORDER BY d.nom'
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def load_results_file(path):
+    """Résultats JSON (liste, sortie --shard) ou NDJSON (mode --watch)."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get('resultats', [data])
+    return data
+
+
+# ── Export colonnaire (export) ───────────────────────
+# Documents, composants et phrases H en fichiers typés séparés, chargés tels
+# quels par pandas ou DuckDB (read_parquet / read_csv) : Parquet si pyarrow
+# est installé, sinon CSV + schéma JSON à côté. Lecture des résultats un par
+# un et écriture par blocs de ``chunk`` lignes : mémoire constante quelle que
+# soit la taille de l'archive.
+
+EXPORT_CHUNK = 50000
+
+# table -> colonnes (nom, type) ; doc_id relie les trois tables
+EXPORT_SCHEMA = {
+    'documents': (
+        ('doc_id', 'int64'), ('fichier', 'string'), ('page_debut', 'int64'), ('page_fin', 'int64'),
+        ('nom', 'string'), ('code', 'string'), ('ufi', 'string'), ('fournisseur', 'string'),
+        ('date_revision', 'string'), ('mot_signal', 'string'), ('nb_composants', 'int64'),
+        ('nb_phrases_h', 'int64'), ('flash_point_c', 'float64'), ('densite', 'float64'),
+        ('parseur', 'string'), ('statut', 'string'),
+    ),
+    'composants': (
+        ('doc_id', 'int64'), ('rang', 'int64'), ('cas', 'string'), ('nom_chimique', 'string'),
+        ('concentration', 'string'), ('pct_min', 'float64'), ('pct_max', 'float64'),
+        ('einecs', 'string'), ('classification', 'string'),
+    ),
+    'phrases_h': (
+        ('doc_id', 'int64'), ('code', 'string'), ('description', 'string'),
+    ),
+}
+
+
+def iter_results(path, block=1 << 20):
+    """Résultats un par un : base --store, liste JSON (lue en flux), NDJSON.
+
+    Les autres JSON (sortie --shard, document seul) passent par
+    load_results_file()."""
+    with open(path, 'rb') as f:
+        magic = f.read(16)
+    if magic.startswith(b'SQLite format 3'):
+        import sqlite3
+        conn = sqlite3.connect(path)
+        try:
+            for (resultat,) in conn.execute('SELECT resultat FROM documents ORDER BY id'):
+                yield json.loads(resultat)
+        finally:
+            conn.close()
+        return
+    with open(path, encoding='utf-8') as f:
+        buf = f.read(block).lstrip()
+        if not buf.startswith('['):
+            f.seek(0)
+            first = f.readline()
+            try:
+                json.loads(first)
+            except json.JSONDecodeError:
+                yield from load_results_file(path)
+                return
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        decoder = json.JSONDecoder()
+        pos = 1
+        while True:
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buf):
+                    break
+                buf, pos = f.read(block), 0
+                if not buf:
+                    return
+            if buf[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                more = f.read(block)
+                if not more:
+                    raise
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield obj
+            pos = end
+            if pos > block:
+                buf, pos = buf[pos:], 0
+
+
+def _export_num(v):
+    if v is None or v == '':
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    return _parse_number(str(v))
+
+
+def _export_int(v):
+    return int(v) if isinstance(v, (int, float)) else None
+
+
+def export_rows(doc_id, result):
+    """Lignes (tuples dans l'ordre d'EXPORT_SCHEMA) d'un résultat, par table."""
+    ident = result.get('identification') or {}
+    classif = result.get('classification_globale') or {}
+    props = result.get('proprietes_physiques') or {}
+    meta = result.get('_meta') or {}
+    pages = result.get('pages') or (None, None)
+    comp = result.get('composition') or []
+    phrases = classif.get('phrases_H') or []
+    return {
+        'documents': [(
+            doc_id, result.get('fichier'), _export_int(pages[0]), _export_int(pages[1]),
+            ident.get('nom'), ident.get('code'), ident.get('ufi'), ident.get('fournisseur'),
+            ident.get('date_revision'), classif.get('mot_signal'),
+            _export_int(result.get('nb_composants')), len(phrases),
+            _export_num(props.get('flash_point_c')), _export_num(props.get('densite')),
+            meta.get('parseur'), meta.get('statut'),
+        )],
+        'composants': [(
+            doc_id, rang, c.get('cas'), c.get('nom_chimique'), c.get('concentration'),
+            _export_num(c.get('pourcentage_min')), _export_num(c.get('pourcentage_max')),
+            c.get('einecs') or None, c.get('classification') or None,
+        ) for rang, c in enumerate(comp)],
+        'phrases_h': [(doc_id, h.get('code'), h.get('description')) for h in phrases],
+    }
+
+
+class _CsvSink:
+    """Table CSV (UTF-8, ',' ; vide = NULL), écrite en .tmp puis renommée."""
+    extension = '.csv'
+
+    def __init__(self, path, columns):
+        import csv
+        self.path = path
+        self.file = open(path + '.tmp', 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+        os.replace(self.path + '.tmp', self.path)
+
+
+class _ParquetSink:
+    """Table Parquet, un row group par bloc ; écrite en .tmp puis renommée."""
+    extension = '.parquet'
+
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.path = path
+        types = {'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string()}
+        self.schema = pa.schema([(name, types[t]) for name, t in columns])
+        self.writer = pq.ParquetWriter(path + '.tmp', self.schema)
+
+    def write(self, rows):
+        cols = list(zip(*rows))
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(col, type=field.type) for col, field in zip(cols, self.schema)], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.path + '.tmp', self.path)
+
+
+def export_results(results, out_dir, fmt='auto', chunk=EXPORT_CHUNK, first_id=1):
+    """Écrire ``results`` (itérable) en tables colonnaires dans ``out_dir``.
+
+    ``fmt`` : 'parquet', 'csv' ou 'auto' (Parquet si pyarrow est installé).
+    Chaque table a son schéma à côté (<table>.schema.json). Retourne
+    {'format', 'fichiers', 'lignes': {table: n}}.
+    """
+    if fmt == 'auto':
+        try:
+            import pyarrow  # noqa: F401
+            fmt = 'parquet'
+        except ImportError:
+            fmt = 'csv'
+    sink_cls = _ParquetSink if fmt == 'parquet' else _CsvSink
+    os.makedirs(out_dir, exist_ok=True)
+    sinks = {t: sink_cls(os.path.join(out_dir, t + sink_cls.extension), cols)
+             for t, cols in EXPORT_SCHEMA.items()}
+    pending = {t: [] for t in EXPORT_SCHEMA}
+    counts = dict.fromkeys(EXPORT_SCHEMA, 0)
+
+    def flush(table):
+        if pending[table]:
+            sinks[table].write(pending[table])
+            counts[table] += len(pending[table])
+            pending[table] = []
+
+    try:
+        for doc_id, result in enumerate(results, first_id):
+            for table, rows in export_rows(doc_id, result).items():
+                pending[table].extend(rows)
+                if len(pending[table]) >= chunk:
+                    flush(table)
+        for table in EXPORT_SCHEMA:
+            flush(table)
+    finally:
+        for sink in sinks.values():
+            sink.close()
+
+    for table, cols in EXPORT_SCHEMA.items():
+        schema = {'table': table, 'format': fmt, 'fichier': os.path.basename(sinks[table].path),
+                  'lignes': counts[table], 'colonnes': [{'nom': n, 'type': t} for n, t in cols]}
+        if fmt == 'csv':
+            schema.update({'encodage': 'utf-8', 'separateur': ',', 'null': ''})
+        with open(os.path.join(out_dir, table + '.schema.json'), 'w', encoding='utf-8') as f:
+            json.dump(schema, f, ensure_ascii=False, indent=2)
+    return {'format': fmt, 'fichiers': [s.path for s in sinks.values()], 'lignes': counts}
+
+
+# ── Surveillance de l'inbox (--watch) ──────────────
+# Chaque PDF déposé est parsé dès qu'il est complet (taille et date stables
+# pendant ``debounce`` secondes), le résultat est ajouté en NDJSON puis le
+# PDF est déplacé vers done/. inotify (Linux) réveille la boucle dès qu'un
+# fichier arrive ; ailleurs, simple scrutation toutes les ``poll`` secondes.
+
+_IN_MODIFY, _IN_CLOSE_WRITE, _IN_MOVED_TO, _IN_CREATE = 0x2, 0x8, 0x80, 0x100
+
+
+def _inotify_open(directory):
+    """Descripteur inotify sur ``directory``, ou None si indisponible."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes, ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def _inotify_wait(fd, timeout):
+    """Attendre un évènement (ou ``timeout``) puis vider la file inotify."""
+    import select
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if ready:
+        try:
+            while os.read(fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+    return bool(ready)
+
+
+def _pdf_complete(path):
+    """Un PDF entièrement écrit se termine par %%EOF (MuPDF répare sinon
+    silencieusement les fichiers tronqués)."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 1024))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+
+def watch_inbox(inbox, output, done_dir=None, debounce=2.0, poll=5.0,
+                workers=None, ocr_workers=1, fields=None, emit=None, stop=None, store=None,
+                near_dupes=None, metrics=None):
+    """Surveiller ``inbox`` et parser chaque PDF peu après son arrivée.
+
+    Les PDF triés 'non_fds' (lettres, certificats) sont écartés (événement
+    'skipped') et laissés dans l'inbox. Les résultats sont ajoutés ligne par
+    ligne à ``output`` (NDJSON,
+    append-only) et, avec ``store`` (chemin SQLite), enregistrés dans la
+    base indexée. ``near_dupes`` : chemin d'un index LSH mis à jour à chaque
+    fiche (événement 'near_duplicate'), réécrit toutes les
+    NEAR_DUP_SAVE_INTERVAL secondes ou NEAR_DUP_SAVE_EVERY fiches et à l'arrêt. ``metrics`` (BatchMetrics) : écrit
+    toutes les ``metrics.interval`` secondes et à l'arrêt. ``stop`` : callable
+    optionnel qui arrête la boucle.
+    """
+    emit = emit or (lambda ev: None)
+    done_dir = done_dir or os.path.join(os.path.dirname(os.path.abspath(inbox)), 'done')
+    os.makedirs(done_dir, exist_ok=True)
+    workers = workers or min(4, os.cpu_count() or 1)
+
+    conn = open_store(store) if store else None
+    lsh = load_lsh_index(near_dupes) if near_dupes else None
+    lsh_pending, lsh_saved = 0, time.monotonic()   # fiches indexées depuis la dernière écriture
+    fd = _inotify_open(inbox)
+    emit({'event': 'watch', 'inbox': inbox, 'done': done_dir, 'output': output,
+          'mode': 'inotify' if fd is not None else 'polling'})
+
+    seen = {}        # chemin -> (taille, mtime_ns, instant du dernier changement)
+    failed = {}      # chemin -> (taille, mtime_ns) du dernier essai en échec
+    ignored = {}     # chemin -> (taille, mtime_ns) d'un PDF trié 'non_fds'
+    running = {}     # future -> (chemin, voie, signature, fournisseur probable, plage de pages)
+    parts = {}       # chemin d'un classeur -> [produits restants, échec ?]
+    fast_pool = ProcessPoolExecutor(max_workers=workers)
+    slow_pool = ProcessPoolExecutor(max_workers=max(1, ocr_workers))
+    try:
+        with open(output, 'a', encoding='utf-8') as out:
+            while not (stop and stop()):
+                now = time.monotonic()
+                in_flight = {v[0] for v in running.values()}
+                try:
+                    names = os.listdir(inbox)
+                except FileNotFoundError:
+                    names = []
+                present = set()
+                for name in names:
+                    if not name.lower().endswith('.pdf'):
+                        continue
+                    pdf = os.path.join(inbox, name)
+                    present.add(pdf)
+                    if pdf in in_flight:
+                        continue
+                    try:
+                        st = os.stat(pdf)
+                    except FileNotFoundError:
+                        continue
+                    sig = (st.st_size, st.st_mtime_ns)
+                    if failed.get(pdf) == sig or ignored.get(pdf) == sig:
+                        continue
+                    prev = seen.get(pdf)
+                    if prev is None or prev[:2] != sig:
+                        seen[pdf] = (sig[0], sig[1], now)
+                        continue
+                    if st.st_size == 0 or now - prev[2] < debounce or not _pdf_complete(pdf):
+                        continue
+                    # Stable : trier puis envoyer dans la bonne voie
+                    try:
+                        t = triage_pdf(pdf)
+                    except Exception:
+                        continue  # Encore en cours d'écriture (PDF tronqué)
+                    if metrics:
+                        metrics.record_triage(t)
+                    if t['classe'] == 'non_fds':
+                        # Lettre, certificat… : laissé dans l'inbox, pas reparsé tant qu'il ne change pas
+                        ignored[pdf] = sig
+                        seen.pop(pdf, None)
+                        emit({'event': 'skipped', 'fichier': t['fichier'], 'raison': 'non_fds'})
+                        continue
+                    voie = 'lente' if t['classe'] == 'scanne' else 'rapide'
+                    emit(dict(event='triage', voie=voie, **t))
+                    pool = slow_pool if voie == 'lente' else fast_pool
+                    running[pool.submit(_parse_worker, pdf, fields)] = (pdf, voie, sig, t['fournisseur_probable'], None)
+                for pdf in list(seen):
+                    if pdf not in present:
+                        seen.pop(pdf, None)
+                        failed.pop(pdf, None)
+                        ignored.pop(pdf, None)
+
+                for fut in [f for f in running if f.done()]:
+                    pdf, voie, sig, fournisseur, pages = running.pop(fut)
+                    seen.pop(pdf, None)
+                    try:
+                        result, duree, info = fut.result()
+                        if 'parties' in info:
+                            # Classeur : un worker par produit, déplacé quand tous sont écrits
+                            emit({'event': 'classeur', 'fichier': os.path.basename(pdf), 'voie': voie,
+                                  'produits': len(info['parties']),
+                                  'pages': [[a + 1, b] for a, b in info['parties']]})
+                            parts[pdf] = [len(info['parties']), False]
+                            pool = slow_pool if voie == 'lente' else fast_pool
+                            for part in info['parties']:
+                                running[pool.submit(_parse_worker, pdf, fields, False, part)] = (
+                                    pdf, voie, sig, fournisseur, part)
+                            continue
+                        result = FdsDocument.unpack(result)
+                    except Exception as e:
+                        failed[pdf] = sig
+                        if pdf in parts:
+                            parts[pdf][1] = True
+                        emit({'event': 'error', 'fichier': os.path.basename(pdf), 'voie': voie, 'erreur': str(e)})
+                        if metrics:
+                            metrics.record_error(voie, fournisseur)
+                        result = None
+                    if result is not None:
+                        if metrics:
+                            metrics.record_document(voie, duree, info['trace'], fournisseur, result.get('nb_composants'))
+                        out.write(json.dumps(result, ensure_ascii=False, default=_to_json) + '\n')
+                        out.flush()
+                        if conn is not None:
+                            digest = file_sha256(pdf)
+                            store_results(conn, [result], [part_digest(digest, result['pages']) if pages else digest])
+                        if lsh is not None:
+                            for alert in index_near_duplicates(lsh, [result])[1]:
+                                emit(dict(event='near_duplicate', **alert))
+                            lsh_pending += 1
+                        ev = {'event': 'parsed', 'fichier': os.path.basename(pdf), 'voie': voie,
+                              'duree_s': duree, 'nb_composants': result.get('nb_composants')}
+                        if pages:
+                            ev['pages'] = result['pages']
+                        emit(ev)
+                    if pdf in parts:
+                        parts[pdf][0] -= 1
+                        if parts[pdf][0]:
+                            continue
+                        if parts.pop(pdf)[1]:
+                            continue
+                    elif result is None:
+                        continue
+                    try:
+                        os.replace(pdf, os.path.join(done_dir, os.path.basename(pdf)))
+                    except OSError as e:
+                        failed[pdf] = sig
+                        emit({'event': 'error', 'fichier': os.path.basename(pdf), 'erreur': f'déplacement done/ : {e}'})
+
+                if metrics:
+                    metrics.maybe_flush()
+                if lsh_pending and (lsh_pending >= NEAR_DUP_SAVE_EVERY
+                                    or time.monotonic() - lsh_saved >= NEAR_DUP_SAVE_INTERVAL):
+                    save_lsh_index(lsh, near_dupes)
+                    lsh_pending, lsh_saved = 0, time.monotonic()
+                # Réveil rapide tant que des fichiers attendent leur stabilisation
+                timeout = min(poll, debounce) if (seen or running) else poll
+                if fd is not None:
+                    _inotify_wait(fd, timeout)
+                else:
+                    time.sleep(timeout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if fd is not None:
+            os.close(fd)
+        if conn is not None:
+            conn.close()
+        if metrics:
+            metrics.flush()
+        if lsh_pending:
+            save_lsh_index(lsh, near_dupes)
+        fast_pool.shutdown(cancel_futures=True)
+        slow_pool.shutdown(cancel_futures=True)
+        emit({'event': 'stop'})
+
+
+# ── CLI ──────────────────────────────────────────────
+
+def _emit(ev):
+    print(json.dumps(ev, ensure_ascii=False), flush=True)
+
+
+def _write_output(payload, output, count):
+    # Sérialisation en flux (json.dump) : jamais de copie complète du JSON en mémoire
+    if output:
+        tmp = output + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2, default=_to_json)
+        os.replace(tmp, output)
+        print(json.dumps({'event': 'saved', 'path': output, 'count': count}), flush=True)
+    else:
+        import codecs
+        # Force UTF-8 on Windows — all output via buffer to avoid cp1252 mixing
+        sys.stdout.flush()  # flush any pending print() output first
+        sys.stdout.buffer.write(b'---JSON_START---\n')
+        json.dump(payload, codecs.getwriter('utf-8')(sys.stdout.buffer), ensure_ascii=False, indent=2, default=_to_json)
+        sys.stdout.buffer.write(b'\n')
+        sys.stdout.buffer.flush()
+
+
+def _str_option(name, default=None):
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def main_merge(argv):
+    """fds-parser.py merge <shard1.json> <shard2.json> ... [--output f.json] [--force]"""
+    output = _str_option('--output')
+    files = [a for a in argv if not a.startswith('--') and a != output]
+    shards = []
+    for fp in files:
+        with open(fp, encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or '_shard' not in data:
+            _emit({'event': 'error', 'erreur': f'{fp} : pas une sortie --shard'})
+            sys.exit(1)
+        shards.append(data)
+    results, dupes, anomalies = merge_shards(shards)
+    for a in anomalies:
+        _emit({'event': 'error', 'erreur': a})
+    if anomalies and '--force' not in argv:
+        sys.exit(1)
+    if dupes:
+        _emit({'event': 'doublons', 'fichiers': dupes, 'count': len(dupes)})
+    _emit({'event': 'done', 'count': len(results), 'doublons_retires': len(dupes), 'shards': len(shards)})
+    _write_output(results, output, len(results))
+
+
+def main_store(argv):
+    """fds-parser.py import <base.db> <resultats.json|.ndjson> ...
+    fds-parser.py query <base.db> [--cas X [--min-pct N]] [--fournisseur F] [--code C]
+                                  [--nom N] [--h H317] [--limit N] [--output f.json]
+
+    --min-pct N : le CAS peut dépasser N % (borne haute > N) ou vaut au
+    moins N % (borne basse ≥ N) ; « ≥ 5 - < 10 » ne sort pas pour 10."""
+    command, db = argv[0], argv[1] if len(argv) > 1 else None
+    if not db:
+        print(main_store.__doc__)
+        sys.exit(1)
+    conn = open_store(db)
+    try:
+        if command == 'import':
+            total = 0
+            for fp in argv[2:]:
+                if fp.startswith('--'):
+                    continue
+                total += store_results(conn, load_results_file(fp))
+            _emit({'event': 'done', 'count': total, 'store': db})
+            return
+        t0 = time.perf_counter()
+        min_pct = _str_option('--min-pct')
+        rows = query_store(
+            conn, cas=_str_option('--cas'), min_pct=float(min_pct) if min_pct else None,
+            fournisseur=_str_option('--fournisseur'), code=_str_option('--code'),
+            nom=_str_option('--nom'), phrase_h=_str_option('--h'), limit=_int_option('--limit', None),
+        )
+        _emit({'event': 'done', 'count': len(rows), 'duree_ms': round((time.perf_counter() - t0) * 1000, 2)})
+        _write_output(rows, _str_option('--output'), len(rows))
+    finally:
+        conn.close()
+
+
+def main_near_dupes(argv):
+    """fds-parser.py near-dupes <resultats.json|.ndjson> ... [--index idx.json]
+                                [--threshold 0.7] [--output f.json]"""
+    files = []
+    i = 0
+    while i < len(argv):
+        if argv[i] in ('--index', '--threshold', '--output'):
+            i += 2
+            continue
+        files.append(argv[i])
+        i += 1
+    index_path = _str_option('--index')
+    if not files and not index_path:
+        print(main_near_dupes.__doc__)
+        sys.exit(1)
+    threshold = float(_str_option('--threshold', NEAR_DUP_THRESHOLD))
+    t0 = time.perf_counter()
+    index = load_lsh_index(index_path) if index_path else new_lsh_index()
+    deja = len(index['docs'])
+    keys = []
+    for fp in files:
+        keys.extend(index_near_duplicates(index, load_results_file(fp), threshold)[0])
+    if index_path:
+        save_lsh_index(index, index_path)
+    # Avec un index existant : seulement les grappes touchant les nouveaux documents
+    clusters = near_duplicate_clusters(index, threshold, keys if deja and files else None)
+    _emit({'event': 'done', 'documents': len(index['docs']), 'nouveaux': len(index['docs']) - deja,
+           'grappes': len(clusters), 'duree_s': round(time.perf_counter() - t0, 3)})
+    _write_output(clusters, _str_option('--output'), len(clusters))
+
+
+def main_export(argv):
+    """fds-parser.py export <resultats.json|.ndjson|base.db> ... --dir dossier
+                            [--format auto|csv|parquet] [--chunk 50000]"""
+    out_dir = _str_option('--dir')
+    files = []
+    i = 0
+    while i < len(argv):
+        if argv[i] in ('--dir', '--format', '--chunk'):
+            i += 2
+            continue
+        files.append(argv[i])
+        i += 1
+    if not files or not out_dir:
+        print(main_export.__doc__)
+        sys.exit(1)
+    fmt = _str_option('--format', 'auto')
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            _emit({'event': 'error', 'erreur': 'pyarrow requis pour --format parquet. pip install pyarrow'})
+            sys.exit(1)
+    t0 = time.perf_counter()
+    results = (r for fp in files for r in iter_results(fp))
+    summary = export_results(results, out_dir, fmt=fmt, chunk=_int_option('--chunk', EXPORT_CHUNK))
+    _emit(dict(event='done', duree_s=round(time.perf_counter() - t0, 3), **summary))
+
+
+def _int_option(name, default):
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return int(sys.argv[idx + 1])
+    return default
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 fds-parser.py <fichier.pdf | dossier> [--output f.json] [--workers N] [--ocr-workers N] [--fields composition,identification,...] [--shard i/n] [--store base.db] [--near-dupes idx.json] [--pattern-stats motifs.json] [--metrics base [--metrics-interval s]] [--ocr-cache ocr.db [--ocr-cache-mb N]]")
+        print("       python3 fds-parser.py <inbox/> --watch [--output f.ndjson] [--done dir] [--debounce s] [--poll s] [--store base.db] [--near-dupes idx.json] [--metrics base [--metrics-interval s]] [--ocr-cache ocr.db [--ocr-cache-mb N]]")
+        print("       python3 fds-parser.py merge <shard1.json> <shard2.json> ... [--output f.json] [--force]")
+        print("       python3 fds-parser.py query <base.db> [--cas X [--min-pct N]] [--fournisseur F] [--code C] [--nom N] [--h H317]")
+        print("       python3 fds-parser.py import <base.db> <resultats.json|.ndjson> ...")
+        print("       python3 fds-parser.py near-dupes <resultats.json|.ndjson> ... [--index idx.json] [--threshold 0.7]")
+        print("       python3 fds-parser.py export <resultats.json|.ndjson|base.db> ... --dir dossier [--format auto|csv|parquet] [--chunk N]")
+        sys.exit(1)
+    if sys.argv[1] == 'merge':
+        return main_merge(sys.argv[2:])
+    if sys.argv[1] in ('query', 'import'):
+        return main_store(sys.argv[1:])
+    if sys.argv[1] == 'export':
+        return main_export(sys.argv[2:])
+    if sys.argv[1] == 'near-dupes':
+        return main_near_dupes(sys.argv[2:])
+    path = sys.argv[1]
+    output = None
+    if '--output' in sys.argv:
+        idx = sys.argv.index('--output')
+        output = sys.argv[idx + 1] if idx + 1 < len(sys.argv) else 'fds-resultats.json'
+    fields = None
+    if '--fields' in sys.argv:
+        idx = sys.argv.index('--fields')
+        try:
+            fields = normalize_fields(sys.argv[idx + 1] if idx + 1 < len(sys.argv) else '')
+        except ValueError as e:
+            print(json.dumps({'event': 'error', 'erreur': str(e)}, ensure_ascii=False), flush=True)
+            sys.exit(1)
+    
+    shard = None
+    if '--shard' in sys.argv:
+        try:
+            shard = parse_shard_spec(_str_option('--shard', ''))
+        except ValueError as e:
+            _emit({'event': 'error', 'erreur': str(e)})
+            sys.exit(1)
+    
+    metrics = None
+    if _str_option('--metrics'):
+        metrics = BatchMetrics(_str_option('--metrics'),
+                               float(_str_option('--metrics-interval', METRICS_INTERVAL)))
+    
+    if _str_option('--ocr-cache'):
+        # Lu par ocr_cache() dans chaque worker, quel que soit le mode de démarrage
+        try:
+            os.environ['FDS_OCR_CACHE_MB'] = str(float(_str_option('--ocr-cache-mb', OCR_CACHE_MB)))
+        except ValueError:
+            _emit({'event': 'error', 'erreur': '--ocr-cache-mb : nombre de Mo attendu'})
+            sys.exit(1)
+        os.environ['FDS_OCR_CACHE'] = os.path.abspath(_str_option('--ocr-cache'))
+    
+    if '--watch' in sys.argv:
+        if not os.path.isdir(path):
+            _emit({'event': 'error', 'erreur': f'{path} : dossier inbox attendu'})
+            sys.exit(1)
+        watch_inbox(
+            path,
+            output or os.path.join(os.path.dirname(os.path.abspath(path)), 'extractions.ndjson'),
+            done_dir=_str_option('--done'),
+            debounce=float(_str_option('--debounce', 2.0)),
+            poll=float(_str_option('--poll', 5.0)),
+            workers=_int_option('--workers', None),
+            ocr_workers=_int_option('--ocr-workers', 1),
+            fields=fields,
+            emit=_emit,
+            store=_str_option('--store'),
+            near_dupes=_str_option('--near-dupes'),
+            metrics=metrics,
+        )
+        return
+    
+    pattern_stats = _str_option('--pattern-stats')
+    if pattern_stats:
+        PATTERNS.enable_stats()
+    
+    results = []
+    payload = None
+    sources = {}   # fichier -> chemin du PDF (empreintes pour --store)
+    if os.path.isfile(path) and (path.lower().endswith('.pdf') or not os.path.splitext(path)[1]):
+        # Accept .pdf files and files without extension (multer temp uploads)
+        t0 = time.perf_counter()
+        ranges = split_products(path)
+        if len(ranges) > 1:
+            _emit({'event': 'classeur', 'fichier': os.path.basename(path), 'produits': len(ranges),
+                   'pages': [[a + 1, b] for a, b in ranges]})
+        results.extend(parse_binder(path, ranges, workers=_int_option('--workers', None), fields=fields))
+        sources[results[0].get('fichier')] = path
+        if metrics:
+            duree = (time.perf_counter() - t0) / len(results)
+            for r in results:
+                metrics.record_document('directe', duree, _TRACE if len(ranges) == 1 else {},
+                                        (r.get('identification') or {}).get('fournisseur'), r.get('nb_composants'))
+    elif os.path.isdir(path):
+        pdfs = sorted(glob.glob(os.path.join(path, '*.pdf')) + glob.glob(os.path.join(path, '*.PDF')))
+        provenance = None
+        if shard:
+            pdfs, provenance = select_shard(pdfs, *shard)
+            provenance['champs'] = sorted(fields) if fields else None
+        # 'start' émis par parse_batch après le triage : total = fichiers à parser
+        start = {'event': 'start', 'nb_pdf': len(pdfs)}
+        if provenance:
+            start['shard'] = f"{provenance['index']}/{provenance['total']}"
+            start['nb_fichiers_archive'] = provenance['nb_fichiers_archive']
+        results = parse_batch(
+            pdfs,
+            workers=_int_option('--workers', None),
+            ocr_workers=_int_option('--ocr-workers', 1),
+            emit=_emit,
+            fields=fields,
+            pattern_stats=bool(pattern_stats),
+            metrics=metrics,
+            start=start,
+        )
+        sources = {os.path.basename(p): p for p in pdfs}
+        if provenance:
+            # Pas de déduplication par shard : merge la fait sur l'ensemble
+            payload = {'_shard': provenance, 'resultats': results}
+            _emit({'event': 'done', 'count': len(results), 'shard': start['shard']})
+        else:
+            # Deduplicate
+            results, dupes = deduplicate_results(results)
+            if dupes:
+                print(json.dumps({'event': 'doublons', 'fichiers': dupes, 'count': len(dupes)}), flush=True)
+            print(json.dumps({'event': 'done', 'count': len(results), 'doublons_retires': len(dupes)}), flush=True)
+    else:
+        print(json.dumps({'event': 'error', 'erreur': f'{path} non reconnu'}), flush=True)
+        sys.exit(1)
+    
+    store = _str_option('--store')
+    if store:
+        conn = open_store(store)
+        try:
+            files = {f: file_sha256(p) for f, p in sources.items()}
+            digests = [None if r.get('fichier') not in files
+                       else part_digest(files[r['fichier']], r['pages']) if r.get('pages')
+                       else files[r['fichier']] for r in results]
+            _emit({'event': 'stored', 'store': store, 'count': store_results(conn, results, digests)})
+        finally:
+            conn.close()
+    
+    near_dupes = _str_option('--near-dupes')
+    if near_dupes:
+        index = load_lsh_index(near_dupes)
+        for alert in index_near_duplicates(index, results)[1]:
+            _emit(dict(event='near_duplicate', **alert))
+        save_lsh_index(index, near_dupes)
+    
+    if pattern_stats:
+        stats = PATTERNS.stats()
+        with open(pattern_stats, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        _emit({'event': 'pattern_stats', 'path': pattern_stats, 'motifs': len(stats),
+               'jamais_gagnants': sum(1 for r in stats if not r['succes']),
+               'duree_ms': round(sum(r['duree_ms'] for r in stats), 3),
+               'plus_couteux': [r['nom'] for r in stats[:5]]})
+    
+    if metrics and metrics.base:
+        summary = metrics.summary()
+        _emit({'event': 'metrics', 'paths': list(metrics.flush()), 'documents': summary['documents'],
+               'taux_erreur': summary['taux_erreur'], 'taux_ocr': summary['taux_ocr']})
+    
+    _write_output(payload if payload is not None else results, output, len(results))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MFC Laboratoire — Recherche de parfums proches par composition (NumPy)
+« Quels parfums de la bibliothèque ressemblent le plus à cette nouvelle FDS ? »
+
+Chaque parfum devient un vecteur creux indexé par CAS, de poids le milieu
+de la fourchette pourcentage_min/max. La bibliothèque est stockée en CSR
+(indptr / indices / data) : une requête se calcule d'un bloc sur toutes les
+lignes (cosinus ou Jaccard pondéré Σmin / Σmax), puis top-k par
+argpartition.
+
+Sources : seed/fds-fragrances.json ({"fragrances": [...]}, components /
+percentage_min/max) et sorties de fds-parser.py (liste, NDJSON du mode
+--watch, {"resultats": [...]}). Index enregistré en .npz non compressé
+(tableaux bruts, chargement en quelques millisecondes) ; ajout incrémental :
+une fiche déjà présente (même clé nom + référence + fournisseur) est
+remplacée, les CAS nouveaux s'ajoutent au vocabulaire sans renuméroter.
+
+Usage : python3 fragrance-similarity.py build <index.npz> [sources.json ...]
+        (défaut : ../seed/fds-fragrances.json)
+        python3 fragrance-similarity.py add <index.npz> <sources.json ...>
+        python3 fragrance-similarity.py query <index.npz> <fiche.pdf | resultat.json>
+        [--metric cosinus|jaccard] [--top 10] [--output proches.json]
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+SEED_FRAGRANCES = os.path.join(_HERE, '..', 'seed', 'fds-fragrances.json')
+METRICS = ('cosinus', 'jaccard')
+
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def composition_vector(fragrance):
+    """{CAS: % (milieu de fourchette)} d'un parfum seed ou d'un résultat fds-parser.
+
+    Une seule borne connue : elle sert de poids. Un minimum de 0 (« < 2,5 % »)
+    est une borne réelle : milieu 1,25. Les CAS répétés s'additionnent.
+    """
+    vec = {}
+    for comp in fragrance.get('composition') or fragrance.get('components') or []:
+        cas = (comp.get('cas_number') or comp.get('cas') or '').strip()
+        if not cas:
+            continue
+        bounds = [_num(comp.get(k)) for k in ('pourcentage_min', 'percentage_min', 'pourcentage_max', 'percentage_max')]
+        bounds = [b for b in bounds if b is not None and b >= 0]
+        weight = (min(bounds) + max(bounds)) / 2 if bounds else 0.0
+        if weight > 0:
+            vec[cas] = vec.get(cas, 0.0) + weight
+    return vec
+
+
+def fragrance_label(fragrance):
+    """Nom, référence et fournisseur (formats seed et fds-parser)."""
+    ident = fragrance.get('identification') or {}
+    return {
+        'nom': ident.get('nom') or fragrance.get('name') or fragrance.get('fichier') or '',
+        'reference': ident.get('code') or fragrance.get('reference') or '',
+        'fournisseur': ident.get('fournisseur') or fragrance.get('supplier_name') or '',
+    }
+
+
+def fragrance_key(label):
+    return '|'.join(' '.join(str(label[k]).upper().split()) for k in ('nom', 'reference', 'fournisseur'))
+
+
+class SimilarityIndex:
+    """Bibliothèque de compositions en CSR, requêtes vectorisées sur toutes les lignes.
+
+    ``vocab`` ne fait que grandir (les indices de colonnes restent valides
+    d'un ajout à l'autre) ; une fiche remplacée est désactivée puis ajoutée
+    en fin, la ligne morte disparaît à l'enregistrement.
+    """
+
+    def __init__(self):
+        self.vocab = []
+        self.col = {}
+        self.labels = []
+        self.keys = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.data = np.zeros(0, dtype=np.float32)
+        self.active = np.zeros(0, dtype=bool)
+        self._stats()
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def _stats(self):
+        """Normes L2 et sommes par ligne (dénominateurs cosinus / Jaccard)."""
+        lengths = np.diff(self.indptr)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        self.rows = rows
+        self.norms = np.sqrt(np.bincount(rows, self.data.astype(np.float64) ** 2, minlength=len(lengths)))
+        self.sums = np.bincount(rows, self.data.astype(np.float64), minlength=len(lengths))
+
+    def add(self, fragrances):
+        """Ajouter (ou remplacer) des parfums ; retourne (ajoutés, remplacés)."""
+        indptr, indices, data = [], [], []
+        end = int(self.indptr[-1])
+        added = replaced = 0
+        if self.keys is None:
+            self.keys = {fragrance_key(label): i for i, label in enumerate(self.labels)}
+        for frag in fragrances:
+            vec = composition_vector(frag)
+            if not vec:
+                continue
+            label = fragrance_label(frag)
+            key = fragrance_key(label)
+            old = self.keys.get(key)
+            if old is not None:
+                self.active[old] = False
+                replaced += 1
+            else:
+                added += 1
+            for cas, weight in vec.items():
+                j = self.col.get(cas)
+                if j is None:
+                    j = self.col[cas] = len(self.vocab)
+                    self.vocab.append(cas)
+                indices.append(j)
+                data.append(weight)
+            end += len(vec)
+            indptr.append(end)
+            self.keys[key] = len(self.labels)
+            self.labels.append(label)
+        if indptr:
+            self.indptr = np.concatenate([self.indptr, np.array(indptr, dtype=np.int64)])
+            self.indices = np.concatenate([self.indices, np.array(indices, dtype=np.int32)])
+            self.data = np.concatenate([self.data, np.array(data, dtype=np.float32)])
+            self.active = np.concatenate([self.active, np.ones(len(indptr), dtype=bool)])
+            self._stats()
+        return added, replaced
+
+    def query(self, fragrance, metric='cosinus', top=10):
+        """Top-k des parfums les plus proches : [{nom, reference, fournisseur, score, communs}]."""
+        if metric not in METRICS:
+            raise ValueError(f'Métrique inconnue : {metric!r} (attendu : {", ".join(METRICS)})')
+        vec = composition_vector(fragrance)
+        n = len(self.labels)
+        if not vec or not n:
+            return []
+        # Vecteur requête dense sur le vocabulaire ; CAS hors vocabulaire : seulement dans ‖q‖ / Σq
+        q = np.zeros(len(self.vocab))
+        for cas, w in vec.items():
+            j = self.col.get(cas)
+            if j is not None:
+                q[j] = w
+        weights = np.fromiter(vec.values(), dtype=float)
+        qv = q[self.indices]
+        shared = np.bincount(self.rows, qv > 0, minlength=n)
+        if metric == 'cosinus':
+            dot = np.bincount(self.rows, self.data * qv, minlength=n)
+            scores = dot / np.maximum(self.norms * np.sqrt((weights ** 2).sum()), 1e-12)
+        else:
+            inter = np.bincount(self.rows, np.minimum(self.data, qv), minlength=n)
+            scores = inter / np.maximum(self.sums + weights.sum() - inter, 1e-12)
+        scores = np.where(self.active, scores, -1.0)
+        k = min(top, n)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [dict(self.labels[i], score=round(float(scores[i]), 4), communs=int(shared[i]))
+                for i in best if scores[i] > 0]
+
+    def save(self, path):
+        """Enregistrer les lignes actives en .npz non compressé (écriture atomique)."""
+        keep = np.flatnonzero(self.active)
+        lengths = np.diff(self.indptr)[keep]
+        starts = self.indptr[:-1][keep]
+        take = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        meta = json.dumps({'vocab': self.vocab, 'labels': [self.labels[i] for i in keep]}, ensure_ascii=False)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp,
+                 indptr=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+                 indices=self.indices[take], data=self.data[take],
+                 meta=np.frombuffer(meta.encode('utf-8'), dtype=np.uint8))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with np.load(path) as z:
+            meta = json.loads(z['meta'].tobytes().decode('utf-8'))
+            index.indptr, index.indices, index.data = z['indptr'], z['indices'], z['data']
+        index.vocab = meta['vocab']
+        index.col = {cas: j for j, cas in enumerate(index.vocab)}
+        index.labels = meta['labels']
+        index.keys = None   # Construit au premier add() : une requête seule n'en a pas besoin
+        index.active = np.ones(len(index.labels), dtype=bool)
+        index._stats()
+        return index
+
+
+# ── CLI ──────────────────────────────────────────────
+
+def load_fragrances(path):
+    """Seed {"fragrances": [...]}, résultats fds-parser (liste, {"resultats": [...]}) ou NDJSON."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        raw = json.loads(text)
+    except json.JSONDecodeError:
+        raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(raw, dict):
+        raw = raw.get('resultats') or raw.get('fragrances') or [raw]
+    return [r for r in raw if isinstance(r, dict) and (r.get('composition') or r.get('components'))]
+
+
+def parse_sheet(path):
+    """Fiche à comparer : PDF (parsé par fds-parser.py) ou premier résultat JSON."""
+    if path.lower().endswith('.pdf'):
+        import importlib.util
+        spec = importlib.util.spec_from_file_location('fds_parser', os.path.join(_HERE, 'fds-parser.py'))
+        parser = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(parser)
+        return parser.parse_fds(path, fields={'identification', 'composition'})
+    fragrances = load_fragrances(path)
+    if not fragrances:
+        raise ValueError(f'{path} : aucune composition')
+    return fragrances[0]
+
+
+def _option(name, default=None):
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+def _positionals(argv):
+    out, skip = [], False
+    for a in argv:
+        if skip:
+            skip = False
+        elif a.startswith('--'):
+            skip = True
+        else:
+            out.append(a)
+    return out
+
+
+def main():
+    args = _positionals(sys.argv[1:])
+    if len(args) < 2 or args[0] not in ('build', 'add', 'query'):
+        print("Usage: python3 fragrance-similarity.py build <index.npz> [sources.json ...]")
+        print("       python3 fragrance-similarity.py add <index.npz> <sources.json ...>")
+        print("       python3 fragrance-similarity.py query <index.npz> <fiche.pdf | resultat.json> [--metric cosinus|jaccard] [--top 10]")
+        sys.exit(1)
+    command, path, sources = args[0], args[1], args[2:]
+    t0 = time.perf_counter()
+    try:
+        if command == 'query':
+            if not sources:
+                raise ValueError('fiche à comparer manquante')
+            index = SimilarityIndex.load(path)
+            t_load = time.perf_counter() - t0
+            sheet = parse_sheet(sources[0])
+            t1 = time.perf_counter()
+            proches = index.query(sheet, _option('--metric', 'cosinus'), int(_option('--top', 10)))
+            result = {
+                'fiche': fragrance_label(sheet), 'metrique': _option('--metric', 'cosinus'),
+                'proches': proches,
+                '_meta': {'bibliotheque': len(index), 'chargement_ms': round(t_load * 1000, 2),
+                          'requete_ms': round((time.perf_counter() - t1) * 1000, 2)},
+            }
+            output = _option('--output')
+            text = json.dumps(result, ensure_ascii=False, indent=2)
+            if output:
+                with open(output, 'w', encoding='utf-8') as f:
+                    f.write(text)
+            else:
+                print(text)
+            return
+        index = SimilarityIndex() if command == 'build' else SimilarityIndex.load(path)
+        added = replaced = 0
+        for src in sources or ([SEED_FRAGRANCES] if command == 'build' else []):
+            a, r = index.add(load_fragrances(src))
+            added, replaced = added + a, replaced + r
+        index.save(path)
+    except (OSError, ValueError) as e:
+        print(json.dumps({'event': 'error', 'erreur': str(e)}, ensure_ascii=False), flush=True)
+        sys.exit(1)
+    print(json.dumps({'event': 'saved', 'path': path, 'parfums': len(index), 'ajoutes': added,
+                      'remplaces': replaced, 'cas': len(index.vocab), 'octets': os.path.getsize(path),
+                      'duree_s': round(time.perf_counter() - t0, 3)}, ensure_ascii=False), flush=True)
+
+
+if __name__ == '__main__':
+    main()
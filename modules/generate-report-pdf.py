@@ -6,12 +6,63 @@ Rapport d'analyse de diffusion parfum × cire
 
 Entrée : JSON sur stdin (données du diagnostic)
 Sortie : PDF sur le chemin spécifié en argument
+
+Mode résident (--serve) : reportlab et les styles MFC sont chargés une seule
+fois, puis chaque ligne JSON reçue sur stdin est un rapport à produire.
+  Requête : {"id": ..., "data": {...diagnostic...}, "output": "chemin.pdf"}
+  Réponse : {"id": ..., "success": true, "path": "chemin.pdf"}
+            ou, sans "output", {"id": ..., "success": true, "pdf_base64": "..."}
+            ou, avec "stream": true, {"id": ..., "success": true, "length": N}
+            suivi immédiatement des N octets du PDF.
+  Aperçu  : {"id": ..., "data": {...}, "preview": "png"|"pdf", "dpi": 72} → page 1 seule,
+            réponse {"id": ..., "success": true, "preview": ..., "length": N} + N octets.
+
+Sortie mémoire (--stdout au lieu du chemin) : aucun fichier temporaire, le
+PDF est écrit sur stdout précédé de l'en-tête « PDF-LENGTH: N\n ».
+
+Aperçu (--preview [png|pdf] [chemin] [--dpi N]) : résumé exécutif seul, sur une page,
+en une fraction du temps du rapport complet (affichage immédiat dans
+diagnostic.html pendant que le rapport complet est produit). Sans chemin,
+les octets sont écrits sur stdout avec l'en-tête « PDF-LENGTH: N\n ».
+Sans format explicite (ni --format), l'extension du chemin le donne.
+
+Mode lot (--batch) : flux NDJSON de diagnostics (fichier ou '-' pour stdin)
+rendus en parallèle sur un pool de processus, vers un dossier ou un ZIP.
+  python3 generate-report-pdf.py --batch lots.ndjson --output-dir rapports/ [--workers N]
+  python3 generate-report-pdf.py --batch - --zip rapports.zip
+
+Annexe : "annexe_moleculaire": true ajoute en fin de rapport toutes les
+molécules analysées (et les listes complètes de boosters / bloquants).
+
+Durées par étape : --timings (ou "timings": true dans une requête --serve)
+ajoute {"timings": {styles_s, assemblage_s, mise_en_page_s, ecriture_s,
+total_s, pages, octets}} à la réponse JSON (sur stderr avec --stdout).
+Banc d'essai : python3 bench-report-pdf.py (payloads synthétiques croissants).
+
+Incertitude : "incertitude" (throw-engine.py --monte-carlo N) ajoute sous les
+scores les percentiles froid / chaud / global sur les fourchettes FDS.
+
+Comparaison : "comparaison_cires" (throw-engine.py) ajoute après la charge
+maximale le classement des cires du catalogue, cire du rapport en gras.
+
+Mode déterministe : si le diagnostic porte "horodatage" (ISO 8601), la date
+imprimée et les métadonnées PDF en sont issues — deux diagnostics identiques
+donnent des PDF identiques à l'octet près. Ces PDF peuvent être mis en cache
+(--cache-dir <dossier> [--cache-max-mb N]), clé = hash du JSON normalisé.
 """
 
+import base64
+import hashlib
+import heapq
+import io
 import json
+import re
 import sys
 import os
-from datetime import datetime
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm, cm
@@ -20,7 +71,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    PageBreak, HRFlowable, KeepTogether
+    PageBreak, HRFlowable, KeepTogether, KeepInFrame, LongTable
 )
 from reportlab.pdfgen import canvas
 
@@ -85,6 +136,125 @@ def build_styles():
     return styles
 
 
+_STYLES = None
+
+
+def get_styles():
+    """Feuille de styles MFC, construite une seule fois par processus."""
+    global _STYLES
+    if _STYLES is None:
+        _STYLES = build_styles()
+    return _STYLES
+
+
+# Tableau moléculaire : top N en page 3, liste complète en annexe (optionnelle)
+MOL_SUMMARY_TOP = 25
+ANNEXE_CHUNK_ROWS = 60   # Lignes par LongTable : chaque bloc se coupe au plus une fois
+
+
+def mol_contribution(m):
+    return m.get('cold_contribution', 0) + m.get('hot_contribution', 0)
+
+
+def molecule_row(m, full=False):
+    """Ligne du tableau moléculaire (``full`` : colonnes de l'annexe)."""
+    pvap_c = m.get('Pvap_cold')
+    pvap_h = m.get('Pvap_hot')
+    pvap_c_str = f'{pvap_c:.1e}' if pvap_c else '-'
+    pvap_h_str = f'{pvap_h:.1e}' if pvap_h else '-'
+    behavior = (m.get('behavior', '') or '')[:20]
+    if not full:
+        return [
+            (m.get('name') or m.get('cas', '?'))[:22],
+            str(m.get('mw', '?')),
+            f'{m.get("pct", "?")}%',
+            str(m.get('bp', m.get('Teb_estimated', '?'))),
+            str(m.get('logp', '?')),
+            pvap_c_str,
+            pvap_h_str,
+            behavior
+        ]
+    cold, hot = m.get('cold_contribution'), m.get('hot_contribution')
+    return [
+        (m.get('name') or m.get('cas', '?'))[:24],
+        m.get('cas', '') or '-',
+        str(m.get('mw', '?')),
+        f'{m.get("pct", "?")}%',
+        str(m.get('bp', m.get('Teb_estimated', '?'))),
+        str(m.get('logp', '?')),
+        pvap_c_str,
+        pvap_h_str,
+        f'{cold:.2f}' if isinstance(cold, (int, float)) else '-',
+        f'{hot:.2f}' if isinstance(hot, (int, float)) else '-',
+        behavior[:14]
+    ]
+
+
+def mol_table_style(header_bg=MFC_GOLD, zebra=GREY_LIGHT):
+    return TableStyle([
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 6.5),
+        ('TEXTCOLOR', (0, 0), (-1, 0), white),
+        ('BACKGROUND', (0, 0), (-1, 0), header_bg),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [white, zebra]),
+        ('GRID', (0, 0), (-1, -1), 0.3, GREY_MED),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ])
+
+
+def streamed_tables(header, rows, col_widths, style, chunk=ANNEXE_CHUNK_ROWS):
+    """Découper un flux de lignes en LongTable successives (en-tête répété).
+
+    Les lignes sont consommées au fil de l'eau et chaque bloc ne se coupe
+    qu'une fois sur une page : coût de mise en page linéaire en nombre de
+    lignes, au lieu des découpes répétées d'une seule grande table.
+    """
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) >= chunk:
+            t = LongTable([header] + block, colWidths=col_widths, repeatRows=1)
+            t.setStyle(style)
+            yield t
+            block = []
+    if block:
+        t = LongTable([header] + block, colWidths=col_widths, repeatRows=1)
+        t.setStyle(style)
+        yield t
+
+
+def build_annexe(story, styles, molecules, boosters, bloquants):
+    """Annexe : toutes les molécules, tous les boosters et bloquants."""
+    story.append(PageBreak())
+    story.append(Paragraph(f'ANNEXE — DETAIL MOLECULAIRE COMPLET ({len(molecules)} molecules)', styles['MFC_H2']))
+    story.append(Paragraph(
+        'Classement par contribution totale (froid + chaud). Froid / Chaud : contributions calculees par le moteur de diffusion.',
+        styles['MFC_Small']
+    ))
+    header = ['Molecule', 'CAS', 'MW', '%', 'Eb. C', 'LogP', 'Pvap 20C', 'Pvap chaud', 'Froid', 'Chaud', 'Comport.']
+    widths = [30*mm, 18*mm, 12*mm, 11*mm, 12*mm, 11*mm, 17*mm, 17*mm, 11*mm, 11*mm, 20*mm]
+    ordered = sorted(molecules, key=mol_contribution, reverse=True)
+    story.extend(streamed_tables(header, (molecule_row(m, full=True) for m in ordered), widths, mol_table_style()))
+
+    if len(boosters) > 8:
+        story.append(Spacer(1, 4*mm))
+        story.append(Paragraph(f'BOOSTERS — LISTE COMPLETE ({len(boosters)})', styles['MFC_H3']))
+        rows = ([b.get('nom', '?'), f'{b.get("pct","?")}%', str(b.get('mw', '?')), ', '.join(b.get('roles', []))[:40],
+                 f'{b.get("contrib_froid","?")}%', f'{b.get("contrib_chaud","?")}%'] for b in boosters)
+        story.extend(streamed_tables(['Molecule', 'Concentration', 'Masse mol.', 'Roles', 'Froid %', 'Chaud %'], rows,
+                                     [35*mm, 20*mm, 18*mm, 61*mm, 18*mm, 18*mm],
+                                     mol_table_style(GREEN_OK, HexColor('#E8F5E9'))))
+    if len(bloquants) > 5:
+        story.append(Spacer(1, 4*mm))
+        story.append(Paragraph(f'BLOQUANTS ET FREINS — LISTE COMPLETE ({len(bloquants)})', styles['MFC_H3']))
+        rows = ([b.get('nom', '?'), 'BLOQUANT' if b.get('impact') == 'bloquant' else 'FREIN', f'{b.get("pct","?")}%',
+                 str(b.get('mw', '?')), '; '.join(b.get('problemes', []))[:70]] for b in bloquants)
+        story.extend(streamed_tables(['Molecule', 'Impact', '%', 'MW', 'Problemes'], rows,
+                                     [35*mm, 18*mm, 14*mm, 14*mm, 89*mm], mol_table_style(RED_BAD, HexColor('#FFEBEE'))))
+
+
 def score_color(score):
     if score >= 7: return GREEN_OK
     if score >= 5: return ORANGE_HOT
@@ -116,7 +286,8 @@ def add_header_footer(canvas_obj, doc):
     
     canvas_obj.setFont('Helvetica', 6.5)
     canvas_obj.setFillColor(GREY_TEXT)
-    canvas_obj.drawString(20*mm, 10*mm, f'Rapport genere le {datetime.now().strftime("%d/%m/%Y a %H:%M")} — MFC Laboratoire')
+    horodatage = getattr(doc, 'horodatage', None) or datetime.now()
+    canvas_obj.drawString(20*mm, 10*mm, f'Rapport genere le {horodatage.strftime("%d/%m/%Y a %H:%M")} — MFC Laboratoire')
     canvas_obj.drawRightString(w - 20*mm, 10*mm, f'Page {doc.page}')
     
     # Filigrane discret
@@ -127,24 +298,67 @@ def add_header_footer(canvas_obj, doc):
     canvas_obj.restoreState()
 
 
-def build_report(data, output_path):
-    """Construire le PDF complet."""
-    styles = build_styles()
-    
+def report_timestamp(data):
+    """Horodatage du payload (mode déterministe) ou None."""
+    h = data.get('horodatage')
+    if not h:
+        return None
+    return datetime.fromisoformat(str(h).replace('Z', '+00:00'))
+
+
+def pdf_metadata(data):
+    """Métadonnées PDF : valeurs par défaut MFC, surchargées par data['pdf_meta']."""
+    meta = {
+        'title': f"Compte-rendu d'analyse — {data.get('fragrance', '?')} x {data.get('wax_name', '?')}",
+        'author': 'MFC Laboratoire',
+        'subject': 'Diagnostic de diffusion parfum x cire',
+        'creator': 'MFC Laboratoire',
+    }
+    meta.update({k: v for k, v in (data.get('pdf_meta') or {}).items() if k in meta or k == 'keywords'})
+    return meta
+
+
+def report_doc(data, output_path, horodatage=None):
+    """Gabarit A4 MFC (marges, métadonnées, mode invariant si horodaté)."""
     doc = SimpleDocTemplate(
         output_path, pagesize=A4,
         topMargin=22*mm, bottomMargin=22*mm,
-        leftMargin=20*mm, rightMargin=20*mm
+        leftMargin=20*mm, rightMargin=20*mm,
+        invariant=1 if horodatage else None,
+        **pdf_metadata(data)
     )
-    
-    story = []
-    
+    doc.horodatage = horodatage
+    return doc
+
+
+def render_story(doc, story):
+    """Construire le document.
+
+    En mode déterministe, CreationDate/ModDate = horodatage du payload
+    (reportlab lit SOURCE_DATE_EPOCH à la création du document PDF).
+    """
+    horodatage = doc.horodatage
+    previous_epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if horodatage:
+        ts = horodatage if horodatage.tzinfo else horodatage.replace(tzinfo=timezone.utc)
+        os.environ['SOURCE_DATE_EPOCH'] = str(int(ts.timestamp()))
+    try:
+        doc.build(story, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
+    finally:
+        if horodatage:
+            if previous_epoch is None:
+                os.environ.pop('SOURCE_DATE_EPOCH', None)
+            else:
+                os.environ['SOURCE_DATE_EPOCH'] = previous_epoch
+
+
+def build_summary(story, styles, data, horodatage=None):
+    """Page 1 : résumé exécutif (infos, scores, conclusion, charge max)."""
     fragrance = data.get('fragrance', '?')
     wax_name = data.get('wax_name', '?')
     rapport = data.get('rapport', {})
     charge = data.get('charge_max_scientifique', {})
     molecules = data.get('molecules', [])
-    diagnostic = data.get('diagnostic', {})
     
     sf = rapport.get('score_froid', '?')
     sc = rapport.get('score_chaud', '?')
@@ -159,7 +373,7 @@ def build_report(data, output_path):
     info_data = [
         ['Parfum', fragrance],
         ['Cire', wax_name],
-        ['Date d\'analyse', datetime.now().strftime('%d/%m/%Y')],
+        ['Date d\'analyse', (horodatage or datetime.now()).strftime('%d/%m/%Y')],
         ['Molecules analysees', str(len(molecules))],
         ['Methode', 'Clausius-Clapeyron x Stokes-Einstein'],
     ]
@@ -210,6 +424,33 @@ def build_report(data, output_path):
         ('BOTTOMPADDING', (0, -1), (-1, -1), 6),
     ]))
     story.append(score_table)
+
+    # Incertitude sur les fourchettes FDS (throw-engine.py --monte-carlo)
+    incertitude = data.get('incertitude') or {}
+    if incertitude.get('score_global'):
+        story.append(Spacer(1, 2*mm))
+        story.append(Paragraph(
+            f'Sensibilite aux fourchettes de concentration FDS — {incertitude.get("echantillons", "?")} compositions tirees (Monte-Carlo)',
+            styles['MFC_Small']
+        ))
+        quantiles = list(incertitude['score_global'])
+        unc_data = [['Score'] + [q.upper().replace('P50', 'Mediane') for q in quantiles]]
+        for label, key in (('Froid', 'score_froid'), ('Chaud', 'score_chaud'), ('Global', 'score_global')):
+            dist = incertitude.get(key, {})
+            unc_data.append([label] + [str(dist.get(q, '-')) for q in quantiles])
+        unc_table = Table(unc_data, colWidths=[25*mm] + [140*mm / len(quantiles)] * len(quantiles))
+        unc_table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7.5),
+            ('TEXTCOLOR', (0, 0), (-1, 0), MFC_DARK),
+            ('BACKGROUND', (0, 0), (-1, 0), GREY_LIGHT),
+            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 0.3, GREY_MED),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]))
+        story.append(unc_table)
     story.append(Spacer(1, 6*mm))
     
     # Conclusion
@@ -284,6 +525,69 @@ def build_report(data, output_path):
                 styles['MFC_Body']
             ))
             story.append(Paragraph(f'{f.get("explication","")}', styles['MFC_Small']))
+
+    # ═══ COMPARAISON DES CIRES (throw-engine.py : charge max sur tout le catalogue) ═══
+    comparaison = data.get('comparaison_cires') or []
+    if comparaison:
+        story.append(Spacer(1, 3*mm))
+        story.append(Paragraph('COMPARAISON DES CIRES — CHARGE MAXIMALE', styles['MFC_H3']))
+        wax_name = data.get('wax_name', '?')
+        cmp_data = [['Rang', 'Cire', 'Charge', 'delta cire', 'chi', 'Solub.', 'Cristaux', 'Visc.', 'Securite']]
+        current = None
+        for i, c in enumerate(comparaison, start=1):
+            if c.get('nom') == wax_name or c.get('cire') == wax_name:
+                current = i
+            cmp_data.append([
+                str(c.get('rang', i)), c.get('nom') or c.get('cire', '?'), c.get('charge_display', '?'),
+                str(c.get('delta_cire', '?')), str(c.get('chi', '?')), str(c.get('solubility_factor', '?')),
+                str(c.get('crystal_factor', '?')), str(c.get('viscosity_factor', '?')), str(c.get('safety_factor', '?'))
+            ])
+        cmp_table = Table(cmp_data, colWidths=[12*mm, 32*mm, 22*mm, 18*mm, 15*mm, 17*mm, 17*mm, 15*mm, 17*mm])
+        cmp_style = [
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7.5),
+            ('TEXTCOLOR', (0, 0), (-1, 0), white),
+            ('BACKGROUND', (0, 0), (-1, 0), MFC_GOLD),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [white, GREY_LIGHT]),
+            ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 0.3, GREY_MED),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]
+        if current:
+            cmp_style += [('FONTNAME', (0, current), (-1, current), 'Helvetica-Bold'),
+                          ('TEXTCOLOR', (0, current), (-1, current), GREEN_OK)]
+        cmp_table.setStyle(TableStyle(cmp_style))
+        story.append(cmp_table)
+
+
+def build_report(data, output_path, styles=None, timings=None):
+    """Construire le PDF complet.
+
+    ``output_path`` : chemin ou objet fichier binaire (BytesIO...).
+    ``styles`` : feuille de styles déjà construite (mode résident).
+    ``timings`` : dict optionnel, rempli avec la durée de chaque étape
+    (styles, assemblage du récit, mise en page doc.build, écriture) en
+    secondes, plus le nombre de pages et la taille du PDF.
+    """
+    t0 = time.perf_counter()
+    styles = styles or build_styles()
+    t_styles = time.perf_counter()
+    horodatage = report_timestamp(data)
+    # Pour isoler l'écriture disque de la mise en page, le PDF est d'abord
+    # produit en mémoire quand les durées sont demandées.
+    to_file = timings is not None and isinstance(output_path, (str, os.PathLike))
+    target = io.BytesIO() if to_file else output_path
+    doc = report_doc(data, target, horodatage)
+    
+    story = []
+    
+    rapport = data.get('rapport', {})
+    molecules = data.get('molecules', [])
+    diagnostic = data.get('diagnostic', {})
+    annexe = bool(data.get('annexe_moleculaire'))
+    
+    build_summary(story, styles, data, horodatage)
     
     # ═══ PAGE 2 : ANALYSE DÉTAILLÉE ═══
     story.append(PageBreak())
@@ -374,40 +678,18 @@ def build_report(data, output_path):
         story.append(Paragraph(f'DETAIL MOLECULAIRE — {len(molecules)} molecules analysees', styles['MFC_H2']))
         
         mol_data = [['Molecule', 'MW', '%', 'Eb. C', 'LogP', 'Pvap 20C', 'Pvap chaud', 'Comportement']]
-        sorted_mols = sorted(molecules, key=lambda m: (m.get('cold_contribution',0) + m.get('hot_contribution',0)), reverse=True)
-        
-        for m in sorted_mols[:25]:
-            name = (m.get('name') or m.get('cas', '?'))[:22]
-            pvap_c = m.get('Pvap_cold')
-            pvap_h = m.get('Pvap_hot')
-            pvap_c_str = f'{pvap_c:.1e}' if pvap_c else '-'
-            pvap_h_str = f'{pvap_h:.1e}' if pvap_h else '-'
-            behavior = (m.get('behavior', '') or '')[:20]
-            
-            mol_data.append([
-                name,
-                str(m.get('mw', '?')),
-                f'{m.get("pct", "?")}%',
-                str(m.get('bp', m.get('Teb_estimated', '?'))),
-                str(m.get('logp', '?')),
-                pvap_c_str,
-                pvap_h_str,
-                behavior
-            ])
+        # Top N sans trier toute la liste (heapq : O(n log N))
+        top_mols = heapq.nlargest(MOL_SUMMARY_TOP, molecules, key=mol_contribution)
+        mol_data.extend(molecule_row(m) for m in top_mols)
         
         mol_table = Table(mol_data, colWidths=[32*mm, 14*mm, 12*mm, 14*mm, 12*mm, 20*mm, 20*mm, 32*mm])
-        mol_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 6.5),
-            ('TEXTCOLOR', (0, 0), (-1, 0), white),
-            ('BACKGROUND', (0, 0), (-1, 0), MFC_GOLD),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [white, GREY_LIGHT]),
-            ('GRID', (0, 0), (-1, -1), 0.3, GREY_MED),
-            ('TOPPADDING', (0, 0), (-1, -1), 2),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+        mol_table.setStyle(mol_table_style())
         story.append(mol_table)
+        if annexe and len(molecules) > MOL_SUMMARY_TOP:
+            story.append(Paragraph(
+                f'{MOL_SUMMARY_TOP} premieres molecules — liste complete des {len(molecules)} molecules en annexe.',
+                styles['MFC_Small']
+            ))
     
     # ═══ MÉTHODOLOGIE ═══
     story.append(Spacer(1, 8*mm))
@@ -439,17 +721,429 @@ def build_report(data, output_path):
         styles['MFC_Small']
     ))
     
-    # Build
-    doc.build(story, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
+    # ═══ ANNEXE : DÉTAIL COMPLET (data['annexe_moleculaire']) ═══
+    if annexe and molecules:
+        build_annexe(story, styles, molecules, boosters, bloquants)
+    
+    t_story = time.perf_counter()
+    render_story(doc, story)
+    t_layout = time.perf_counter()
+    if to_file:
+        with open(output_path, 'wb') as f:
+            f.write(target.getvalue())
+    t_end = time.perf_counter()
+    if timings is not None:
+        timings.update({
+            'styles_s': round(t_styles - t0, 6),
+            'assemblage_s': round(t_story - t_styles, 6),
+            'mise_en_page_s': round(t_layout - t_story, 6),
+            'ecriture_s': round(t_end - t_layout, 6),
+            'total_s': round(t_end - t0, 6),
+            'pages': doc.page,
+            'octets': target.tell() if hasattr(target, 'tell') else None,
+        })
     return output_path
 
 
+# ═══ APERÇU (page 1 seule) ═══
+
+PREVIEW_DPI = 72   # Vignette écran : l'encodage PNG domine au-delà
+
+
+def build_preview(data, output_path, styles=None):
+    """PDF d'une page : le résumé exécutif seul, réduit si besoin pour tenir.
+
+    Même gabarit, mêmes styles et même horodatage que le rapport complet :
+    la page 1 de l'aperçu est celle du rapport final (hors débordement).
+    """
+    styles = styles or build_styles()
+    horodatage = report_timestamp(data)
+    doc = report_doc(data, output_path, horodatage)
+    story = []
+    build_summary(story, styles, data, horodatage)
+    render_story(doc, [KeepInFrame(doc.width, doc.height, story, mode='shrink')])
+    return output_path
+
+
+def render_preview(data, fmt='pdf', styles=None, dpi=PREVIEW_DPI):
+    """Aperçu en mémoire : octets PDF (une page) ou PNG (PyMuPDF requis)."""
+    if fmt not in ('pdf', 'png'):
+        raise ValueError(f"Format d'aperçu inconnu : {fmt} (pdf|png)")
+    buf = io.BytesIO()
+    build_preview(data, buf, styles=styles)
+    pdf = buf.getvalue()
+    if fmt == 'pdf':
+        return pdf
+    # PyMuPDF, chargé seulement pour l'aperçu PNG. « pymupdf » d'abord : l'alias
+    # « fitz » des versions récentes affiche un avertissement sur stdout, qui
+    # corromprait le flux binaire.
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        try:
+            import fitz
+        except ImportError:
+            fitz = None
+    if fitz is None:
+        raise RuntimeError("Aperçu PNG indisponible : PyMuPDF (fitz) n'est pas installé")
+    with fitz.open(stream=pdf, filetype='pdf') as preview:
+        return preview[0].get_pixmap(dpi=dpi).tobytes('png')
+
+
+# ═══ CACHE DE RAPPORTS (mode déterministe) ═══
+
+_RENDERER_FINGERPRINT = None
+
+
+def _renderer_fingerprint():
+    """Hash de ce script : une modification du rendu invalide le cache."""
+    global _RENDERER_FINGERPRINT
+    if _RENDERER_FINGERPRINT is None:
+        with open(os.path.abspath(__file__), 'rb') as f:
+            _RENDERER_FINGERPRINT = hashlib.sha256(f.read()).hexdigest()[:16]
+    return _RENDERER_FINGERPRINT
+
+
+def cache_key(data):
+    """Clé de cache : hash du JSON normalisé (clés triées, sans espaces)."""
+    norm = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256((_renderer_fingerprint() + norm).encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    """Cache disque de PDF adressé par contenu, éviction LRU par taille.
+
+    Écritures atomiques (fichier temporaire + os.replace) : plusieurs
+    processus (mode lot, workers résidents) peuvent partager le dossier.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pdf')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                pdf = f.read()
+            os.utime(path)  # LRU : dernier accès = mtime
+            return pdf
+        except OSError:
+            return None
+
+    def put(self, key, pdf):
+        tmp = self._path(key) + f'.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(pdf)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pdf'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+
+def render_pdf_bytes(data, styles=None, cache=None, timings=None):
+    """Produire le PDF en mémoire et retourner ses octets.
+
+    Avec un ``cache`` et un payload déterministe (horodatage fourni), un PDF
+    déjà rendu est retourné immédiatement (``timings`` reçoit alors
+    {"cache": true}).
+    """
+    key = cache_key(data) if cache is not None and data.get('horodatage') else None
+    if key:
+        pdf = cache.get(key)
+        if pdf is not None:
+            if timings is not None:
+                timings['cache'] = True
+            return pdf
+    buf = io.BytesIO()
+    build_report(data, buf, styles=styles, timings=timings)
+    pdf = buf.getvalue()
+    if key:
+        cache.put(key, pdf)
+    return pdf
+
+
+def write_report(data, output_path, styles=None, cache=None, timings=None):
+    """Écrire le rapport sur disque, en passant par le cache s'il y en a un."""
+    if cache is None:
+        return build_report(data, output_path, styles=styles, timings=timings)
+    pdf = render_pdf_bytes(data, styles=styles, cache=cache, timings=timings)
+    t0 = time.perf_counter()
+    with open(output_path, 'wb') as f:
+        f.write(pdf)
+    if timings is not None:
+        timings['ecriture_s'] = round(time.perf_counter() - t0, 6)
+    return output_path
+
+
+def open_cache():
+    """Cache désigné par --cache-dir / --cache-max-mb, ou None."""
+    directory = _option('--cache-dir')
+    if not directory:
+        return None
+    return ReportCache(directory, int(float(_option('--cache-max-mb', 256)) * 1024 * 1024))
+
+
+def handle_request(req, styles, cache=None):
+    """Traiter une requête du mode résident.
+
+    Retourne (réponse, octets) : ``octets`` est le PDF brut à envoyer après
+    la ligne de réponse pour une requête "stream", sinon None.
+    """
+    rid = req.get('id')
+    data = req.get('data')
+    if not isinstance(data, dict):
+        return {'id': rid, 'success': False, 'error': 'Champ "data" manquant'}, None
+    preview = req.get('preview')
+    if preview:
+        image = render_preview(data, 'png' if preview is True else preview, styles=styles,
+                               dpi=int(req.get('dpi') or PREVIEW_DPI))
+        return {'id': rid, 'success': True, 'preview': 'png' if preview is True else preview,
+                'length': len(image)}, image
+    timings = {} if req.get('timings') else None
+    output = req.get('output')
+    if output:
+        write_report(data, output, styles=styles, cache=cache, timings=timings)
+        reply, pdf = {'id': rid, 'success': True, 'path': output}, None
+    else:
+        pdf = render_pdf_bytes(data, styles=styles, cache=cache, timings=timings)
+        if req.get('stream'):
+            reply = {'id': rid, 'success': True, 'length': len(pdf)}
+        else:
+            reply, pdf = {'id': rid, 'success': True, 'pdf_base64': base64.b64encode(pdf).decode('ascii')}, None
+    if timings is not None:
+        reply['timings'] = timings
+    return reply, pdf
+
+
+def serve(stdin=None, stdout=None, cache=None):
+    """Boucle du mode résident : une requête JSON par ligne, une réponse par ligne.
+
+    ``stdout`` est un flux binaire (sys.stdout.buffer par défaut) : les
+    réponses "stream" y écrivent le PDF brut juste après leur ligne JSON.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout.buffer
+    styles = get_styles()
+    stdout.write(json.dumps({'ready': True, 'pid': os.getpid()}).encode('utf-8') + b'\n')
+    stdout.flush()
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        req = None
+        try:
+            req = json.loads(line)
+            reply, pdf = handle_request(req, styles, cache)
+        except Exception as e:
+            reply, pdf = {'id': req.get('id') if isinstance(req, dict) else None,
+                          'success': False, 'error': str(e)}, None
+        stdout.write(json.dumps(reply).encode('utf-8') + b'\n')
+        if pdf is not None:
+            stdout.write(pdf)
+        stdout.flush()
+
+
+def write_pdf_stream(pdf, stream=None):
+    """Écrire un PDF sur un flux binaire avec son en-tête de longueur."""
+    stream = stream or sys.stdout.buffer
+    stream.write(f'PDF-LENGTH: {len(pdf)}\n'.encode('ascii'))
+    stream.write(pdf)
+    stream.flush()
+
+
+# ═══ MODE LOT ═══
+
+def report_filename(data, rid=None):
+    """Nom de fichier d'un rapport (même schéma que la route Node)."""
+    if rid is not None:
+        base = str(rid)
+    else:
+        base = f"MFC_Rapport_{data.get('fragrance', 'parfum')}_{data.get('wax_name', 'cire')}"
+    return re.sub(r'[^a-zA-Z0-9_-]', '_', base) + '.pdf'
+
+
+_WORKER_CACHE = None
+
+
+def _batch_init(cache_dir=None, cache_max_bytes=None):
+    global _WORKER_CACHE
+    get_styles()
+    if cache_dir:
+        _WORKER_CACHE = ReportCache(cache_dir, cache_max_bytes)
+
+
+def _batch_render(data, out_path):
+    """Worker : rendu d'un rapport. Retourne (octets ou None, durée)."""
+    t0 = time.perf_counter()
+    if out_path:
+        write_report(data, out_path, styles=get_styles(), cache=_WORKER_CACHE)
+        pdf = None
+    else:
+        pdf = render_pdf_bytes(data, styles=get_styles(), cache=_WORKER_CACHE)
+    return pdf, round(time.perf_counter() - t0, 3)
+
+
+def run_batch(lines, output_dir=None, zip_path=None, workers=None, emit=None, cache=None):
+    """Rendre un flux NDJSON de diagnostics sur un pool de processus.
+
+    ``lines`` est consommé au fil de l'eau : au plus 2 × ``workers`` rapports
+    sont en vol, la mémoire reste bornée quelle que soit la taille du lot.
+    Chaque ligne est soit le diagnostic, soit {"id": ..., "data": {...}}.
+    Destination : ``output_dir`` ou ``zip_path``, l'un ou l'autre.
+    ``cache`` (ReportCache) est partagé par les workers via son dossier.
+    Retourne (nb_ok, nb_erreurs).
+    """
+    if output_dir and zip_path:
+        raise ValueError('output_dir et zip_path sont exclusifs : un dossier ou un ZIP')
+    emit = emit or (lambda ev: None)
+    workers = workers or min(4, os.cpu_count() or 1)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    zf = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) if zip_path else None
+    names = set()
+    ok = errors = 0
+    pending = {}
+
+    def collect(done):
+        nonlocal ok, errors
+        for fut in done:
+            ligne, name = pending.pop(fut)
+            try:
+                pdf, duree = fut.result()
+            except Exception as e:
+                errors += 1
+                emit({'event': 'error', 'ligne': ligne, 'fichier': name, 'erreur': str(e)})
+                continue
+            if zf is not None:
+                zf.writestr(name, pdf)
+            ok += 1
+            emit({'event': 'progress', 'current': ok + errors, 'ligne': ligne, 'fichier': name, 'duree_s': duree})
+
+    emit({'event': 'start', 'workers': workers})
+    try:
+        init_args = (cache.directory, cache.max_bytes) if cache is not None else ()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_batch_init, initargs=init_args) as pool:
+            for ligne, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                    rid, data = (item.get('id'), item['data']) if 'data' in item else (None, item)
+                except Exception as e:
+                    errors += 1
+                    emit({'event': 'error', 'ligne': ligne, 'erreur': f'JSON invalide : {e}'})
+                    continue
+                name = report_filename(data, rid)
+                stem, n = name[:-4], 2
+                while name in names:
+                    name = f'{stem}_{n}.pdf'; n += 1
+                names.add(name)
+                out_path = os.path.join(output_dir, name) if output_dir else None
+                pending[pool.submit(_batch_render, data, out_path)] = (ligne, name)
+                if len(pending) >= 2 * workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+    finally:
+        if zf is not None:
+            zf.close()
+    emit({'event': 'done', 'count': ok, 'erreurs': errors,
+          'destination': zip_path or output_dir})
+    return ok, errors
+
+
+def _option(name, default=None):
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: python3 generate-report-pdf.py <output_path>", file=sys.stderr)
+        print("Usage: python3 generate-report-pdf.py <output_path> | --stdout | --preview [png|pdf] [chemin] | --serve | --batch <lots.ndjson|-> [--timings] [--cache-dir <dossier>] [--cache-max-mb N]", file=sys.stderr)
         sys.exit(1)
     
+    if sys.argv[1] == '--serve':
+        serve(cache=open_cache())
+        sys.exit(0)
+    
+    if sys.argv[1] == '--batch':
+        source = _option('--batch', '-')
+        output_dir, zip_path = _option('--output-dir'), _option('--zip')
+        if bool(output_dir) == bool(zip_path):
+            print("Usage: python3 generate-report-pdf.py --batch <lots.ndjson|-> (--output-dir <dossier> | --zip <f.zip>) [--workers N]", file=sys.stderr)
+            sys.exit(1)
+        workers = int(_option('--workers', 0)) or None
+        emit = lambda ev: print(json.dumps(ev, ensure_ascii=False), flush=True)
+        if source == '-':
+            ok, errors = run_batch(sys.stdin, output_dir, zip_path, workers, emit, open_cache())
+        else:
+            with open(source, encoding='utf-8') as f:
+                ok, errors = run_batch(f, output_dir, zip_path, workers, emit, open_cache())
+        sys.exit(1 if errors and not ok else 0)
+    
     data = json.load(sys.stdin)
+    if sys.argv[1] == '--preview':
+        # --preview [png|pdf] [chemin] : sans format explicite, l'extension du chemin le donne
+        args = [a for i, a in enumerate(sys.argv[2:], 2)
+                if not a.startswith('--') and sys.argv[i - 1] not in ('--dpi', '--format')]
+        fmt = _option('--format')
+        if args and not os.path.splitext(args[0])[1]:
+            fmt = fmt or args[0]   # mot sans extension : le format
+            args.pop(0)
+        output_path = args[0] if args else None
+        if not fmt:
+            fmt = os.path.splitext(output_path)[1].lstrip('.') if output_path else 'png'
+        fmt = fmt.lower()
+        try:
+            preview = render_preview(data, fmt, dpi=int(_option('--dpi', PREVIEW_DPI)))
+        except (ValueError, RuntimeError) as e:
+            print(json.dumps({"success": False, "error": str(e)}))
+            sys.exit(1)
+        if not output_path:
+            write_pdf_stream(preview)
+            sys.exit(0)
+        with open(output_path, 'wb') as f:
+            f.write(preview)
+        print(json.dumps({"success": True, "path": output_path, "format": fmt}))
+        sys.exit(0)
+    timings = {} if '--timings' in sys.argv else None
+    if sys.argv[1] == '--stdout':
+        write_pdf_stream(render_pdf_bytes(data, cache=open_cache(), timings=timings))
+        if timings is not None:
+            print(json.dumps({"timings": timings}), file=sys.stderr)
+        sys.exit(0)
     output_path = sys.argv[1]
-    build_report(data, output_path)
-    print(json.dumps({"success": True, "path": output_path}))
+    write_report(data, output_path, cache=open_cache(), timings=timings)
+    result = {"success": True, "path": output_path}
+    if timings is not None:
+        result["timings"] = timings
+    print(json.dumps(result))
@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MFC Laboratoire — Moteur de diffusion vectorisé (NumPy)
+Scores de diffusion à froid / à chaud pour des grilles parfum × cire × température
+
+Même modèle que throw-diagnostic.js (throwIndex / analyzeThrowProfile) :
+  Pvap(T)  : Clausius-Clapeyron, ΔHvap par la règle de Trouton (88/95/110 × Teb)
+  D(T, η)  : Stokes-Einstein, D ∝ T / (η × MW^(1/3)), relatif au linalol en paraffine
+  froid    : Pvap(T) × migration de surface × concentration × poids OAV
+  chaud    : Pvap(T) × D × channel factor × concentration × poids OAV
+mais calculé d'un bloc : compositions (matrice parfums × molécules) et
+propriétés (vecteurs par molécule), une multiplication matricielle par grille.
+
+Entrées :
+  --molecules props.json   table de propriétés {cas: {mw, bp, fp, family,
+                           odor_threshold, volatility, name, logp...}}
+                           (même format que la base molécules du serveur)
+  --fragrances f.json      sortie de fds-parser.py (liste, NDJSON du mode
+                           --watch, ou {"resultats": [...]} d'un fragment)
+
+Usage : python3 throw-engine.py --molecules props.json --fragrances extractions.json
+        [--waxes paraffine,soja,...] [--temperatures 20,45,60,75]
+        [--output grille.json] [--payloads rapports.ndjson [--monte-carlo N]]
+
+--payloads écrit un diagnostic par couple parfum × cire (molécules avec
+Pvap_cold/Pvap_hot/cold_contribution/hot_contribution...), directement
+consommable par generate-report-pdf.py --batch. Charge maximale
+Flory-Huggins / Hildebrand calculée pour tous les parfums × toutes les cires
+d'un bloc : la grille porte "charge_max" (cires de --waxes) et
+"classement_cires", chaque diagnostic sa "charge_max_scientifique" et le
+tableau "comparaison_cires" (cires classées par charge max ; les deux
+classements portent sur tout le catalogue, quel que soit --waxes). Chaque diagnostic porte
+les scores /10 de generateScientificReport (point milieu des fourchettes) ;
+--monte-carlo N y ajoute "incertitude" : percentiles P5-P95 des scores froid,
+chaud et global sur N compositions tirées dans les fourchettes FDS
+(somme ≤ 100 %).
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+
+R = 8.314  # J/(mol·K)
+
+# Miroir de WAX_THERMO (throw-diagnostic.js) : seuls les paramètres du modèle
+WAX_THERMO = {
+    'paraffine':        {'T_melt_pool': 60, 'T_surface_cold': 20, 'viscosity_melt': 4.5, 'channel_factor': 1.0,  'surface_migration': 0.8,  'hildebrand': 16.2, 'nom': 'Paraffine'},
+    'cire_minerale':    {'T_melt_pool': 65, 'T_surface_cold': 20, 'viscosity_melt': 8,   'channel_factor': 0.7,  'surface_migration': 0.6,  'hildebrand': 16.5, 'nom': 'Cire minerale'},
+    'soja':             {'T_melt_pool': 48, 'T_surface_cold': 20, 'viscosity_melt': 35,  'channel_factor': 0.3,  'surface_migration': 0.4,  'hildebrand': 17.6, 'nom': 'Soja'},
+    'colza':            {'T_melt_pool': 52, 'T_surface_cold': 20, 'viscosity_melt': 28,  'channel_factor': 0.4,  'surface_migration': 0.45, 'hildebrand': 17.4, 'nom': 'Colza'},
+    'coco':             {'T_melt_pool': 35, 'T_surface_cold': 20, 'viscosity_melt': 8,   'channel_factor': 0.9,  'surface_migration': 0.95, 'hildebrand': 17.0, 'nom': 'Coco'},
+    'microcristalline': {'T_melt_pool': 75, 'T_surface_cold': 20, 'viscosity_melt': 18,  'channel_factor': 0.05, 'surface_migration': 0.05, 'hildebrand': 16.8, 'nom': 'Microcristalline'},
+}
+
+COLD_MAX_T = 25                            # °C : au-dessous, diffusion solide en surface
+D_REF = 333 / (4.5 * 154 ** (1 / 3))       # Linalol (MW 154) en paraffine (4.5 cSt) à 60°C
+OT_MEDIAN = 50                             # µg/m³ : seuil olfactif par défaut
+
+
+def _js_round(x, scale=1):
+    """Math.round(x × scale) / scale (arrondi demi vers +inf, comme le JS)."""
+    return np.floor(np.asarray(x, dtype=float) * scale + 0.5) / scale
+
+
+def _js_str(x):
+    """Nombre affiché comme en JS (4.0 → "4")."""
+    x = float(x)
+    return str(int(x)) if x.is_integer() else str(x)
+
+
+def _num(v):
+    """Valeur numérique JS-like : None, '', 0 et non-numériques → 0."""
+    try:
+        return float(v) if v else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class PropertyTable:
+    """Propriétés moléculaires sous forme de vecteurs alignés (un indice par CAS).
+
+    Les estimations de throw-diagnostic.js sont faites une fois ici :
+    Teb (bp mesuré → flash point → masse molaire → 250°C), ΔHvap (Trouton,
+    corrigé alcools/phénols et muscs/lactones) et poids OAV (50 / seuil).
+    """
+
+    def __init__(self, molecules):
+        self.records = molecules
+        self.cas = list(molecules)
+        self.index = {cas: i for i, cas in enumerate(self.cas)}
+        mols = [molecules[c] for c in self.cas]
+        bp = np.array([_num(m.get('bp')) for m in mols])
+        fp = np.array([_num(m.get('fp')) for m in mols])
+        mw = np.array([_num(m.get('mw')) for m in mols])
+        self.teb_c = np.select(
+            [bp > 0, fp > 0, mw > 0],
+            [bp, _js_round(1.5 * fp + 73), _js_round(2.5 * mw + 20)],
+            default=250.0
+        )
+        self.teb_k = self.teb_c + 273.15
+        families = [(m.get('family') or '').lower() for m in mols]
+        trouton = np.array([
+            110 if ('alcool' in f or 'phénol' in f) else 95 if ('musc' in f or 'lactone' in f) else 88
+            for f in families
+        ], dtype=float)
+        self.dhvap = trouton * self.teb_k
+        self.mw13 = np.where(mw > 0, mw, 154.0) ** (1 / 3)
+        ot = np.array([_num(m.get('odor_threshold')) or _num(m.get('ot')) or OT_MEDIAN for m in mols])
+        self.oav = OT_MEDIAN / np.maximum(ot, 0.01)
+        # Attributs des scores /10 (generateScientificReport)
+        vol = [m.get('volatility') or 'moyenne' for m in mols]
+        self.volatile = np.array([v in ('très_haute', 'haute') for v in vol])
+        self.heavy = np.array([v in ('basse', 'très_basse') for v in vol])
+        self.potent = np.array([0 < _num(m.get('odor_threshold')) < 10 for m in mols])
+        self.aldehyde_arom = np.array(['aldéhyde-aromatique' in (m.get('family') or '') for m in mols])
+        self.logp = np.array([np.nan if m.get('logp') is None else _num(m.get('logp')) for m in mols])
+        # Charge max (calculateScientificChargeMax) : logP absent → 3, MW absente → 154
+        self.logp_charge = np.where(np.isnan(self.logp), 3.0, self.logp)
+        self.mw_charge = np.where(mw > 0, mw, 154.0)
+        self.fp = np.where(fp > 0, fp, np.inf)
+
+    def __len__(self):
+        return len(self.cas)
+
+    @classmethod
+    def load(cls, path):
+        """Table JSON : {cas: {...}} ou liste de fiches portant "cas"."""
+        with open(path, encoding='utf-8') as f:
+            raw = json.load(f)
+        if isinstance(raw, list):
+            raw = {m.get('cas') or m.get('cas_number'): m for m in raw if m.get('cas') or m.get('cas_number')}
+        return cls(raw)
+
+    def pvap(self, temperatures):
+        """Pression de vapeur relative (températures × molécules), bornée à [0, 1]."""
+        T = np.asarray(temperatures, dtype=float).reshape(-1, 1) + 273.15
+        with np.errstate(over='ignore'):
+            return np.clip(np.exp(-self.dhvap / R * (1 / T - 1 / self.teb_k)), 0, 1)
+
+    def diffusion(self, viscosities, temperatures):
+        """Coefficient de diffusion relatif (cires × températures × molécules)."""
+        T = np.asarray(temperatures, dtype=float).reshape(1, -1, 1) + 273.15
+        eta = np.asarray(viscosities, dtype=float).reshape(-1, 1, 1)
+        return T / (eta * self.mw13) / D_REF
+
+
+def wax_params(waxes=None):
+    """Clés et vecteurs de paramètres pour une liste de cires (défaut : toutes)."""
+    keys = list(waxes or WAX_THERMO)
+    unknown = [k for k in keys if k not in WAX_THERMO]
+    if unknown:
+        raise ValueError(f"Cire(s) inconnue(s) : {', '.join(unknown)} (connues : {', '.join(WAX_THERMO)})")
+    col = lambda name: np.array([WAX_THERMO[k][name] for k in keys], dtype=float)
+    return keys, {name: col(name) for name in ('T_melt_pool', 'T_surface_cold', 'viscosity_melt',
+                                               'channel_factor', 'surface_migration')}
+
+
+# ── Compositions ─────────────────────────────────────
+
+def fragrance_flash_points(fragrances):
+    """Point éclair du mélange (°C) lu sur la FDS, 0 si absent."""
+    fps = []
+    for frag in fragrances:
+        props = frag.get('proprietes_physiques') or {}
+        fps.append(_num(props.get('flash_point_c') or frag.get('flash_point')))
+    return np.array(fps)
+
+
+def fragrance_name(result, i=0):
+    ident = result.get('identification') or {}
+    return (ident.get('nom') or result.get('nom') or result.get('name') or result.get('fragrance')
+            or result.get('fichier') or f'parfum_{i + 1}')
+
+
+def composition_matrix(fragrances, table):
+    """Matrice des concentrations (parfums × molécules de la table), en fraction.
+
+    Concentration = moyenne de pourcentage_min/max (ou percentage_min/max de
+    la base), comme analyzeThrowProfile ; les CAS absents de la table sont
+    ignorés et comptés dans ``inconnus``.
+    """
+    lo, hi, inconnus = composition_ranges(fragrances, table)
+    return (lo + hi) / 200, inconnus
+
+
+def composition_ranges(fragrances, table):
+    """Bornes min / max des fourchettes FDS (parfums × molécules), en %."""
+    lo = np.zeros((len(fragrances), len(table)))
+    hi = np.zeros((len(fragrances), len(table)))
+    inconnus = []
+    for f, frag in enumerate(fragrances):
+        missing = []
+        for comp in frag.get('composition') or frag.get('components') or []:
+            cas = comp.get('cas_number') or comp.get('cas')
+            j = table.index.get(cas)
+            if j is None:
+                if cas:
+                    missing.append(cas)
+                continue
+            lo[f, j] += _num(comp.get('pourcentage_min', comp.get('percentage_min')))
+            hi[f, j] += _num(comp.get('pourcentage_max', comp.get('percentage_max')))
+        inconnus.append(missing)
+    return lo, hi, inconnus
+
+
+# ── Grilles ──────────────────────────────────────────
+
+def molecule_scores(table, waxes=None, temperatures=(20, 60)):
+    """Throw perceptuel par unité de concentration (cires × températures × molécules).
+
+    Modèle de throwIndex : T ≤ 25°C → diffusion solide de surface, sinon melt
+    pool actif (Stokes-Einstein × channel factor).
+    """
+    keys, w = wax_params(waxes)
+    temps = np.asarray(temperatures, dtype=float)
+    pv = table.pvap(temps)[None, :, :]
+    cold = (temps <= COLD_MAX_T)[None, :, None]
+    D = table.diffusion(w['viscosity_melt'], temps)
+    factor = np.where(cold, w['surface_migration'][:, None, None], w['channel_factor'][:, None, None] * D)
+    return keys, pv * factor * table.oav
+
+
+def throw_grid(C, table, waxes=None, temperatures=(20, 60)):
+    """Throw total (parfums × cires × températures) : une seule multiplication matricielle."""
+    keys, S = molecule_scores(table, waxes, temperatures)
+    W, T, M = S.shape
+    return keys, (C @ S.reshape(W * T, M).T).reshape(C.shape[0], W, T)
+
+
+def cold_hot_matrix(C, table, waxes=None):
+    """Indices froid / chaud (parfums × cires), chaque cire à ses propres températures."""
+    keys, w = wax_params(waxes)
+    pv_cold = table.pvap(w['T_surface_cold'])                       # W × M
+    pv_hot = table.pvap(w['T_melt_pool'])
+    D_hot = ((w['T_melt_pool'][:, None] + 273.15)
+             / (w['viscosity_melt'][:, None] * table.mw13) / D_REF)    # W × M
+    S_cold = pv_cold * w['surface_migration'][:, None] * table.oav
+    S_hot = pv_hot * D_hot * w['channel_factor'][:, None] * table.oav
+    cold, hot = C @ S_cold.T, C @ S_hot.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(cold > 0, _js_round(hot / np.where(cold > 0, cold, 1), 100), 0.0)
+    return keys, cold, hot, ratio
+
+
+def balance(cold, hot, ratio):
+    """Équilibre froid/chaud, mêmes seuils que analyzeThrowProfile."""
+    return np.select(
+        [(cold < 1e-7) & (hot < 1e-7), ratio > 5, ratio < 0.5],
+        ['faible_global', 'hot_dominant', 'cold_dominant'],
+        default='équilibré'
+    )
+
+
+# ── Détail moléculaire (payload build_report) ────────
+
+_BEHAVIORS = [
+    "COLD ONLY — S'évapore avant la combustion, ne contribue pas au diffusion à chaud",
+    "COLD DOMINANT — Plus efficace à froid qu'à chaud",
+    "HOT ONLY — Invisible à froid, ne se libère qu'à la fonte",
+    "HOT DOMINANT — Principalement actif à chaud",
+    "INERTE — Ni cold ni diffusion à chaud (piégé ou non-volatil)",
+]
+_BEHAVIOR_DEFAULT = "ÉQUILIBRÉ — Contribue au cold et au diffusion à chaud"
+
+
+def _register(volatility):
+    if volatility in ('très_haute', 'haute'):
+        return 'tête'
+    return 'coeur' if volatility == 'moyenne' else 'fond'
+
+
+def molecule_details(concentrations, table, wax):
+    """Entrées « molecules » d'un parfum dans une cire (champs de analyzeThrowProfile).
+
+    ``concentrations`` : ligne de la matrice de composition (fractions).
+    """
+    wt = WAX_THERMO[wax]
+    idx = np.flatnonzero(concentrations > 0)
+    conc = concentrations[idx]
+    pv = table.pvap([wt['T_surface_cold'], wt['T_melt_pool']])[:, idx]
+    D_hot = table.diffusion([wt['viscosity_melt']], [wt['T_melt_pool']])[0, 0, idx]
+    cold_phys = pv[0] * wt['surface_migration'] * conc
+    hot_phys = pv[1] * D_hot * wt['channel_factor'] * conc
+    oav = table.oav[idx]
+    cold, hot = cold_phys * oav, hot_phys * oav
+    behavior = np.select(
+        [cold > hot * 3, cold > hot * 1.5, hot > cold * 5, hot > cold * 2, (cold < 1e-8) & (hot < 1e-8)],
+        _BEHAVIORS, default=_BEHAVIOR_DEFAULT
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pv_ratio = np.where(pv[0] > 0, pv[1] / np.where(pv[0] > 0, pv[0], 1), 999)
+    r6 = lambda a: _js_round(a, 1e6)
+    pv_c, pv_h, c6, h6, cp6, hp6 = r6(pv[0]), r6(pv[1]), r6(cold), r6(hot), r6(cold_phys), r6(hot_phys)
+    pv_r, d2 = _js_round(pv_ratio, 10), _js_round(D_hot, 100)
+
+    entries = []
+    for k, j in enumerate(idx):
+        mol = table.records[table.cas[j]]
+        vol = mol.get('volatility') or 'moyenne'
+        entries.append({
+            'cas': table.cas[j], 'name': mol.get('name'), 'family': mol.get('family'),
+            'mw': mol.get('mw'), 'fp': mol.get('fp'), 'Teb_estimated': float(table.teb_c[j]),
+            'volatility': vol, 'register': _register(vol),
+            'pct': round(float(conc[k]) * 100, 6),
+            'bp': mol.get('bp') or None, 'logp': mol.get('logp'),
+            'odor_threshold': mol.get('odor_threshold'),
+            'Pvap_cold': float(pv_c[k]), 'Pvap_hot': float(pv_h[k]),
+            'Pvap_ratio': float(pv_r[k]), 'D_hot': float(d2[k]),
+            'cold_contribution': float(c6[k]), 'hot_contribution': float(h6[k]),
+            'cold_physical': float(cp6[k]), 'hot_physical': float(hp6[k]),
+            'behavior': str(behavior[k]),
+        })
+    return entries
+
+
+# ── Charge maximale (Flory-Huggins) sur le catalogue de cires ──
+
+CHARGE_BASE = 12          # % théorique maximum (χ = 0, channel factor = 1)
+FRAGRANCE_DENSITY = 0.92  # g/cm³, densité moyenne d'un parfum
+
+
+def charge_max_matrix(C, table, waxes=None, flash_points=None):
+    """Charge maximale de chaque parfum dans chaque cire (parfums × cires).
+
+    Même chaîne que calculateScientificChargeMax : δ parfum ≈ 20 - 0.5 ×
+    logP moyen, χ = V_m × Δδ² / RT, puis base 12 % × solubilité × cristaux ×
+    viscosité × sécurité (point éclair FDS, sinon composant le plus bas).
+    Les moyennes pondérées du parfum sont des produits matriciels ; le reste
+    se diffuse sur la dimension cire. Retourne (clés, dict de tableaux).
+    """
+    keys, w = wax_params(waxes)
+    hildebrand = np.array([WAX_THERMO[k]['hildebrand'] for k in keys])
+    P = C * 100
+    total = P.sum(1)
+    total = np.where(total == 0, 1, total)
+    avg_logp = P @ table.logp_charge / total
+    avg_mw = P @ table.mw_charge / total
+    fp_min = np.where(P > 0, table.fp, np.inf).min(1) if len(table) else np.full(len(P), np.inf)
+    if flash_points is None:
+        flash_points = np.zeros(len(P))
+    fp_used = np.where(flash_points > 0, flash_points, fp_min)
+    safety = np.select([fp_used < 55, fp_used < 65, fp_used < 80], [0.5, 0.7, 0.85], 1.0)
+
+    delta_parfum = 20 - 0.5 * avg_logp                                  # F
+    delta_diff = np.abs(delta_parfum[:, None] - hildebrand[None, :])   # F × W
+    T = w['T_melt_pool'] + 273.15
+    chi = (avg_mw / FRAGRANCE_DENSITY)[:, None] * delta_diff ** 2 / (R * T)
+    solubility = np.maximum(0.3, 1 - chi / 3)
+    crystal = 0.5 + 0.5 * w['channel_factor']
+    viscosity = np.minimum(1.0, 0.7 + 0.3 * np.minimum(w['viscosity_melt'] / 20, 1))
+    charge = _js_round(CHARGE_BASE * solubility * crystal * viscosity * safety[:, None], 10)
+    return keys, {
+        'charge_max_pct': charge,
+        'charge_min_pct': np.maximum(4, _js_round(charge - 2, 10)),
+        'chi': chi, 'delta_parfum': delta_parfum, 'delta_diff': delta_diff,
+        'solubility_factor': solubility, 'crystal_factor': crystal,
+        'viscosity_factor': viscosity, 'safety_factor': safety,
+        'logp_moyen': avg_logp, 'masse_mol_moyenne': avg_mw,
+        'flash_point_min': fp_min, 'flash_point_utilise': fp_used,
+    }
+
+
+def ranked_waxes(keys, cm, f):
+    """Classement des cires pour le parfum ``f`` : charge max décroissante, puis χ croissant."""
+    order = np.lexsort((cm['chi'][f], -cm['charge_max_pct'][f]))
+    return [{
+        'rang': rank + 1,
+        'cire': keys[w],
+        'nom': WAX_THERMO[keys[w]]['nom'],
+        'charge_min_pct': float(cm['charge_min_pct'][f, w]),
+        'charge_max_pct': float(cm['charge_max_pct'][f, w]),
+        'charge_display': f"{_js_str(cm['charge_min_pct'][f, w])}-{_js_str(cm['charge_max_pct'][f, w])}%",
+        'delta_cire': WAX_THERMO[keys[w]]['hildebrand'],
+        'chi': round(float(cm['chi'][f, w]), 2),
+        'solubility_factor': round(float(cm['solubility_factor'][f, w]), 2),
+        'crystal_factor': round(float(cm['crystal_factor'][w]), 2),
+        'viscosity_factor': round(float(cm['viscosity_factor'][w]), 2),
+        'safety_factor': float(cm['safety_factor'][f]),
+    } for rank, w in enumerate(order)]
+
+
+def charge_max_payload(keys, cm, f, w):
+    """Bloc « charge_max_scientifique » (formule et paramètres) pour build_report."""
+    fp_min, fp_used = cm['flash_point_min'][f], cm['flash_point_utilise'][f]
+    wax = WAX_THERMO[keys[w]]
+    return {
+        'charge_min_pct': float(cm['charge_min_pct'][f, w]),
+        'charge_max_pct': float(cm['charge_max_pct'][f, w]),
+        'charge_display': f"{_js_str(cm['charge_min_pct'][f, w])}-{_js_str(cm['charge_max_pct'][f, w])}%",
+        'formule': {
+            'description': 'Charge = Base théorique max (12%) × Solubilité × Cristaux × Viscosité × Sécurité → résultat réel',
+            'base': CHARGE_BASE,
+            'solubility_factor': float(_js_round(cm['solubility_factor'][f, w], 100)),
+            'crystal_factor': float(_js_round(cm['crystal_factor'][w], 100)),
+            'viscosity_factor': float(_js_round(cm['viscosity_factor'][w], 100)),
+            'safety_factor': float(_js_round(cm['safety_factor'][f], 100)),
+            'resultat': float(cm['charge_max_pct'][f, w]),
+        },
+        'parametres_parfum': {
+            'logP_moyen': float(_js_round(cm['logp_moyen'][f], 100)),
+            'masse_mol_moyenne': float(_js_round(cm['masse_mol_moyenne'][f])),
+            'delta_hildebrand_estime': float(_js_round(cm['delta_parfum'][f], 10)),
+            'chi_flory_huggins': float(_js_round(cm['chi'][f, w], 100)),
+            'flash_point_min': float(fp_min) if np.isfinite(fp_min) else None,
+            'flash_point_utilisé': float(fp_used) if np.isfinite(fp_used) else None,
+        },
+        'parametres_cire': {
+            'delta_hildebrand': wax['hildebrand'],
+            'channel_factor': wax['channel_factor'],
+            'viscosity': wax['viscosity_melt'],
+        },
+        'facteurs': [],
+    }
+
+
+# ── Scores /10 et incertitude (Monte-Carlo) ──────────
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _wax_coefficients(table, wax):
+    """Throw perceptuel par unité de concentration, froid et chaud, pour une cire."""
+    wt = WAX_THERMO[wax]
+    pv = table.pvap([wt['T_surface_cold'], wt['T_melt_pool']])
+    D_hot = table.diffusion([wt['viscosity_melt']], [wt['T_melt_pool']])[0, 0]
+    return (pv[0] * wt['surface_migration'] * table.oav,
+            pv[1] * D_hot * wt['channel_factor'] * table.oav)
+
+
+def scientific_scores(P, idx, table, wax, coefficients=None):
+    """Scores /10 froid, chaud et global de generateScientificReport, vectorisés.
+
+    ``P`` : compositions en % (échantillons × K), ``idx`` : indices des K
+    molécules dans la table. Chaque règle à seuil devient un masque sur la
+    matrice : un score par ligne, sans boucle sur les échantillons.
+    """
+    wt = WAX_THERMO[wax]
+    P = np.atleast_2d(np.asarray(P, dtype=float))
+    k_cold, k_hot = coefficients or _wax_coefficients(table, wax)
+
+    pct_volatiles = (np.where(P > 1, P, 0) * table.volatile[idx]).sum(1)
+    sf = 5 + np.select([pct_volatiles > 30, pct_volatiles > 15, pct_volatiles < 5, pct_volatiles < 10], [2, 1, -2, -1], 0)
+    sf += 1 if wt['surface_migration'] > 0.7 else -2 if wt['surface_migration'] < 0.3 else 0
+    sf += ((P > 1) & table.potent[idx]).sum(1) >= 3
+    sf -= ((P > 5) & table.aldehyde_arom[idx]).any(1)
+    with np.errstate(invalid='ignore'):
+        incompatible = np.abs(20 - 0.5 * table.logp[idx] - wt['hildebrand']) >= 4
+    sf -= ((P > 3) & incompatible).any(1)
+
+    pct_lourdes = (np.where(P > 2, P, 0) * table.heavy[idx]).sum(1)
+    sc = 5 + np.select([pct_lourdes > 30, pct_lourdes > 15, pct_lourdes < 5], [2, 1, -1], 0)
+    sc += 1 if wt['viscosity_melt'] < 10 else -2 if wt['viscosity_melt'] > 25 else -1 if wt['viscosity_melt'] > 15 else 0
+    sc += 1 if wt['channel_factor'] > 0.8 else -2 if wt['channel_factor'] < 0.3 else 0
+    sc += 1 if wt['T_melt_pool'] >= 58 else -1 if wt['T_melt_pool'] < 45 else 0
+    cold, hot = P / 100 * k_cold[idx], P / 100 * k_hot[idx]
+    inert = ((cold <= hot * 3) & (cold <= hot * 1.5) & (hot <= cold * 5) & (hot <= cold * 2)
+             & (cold < 1e-8) & (hot < 1e-8))
+    sc -= (inert & (P > 2)).sum(1) >= 2
+
+    sf = np.clip(_js_round(sf, 10), 0, 10)
+    sc = np.clip(_js_round(sc, 10), 0, 10)
+    return sf, sc, _js_round((sf + sc) / 2, 10)
+
+
+def verdict(score):
+    return 'Excellent' if score >= 7 else 'Correct' if score >= 5 else 'Faible' if score >= 3 else 'Insuffisant'
+
+
+def sample_compositions(lo, hi, n, rng):
+    """``n`` compositions tirées uniformément dans les fourchettes, somme ≤ 100 %.
+
+    Un tirage qui dépasse 100 % est ramené à 100 % en réduisant
+    proportionnellement l'excédent au-dessus des minima : chaque composant
+    reste dans sa fourchette. Une fiche dont les minima dépassent déjà 100 %
+    (fourchettes incohérentes) est ramenée aux minima normalisés.
+    """
+    hi = np.where(hi > 0, np.maximum(hi, lo), lo)
+    X = lo + rng.random((n, lo.size)) * (hi - lo)
+    floor = lo.sum()
+    over = X.sum(1) > 100
+    if over.any():
+        if floor >= 100:
+            X[over] = lo * (100 / floor)
+        else:
+            slack = X[over] - lo
+            X[over] = lo + slack * ((100 - floor) / slack.sum(1, keepdims=True))
+    return X
+
+
+def uncertainty(lo, hi, table, wax, samples=2000, seed=0, percentiles=PERCENTILES):
+    """Distribution des scores d'un parfum dans une cire sur ``samples`` tirages.
+
+    ``lo`` / ``hi`` : lignes de composition_ranges (en %). Graine fixe par
+    défaut : même payload → même distribution (rapports déterministes).
+    """
+    idx = np.flatnonzero((lo > 0) | (hi > 0))
+    coefficients = _wax_coefficients(table, wax)
+    P = sample_compositions(lo[idx], hi[idx], samples, np.random.default_rng(seed))
+    sf, sc, sg = scientific_scores(P, idx, table, wax, coefficients)
+    cold = P @ coefficients[0][idx] / 100
+    hot = P @ coefficients[1][idx] / 100
+    dist = lambda a, digits: {f'p{q}': round(float(v), digits) for q, v in zip(percentiles, np.percentile(a, percentiles))}
+    return {
+        'echantillons': samples,
+        'score_froid': dist(sf, 1),
+        'score_chaud': dist(sc, 1),
+        'score_global': dist(sg, 2),
+        'cold_throw_index': dist(cold, 6),
+        'hot_throw_index': dist(hot, 6),
+    }
+
+
+def report_payloads(names, C, table, waxes=None, ranges=None, samples=0, flash_points=None):
+    """Un diagnostic par couple parfum × cire, prêt pour build_report.
+
+    Génère des dicts (flux) : la grille complète n'est jamais matérialisée
+    en payloads. Avec ``ranges`` (lo, hi) et ``samples`` > 0, chaque
+    diagnostic porte aussi la distribution Monte-Carlo de ses scores.
+    La charge max et le classement des cires portent toujours sur tout le
+    catalogue, quelles que soient les cires rendues.
+    """
+    keys, cold, hot, ratio = cold_hot_matrix(C, table, waxes)
+    bal = balance(cold, hot, ratio)
+    all_keys, cm = charge_max_matrix(C, table, None, flash_points)
+    for f, name in enumerate(names):
+        idx = np.flatnonzero(C[f] > 0)
+        classement = ranked_waxes(all_keys, cm, f)
+        for w, wax in enumerate(keys):
+            sf, sc, sg = (float(v[0]) for v in scientific_scores(C[f, idx] * 100, idx, table, wax))
+            payload = {
+                'id': f'{name}_{wax}',
+                'fragrance': name,
+                'wax_name': WAX_THERMO[wax]['nom'],
+                'molecules': molecule_details(C[f], table, wax),
+                'rapport': {
+                    'score_froid': sf, 'score_chaud': sc, 'score_global': sg,
+                    'verdict_froid': verdict(sf), 'verdict_chaud': verdict(sc),
+                },
+                'charge_max_scientifique': charge_max_payload(all_keys, cm, f, all_keys.index(wax)),
+                'comparaison_cires': classement,
+                'throw': {
+                    'wax': wax,
+                    'cold_throw_index': float(cold[f, w]),
+                    'hot_throw_index': float(hot[f, w]),
+                    'ratio_hot_cold': float(ratio[f, w]),
+                    'balance': str(bal[f, w]),
+                },
+            }
+            if ranges is not None and samples:
+                payload['incertitude'] = uncertainty(ranges[0][f], ranges[1][f], table, wax, samples)
+            yield payload
+
+
+# ── CLI ──────────────────────────────────────────────
+
+def load_fragrances(path):
+    """Résultats fds-parser : liste JSON, {"resultats": [...]} ou NDJSON."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        raw = json.loads(text)
+    except json.JSONDecodeError:
+        raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(raw, dict):
+        raw = raw.get('resultats') or raw.get('fragrances') or [raw]
+    return [r for r in raw if isinstance(r, dict) and (r.get('composition') or r.get('components'))]
+
+
+def _option(name, default=None):
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+def main():
+    mol_path, frag_path = _option('--molecules'), _option('--fragrances')
+    if not mol_path or not frag_path:
+        print(__doc__.split('Usage : ')[1].split('\n\n')[0], file=sys.stderr)
+        sys.exit(1)
+    waxes = [w.strip() for w in _option('--waxes', '').split(',') if w.strip()] or None
+    try:
+        wax_params(waxes)
+        temperatures = [float(t) for t in _option('--temperatures', '20,45,60,75').split(',') if t.strip()]
+        samples = int(_option('--monte-carlo', 0))
+    except ValueError as e:
+        print(f"ERREUR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    table = PropertyTable.load(mol_path)
+    fragrances = load_fragrances(frag_path)
+    names = [fragrance_name(r, i) for i, r in enumerate(fragrances)]
+    lo, hi, inconnus = composition_ranges(fragrances, table)
+    C = (lo + hi) / 200
+    flash_points = fragrance_flash_points(fragrances)
+    t_load = time.perf_counter()
+    keys, grid = throw_grid(C, table, waxes, temperatures)
+    _, cold, hot, ratio = cold_hot_matrix(C, table, waxes)
+    # Classement sur tout le catalogue, comme les payloads ; charge_max : colonnes de la grille
+    all_keys, cm = charge_max_matrix(C, table, None, flash_points)
+    cols = [all_keys.index(k) for k in keys]
+    t_calc = time.perf_counter()
+
+    payloads_path = _option('--payloads')
+    if payloads_path:
+        with open(payloads_path, 'w', encoding='utf-8') as f:
+            for payload in report_payloads(names, C, table, waxes, (lo, hi), samples, flash_points):
+                f.write(json.dumps(payload, ensure_ascii=False) + '\n')
+
+    result = {
+        'parfums': names,
+        'cires': keys,
+        'temperatures': temperatures,
+        'froid': _js_round(cold, 1e6).tolist(),
+        'chaud': _js_round(hot, 1e6).tolist(),
+        'ratio_chaud_froid': ratio.tolist(),
+        'equilibre': balance(cold, hot, ratio).tolist(),
+        'grille': _js_round(grid, 1e6).tolist(),
+        'charge_max': cm['charge_max_pct'][:, cols].tolist(),
+        'classement_cires': {n: [c['cire'] for c in ranked_waxes(all_keys, cm, f)] for f, n in enumerate(names)},
+        'cas_inconnus': {n: m for n, m in zip(names, inconnus) if m},
+        '_meta': {
+            'moteur': 'MFC throw-engine (NumPy)',
+            'parfums': len(names), 'molecules': len(table),
+            'chargement_s': round(t_load - t0, 4), 'calcul_s': round(t_calc - t_load, 4),
+        },
+    }
+    output = _option('--output')
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        print(json.dumps({'success': True, 'path': output, **result['_meta']}))
+    else:
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()